@@ -0,0 +1,192 @@
+# autocancel.py
+# Auto-cancelling bookings that were not checked in.
+#
+# Each booking gets an ETA task at its check-in deadline (see tasks.py), which
+# calls expire_booking(). run_sweep() is the safety net behind the periodic
+# task and the management commands.
+#
+# Bookings not checked in by the end of their check-in window are cancelled in
+# keyset batches ordered by (start_time, id): each batch is one locked SELECT,
+# one UPDATE of the bookings and one UPDATE releasing their rooms. After every
+# committed batch the position is stored as a SweepCheckpoint, so a run stopped
+# by its time budget resumes there and the next scheduled run only scans
+# bookings whose window closed since. Bookings created or moved into the past
+# land behind the checkpoint, so every run first cancels one batch of those,
+# looking back AUTO_CANCEL_LOOKBACK_MINUTES like the first run does.
+import logging
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from .availability import bump_indexed_version
+from .cache import bump_user_versions
+from .models import CHECKIN_WINDOW, Booking, Room, SweepCheckpoint
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_NAME = 'auto-cancel'
+
+
+def load_checkpoint(now=None):
+    # (start_time, booking_id) already handled; the first run starts a lookback before the cutoff
+    checkpoint = SweepCheckpoint.objects.filter(name=CHECKPOINT_NAME).first()
+    if checkpoint is not None:
+        return checkpoint.start_time, checkpoint.booking_id
+    now = now or timezone.now()
+    return now - CHECKIN_WINDOW - timedelta(minutes=settings.AUTO_CANCEL_LOOKBACK_MINUTES), 0
+
+
+def save_checkpoint(start_time, booking_id):
+    SweepCheckpoint.objects.update_or_create(
+        name=CHECKPOINT_NAME, defaults={'start_time': start_time, 'booking_id': booking_id}
+    )
+
+
+def reset_checkpoint():
+    SweepCheckpoint.objects.filter(name=CHECKPOINT_NAME).delete()
+
+
+def candidates(position, cutoff):
+    # Unchecked bookings after `position` whose check-in window closed by `cutoff`
+    start, booking_id = position
+    return Booking.objects.filter(
+        Q(start_time__gt=start) | Q(start_time=start, id__gt=booking_id),
+        checked_in=False,
+        cancelled=False,
+        start_time__lte=cutoff,
+    ).order_by('start_time', 'id')
+
+
+def stragglers(position, cutoff, since):
+    # Unchecked bookings at or behind `position`, back to `since`, that a previous run passed over
+    start, booking_id = position
+    return Booking.objects.filter(
+        Q(start_time__lt=start) | Q(start_time=start, id__lte=booking_id),
+        checked_in=False,
+        cancelled=False,
+        start_time__gte=since,
+        start_time__lte=cutoff,
+    ).order_by('start_time', 'id')
+
+
+def cancel_expired(booking_ids, room_ids, user_ids):
+    # Inside the caller's transaction: cancels the bookings and releases their rooms,
+    # one UPDATE each. Returns (bookings cancelled, rooms released).
+    cancelled = Booking.objects.filter(id__in=booking_ids).update(cancelled=True)
+    released = Room.objects.filter(id__in=set(room_ids), is_available=False).update(is_available=True)
+    # Cancelled rows stay is_active, so the interval index is unchanged; only versions move
+    transaction.on_commit(bump_indexed_version)
+    transaction.on_commit(lambda: bump_user_versions(user_ids))
+    return cancelled, released
+
+
+def expire_booking(booking_id, now=None, on_cancelled=None):
+    # Cancels one booking if its check-in window has closed without a check-in; a no-op
+    # otherwise (checked in, cancelled, moved later, or deleted). Returns True if cancelled.
+    # `on_cancelled([booking_id])` runs once the cancellation commits.
+    cutoff = (now or timezone.now()) - CHECKIN_WINDOW
+    with transaction.atomic():
+        row = Booking.objects.select_for_update().filter(
+            id=booking_id, checked_in=False, cancelled=False, start_time__lte=cutoff
+        ).values_list('room_id', 'user_id').first()
+        if row is None:
+            return False
+        cancel_expired([booking_id], [row[0]], [row[1]])
+        if on_cancelled is not None:
+            transaction.on_commit(lambda: on_cancelled([booking_id]))
+    return True
+
+
+def _cancel_batch(queryset, batch_size, dry_run, on_cancelled, result):
+    # Inside the caller's transaction: one locked SELECT of up to batch_size rows and the
+    # UPDATEs cancelling them. Adds to `result` and returns the rows handled.
+    if not dry_run:
+        queryset = queryset.select_for_update()  # A check-in racing the sweep either wins or waits
+    rows = list(queryset.values_list('id', 'room_id', 'user_id', 'start_time')[:batch_size])
+    if not rows:
+        return rows
+
+    booking_ids, room_ids, user_ids, _ = zip(*rows)
+    result['batches'] += 1
+    if dry_run:
+        result['cancelled'] += len(rows)
+    else:
+        cancelled, released = cancel_expired(booking_ids, room_ids, user_ids)
+        result['cancelled'] += cancelled
+        result['rooms_released'] += released
+        if on_cancelled is not None:
+            transaction.on_commit(lambda: on_cancelled(booking_ids))
+    return rows
+
+
+def run_sweep(now=None, batch_size=None, time_budget=None, dry_run=False, on_cancelled=None):
+    # Returns a summary dict. `on_cancelled(booking_ids)` runs after each committed batch.
+    # dry_run counts what would be cancelled without writing anything, checkpoint included.
+    started = time.perf_counter()
+    now = now or timezone.now()
+    cutoff = now - CHECKIN_WINDOW
+    since = cutoff - timedelta(minutes=settings.AUTO_CANCEL_LOOKBACK_MINUTES)
+    batch_size = batch_size or settings.AUTO_CANCEL_BATCH_SIZE
+    time_budget = settings.AUTO_CANCEL_TIME_BUDGET_SECONDS if time_budget is None else time_budget
+    position = load_checkpoint(now)
+    result = {'cancelled': 0, 'rooms_released': 0, 'batches': 0, 'complete': False, 'dry_run': dry_run}
+
+    # Catch-up: the checkpoint stays where it is; anything left over goes next run
+    with transaction.atomic():
+        result['caught_up'] = len(_cancel_batch(
+            stragglers(position, cutoff, since), batch_size, dry_run, on_cancelled, result
+        ))
+
+    while True:
+        with transaction.atomic():
+            rows = _cancel_batch(candidates(position, cutoff), batch_size, dry_run, on_cancelled, result)
+            if not rows:
+                result['complete'] = True
+                break
+            position = (rows[-1][3], rows[-1][0])
+            if not dry_run:
+                save_checkpoint(*position)
+
+        if len(rows) < batch_size:
+            result['complete'] = True
+            break
+        if time.perf_counter() - started >= time_budget:
+            break  # The next run resumes from the checkpoint
+
+    result['checkpoint'] = position[0].isoformat()
+    result['elapsed_ms'] = round((time.perf_counter() - started) * 1000, 1)
+    logger.info(
+        "Auto-cancel sweep%s: %d bookings cancelled, %d rooms released in %d batches, %.1f ms%s",
+        ' (dry run)' if dry_run else '', result['cancelled'], result['rooms_released'], result['batches'],
+        result['elapsed_ms'], '' if result['complete'] else '; stopped at the time budget'
+    )
+    return result
+
+
+def add_sweep_arguments(parser):
+    # Shared by the auto-cancel management commands
+    parser.add_argument('--batch-size', type=int, default=None, help='Bookings per UPDATE batch.')
+    parser.add_argument('--time-budget', type=float, default=None, help='Seconds before stopping at a checkpoint.')
+    parser.add_argument('--dry-run', action='store_true', help='Count bookings that would be cancelled.')
+    parser.add_argument('--from-scratch', action='store_true',
+                        help='Forget the checkpoint and start from the lookback window.')
+
+
+def sweep_from_options(options, on_cancelled=None):
+    if options['from_scratch'] and not options['dry_run']:
+        reset_checkpoint()
+    return run_sweep(
+        batch_size=options['batch_size'],
+        time_budget=options['time_budget'],
+        dry_run=options['dry_run'],
+        on_cancelled=on_cancelled,
+    )
+
+
+def describe(result):
+    action = 'would be cancelled' if result['dry_run'] else 'cancelled'
+    text = (f"{result['cancelled']} bookings {action}, {result['rooms_released']} rooms released "
+            f"in {result['batches']} batches ({result['elapsed_ms']:.0f} ms); checkpoint {result['checkpoint']}")
+    return text if result['complete'] else text + '; time budget reached, the next run resumes here'
@@ -0,0 +1,308 @@
+# availability.py
+# In-process per-room interval index of active bookings.
+#
+# Each room keeps its bookings sorted by start time together with a running
+# maximum of end times, so "is this room busy between X and Y" is a single
+# bisect: every booking starting before Y sits left of the insertion point,
+# and the room is busy if any of them ends after X. Series occurrences beyond
+# their materialized horizon are kept as the series themselves and expanded
+# only inside the queried window.
+#
+# Each process has its own index, so it records the shared booking version
+# (cache.current_version()) its snapshot reflects. A write from any other
+# process (a Celery job, another web worker) bumps that version, and the
+# index is only trusted while the two agree; writes made here are applied
+# to the index before their bump, which keeps it current. The snapshot only
+# holds bookings that hadn't ended when it was taken, so windows starting
+# earlier are answered by the database.
+#
+# A stale index never delays a request: the lookup is answered by the
+# database and request_rebuild() reloads the index in a background thread,
+# at most once per AVAILABILITY_INDEX_REBUILD_SECONDS, so a steady stream of
+# writes from other processes costs each process one snapshot per interval.
+import heapq
+import logging
+import threading
+import time
+from bisect import bisect_left, insort
+from itertools import groupby
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+from . import cache as availability_cache
+
+logger = logging.getLogger(__name__)
+
+
+class RoomIntervals:
+    def __init__(self):
+        self.entries = []   # (start_time, end_time, booking_id), sorted
+        self.max_end = []   # max_end[i] == max(end for entries[0..i])
+
+    def _rebuild_max_end(self, position):
+        running = self.max_end[position - 1] if position > 0 else None
+        del self.max_end[position:]
+        for _, end, _ in self.entries[position:]:
+            running = end if running is None or end > running else running
+            self.max_end.append(running)
+
+    def add(self, start, end, booking_id):
+        entry = (start, end, booking_id)
+        position = bisect_left(self.entries, entry)
+        insort(self.entries, entry)
+        self._rebuild_max_end(position)
+
+    def remove(self, start, end, booking_id):
+        position = bisect_left(self.entries, (start, end, booking_id))
+        if position < len(self.entries) and self.entries[position][2] == booking_id:
+            del self.entries[position]
+            self._rebuild_max_end(position)
+
+    def overlaps(self, start, end):
+        # Only bookings starting before `end` can overlap the window
+        position = bisect_left(self.entries, (end,))
+        return position > 0 and self.max_end[position - 1] > start
+
+
+class BookingIntervalIndex:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._rooms = {}
+        self._bookings = {}  # booking_id -> (room_id, start, end), for moves and deletes
+        self._series = {}    # room_id -> {series_id: BookingSeries with prefetched exceptions}
+        self._generation = 0  # Counts changes, so a rebuild can tell it raced with one
+        self.version = None   # Shared booking version the contents reflect; None when stale
+        self.since = None     # Bookings ending before this weren't loaded
+        self.is_warm = False
+        self._rebuilding = False
+        self._rebuild_started = None  # time.monotonic() of the last requested rebuild
+
+    def reset(self):
+        # Cold start, including the rebuild rate limit (tests)
+        with self._lock:
+            self.invalidate()
+            self._rebuilding = False
+            self._rebuild_started = None
+
+    def invalidate(self):
+        # Drops the contents; the next lookup falls back to the ORM and requests a rebuild
+        with self._lock:
+            self._rooms = {}
+            self._bookings = {}
+            self._series = {}
+            self._generation += 1
+            self.version = None
+            self.since = None
+            self.is_warm = False
+
+    def is_current(self, version):
+        with self._lock:
+            return self.is_warm and self.version == version
+
+    def covers(self, start):
+        with self._lock:
+            return self.since is not None and start >= self.since
+
+    def advance(self, version):
+        # `version` is the shared counter after a bump for a write already applied here;
+        # any other bump in between means some write is missing, so the index stays stale
+        with self._lock:
+            if self.version is not None and self.version + 1 == version:
+                self.version = version
+            else:
+                self.version = None
+
+    def _snapshot(self, since):
+        from .models import Booking, BookingSeries
+
+        rows = Booking.objects.filter(is_active=True, end_time__gte=since).values_list(
+            'id', 'room_id', 'start_time', 'end_time'
+        )
+        rooms = {}
+        bookings = {}
+        for booking_id, room_id, start, end in rows.iterator(chunk_size=5000):
+            rooms.setdefault(room_id, []).append((start, end, booking_id))
+            bookings[booking_id] = (room_id, start, end)
+
+        built = {}
+        for room_id, entries in rooms.items():
+            intervals = RoomIntervals()
+            intervals.entries = sorted(entries)
+            intervals._rebuild_max_end(0)
+            built[room_id] = intervals
+
+        series = {}
+        for item in BookingSeries.objects.with_lazy_occurrences().prefetch_related('exceptions'):
+            series.setdefault(item.room_id, {})[item.id] = item
+        return built, bookings, series
+
+    def rebuild(self, version=None):
+        # The version is read before the snapshot: a write committed after the read bumps
+        # it again, so the next lookup sees the mismatch instead of trusting a stale snapshot
+        version = availability_cache.current_version() if version is None else version
+        since = timezone.now()
+        with self._lock:
+            generation = self._generation
+        rooms, bookings, series = self._snapshot(since)
+
+        with self._lock:
+            self._rooms = rooms
+            self._bookings = bookings
+            self._series = series
+            self.since = since
+            self.is_warm = True
+            # A change applied here during the snapshot was made to the old contents and
+            # may be missing from the new ones; rebuild again on the next lookup
+            self.version = version if self._generation == generation else None
+
+    def request_rebuild(self):
+        # Called after a lookup the index couldn't answer; returns True if a rebuild started.
+        # One at a time, and not again within AVAILABILITY_INDEX_REBUILD_SECONDS of the last.
+        with self._lock:
+            now = time.monotonic()
+            if self._rebuilding or (
+                self._rebuild_started is not None
+                and now - self._rebuild_started < settings.AVAILABILITY_INDEX_REBUILD_SECONDS
+            ):
+                return False
+            self._rebuilding = True
+            self._rebuild_started = now
+
+        if settings.AVAILABILITY_INDEX_REBUILD_IN_BACKGROUND:
+            threading.Thread(target=self._run_rebuild, args=(True,), name='booking-index-rebuild', daemon=True).start()
+        else:
+            self._run_rebuild(False)
+        return True
+
+    def _run_rebuild(self, threaded):
+        try:
+            self.rebuild()
+        except Exception:
+            logger.exception("Rebuilding the booking interval index failed; lookups stay on the database.")
+        finally:
+            with self._lock:
+                self._rebuilding = False
+            if threaded:
+                connection.close()  # The thread's own connection
+
+    def discard(self, booking_id):
+        with self._lock:
+            self._generation += 1
+            previous = self._bookings.pop(booking_id, None)
+            if previous is not None:
+                room_id, start, end = previous
+                self._rooms[room_id].remove(start, end, booking_id)
+
+    def update(self, booking_id, room_id, start, end, is_active):
+        # Mirrors the ORM predicate used by AvailableRoomsAPIView (is_active=True)
+        with self._lock:
+            self._generation += 1
+            if not self.is_warm:
+                return
+            self.discard(booking_id)
+            if is_active:
+                self._rooms.setdefault(room_id, RoomIntervals()).add(start, end, booking_id)
+                self._bookings[booking_id] = (room_id, start, end)
+
+    def update_series(self, series_id, series):
+        # `series` is None when deleted, or a BookingSeries with prefetched exceptions
+        with self._lock:
+            self._generation += 1
+            if not self.is_warm:
+                return
+            for room_series in self._series.values():
+                room_series.pop(series_id, None)
+            if series is not None and not series.cancelled and series.materialized_until < series.recurrence_end:
+                self._series.setdefault(series.room_id, {})[series_id] = series
+
+    def _series_busy(self, room_id, start, end):
+        return any(
+            next(series.lazy_occurrences(start, end), None) is not None
+            for series in self._series.get(room_id, {}).values()
+        )
+
+    def is_busy(self, room_id, start, end):
+        with self._lock:
+            intervals = self._rooms.get(room_id)
+            return (intervals is not None and intervals.overlaps(start, end)) or self._series_busy(room_id, start, end)
+
+    def busy_room_ids(self, start, end):
+        with self._lock:
+            busy = {
+                room_id for room_id, intervals in self._rooms.items()
+                if intervals.overlaps(start, end)
+            }
+            busy.update(room_id for room_id in self._series if self._series_busy(room_id, start, end))
+            return busy
+
+
+booking_index = BookingIntervalIndex()
+
+
+def bump_indexed_version():
+    # Bumps the shared booking version after a write that has been applied to this
+    # process's index (or doesn't affect it), keeping the index current
+    booking_index.advance(availability_cache.bump_version())
+
+
+def orm_busy_room_ids(start, end):
+    from .models import Booking, BookingSeries
+
+    busy = set(
+        Booking.objects.filter(
+            is_active=True,
+            start_time__lt=end,
+            end_time__gt=start
+        ).values_list('room_id', flat=True)
+    )
+    busy.update(room_id for room_id, _, _, _ in BookingSeries.lazy_rows(start, end))
+    return busy
+
+
+def check_index_consistency(start, end):
+    # Compares the index against the ORM for one window; returns the room IDs
+    # they disagree on (empty when consistent, or when the index is cold).
+    if not booking_index.is_warm:
+        return set()
+
+    mismatched = booking_index.busy_room_ids(start, end) ^ orm_busy_room_ids(start, end)
+    if mismatched:
+        logger.warning(
+            "Booking interval index disagrees with the database for rooms %s; invalidating.",
+            sorted(mismatched)
+        )
+        booking_index.invalidate()
+    return mismatched
+
+
+def earliest_free_start(busy, window_start, window_end, duration):
+    # Sweep one room's busy intervals (sorted by start, possibly overlapping) and
+    # return the first start with `duration` free before `window_end`, or None.
+    cursor = window_start
+    for start, end in busy:
+        if start - cursor >= duration:
+            break
+        if end > cursor:
+            cursor = end  # Merges overlapping/adjacent intervals as it goes
+        if cursor + duration > window_end:
+            return None
+    return cursor if cursor + duration <= window_end else None
+
+
+def find_free_slots(room_ids, busy_rows, window_start, window_end, duration, limit):
+    # busy_rows: (room_id, start, end) ordered by room_id then start, e.g. straight from
+    # one ORDER BY query. Returns the `limit` earliest (start, room_id) pairs, one per room.
+    # Each room's rows are swept as they stream past; rows after its first gap are skipped.
+    wanted = set(room_ids)
+    candidates = []
+    for room_id, rows in groupby(busy_rows, key=lambda row: row[0]):
+        if room_id in wanted:
+            wanted.discard(room_id)
+            start = earliest_free_start(((s, e) for _, s, e in rows), window_start, window_end, duration)
+            if start is not None:
+                candidates.append((start, room_id))
+
+    # Rooms without any booking in the window are free right away
+    if window_start + duration <= window_end:
+        candidates.extend((window_start, room_id) for room_id in wanted)
+    return heapq.nsmallest(limit, candidates)
@@ -0,0 +1,120 @@
+# cache.py
+# Versioned response cache for availability queries, and change counters for
+# conditional GETs.
+#
+# Every cached response is keyed on the normalized query plus a global
+# booking/room version counter. Booking and Room writes bump the counter
+# (see signals.py), so older entries are never read again and simply expire.
+# Each user also has a counter bumped by writes to their own bookings, which
+# lets per-user pages answer 304 while other users book rooms.
+import hashlib
+import json
+import threading
+import time
+from datetime import datetime, timezone
+from django.conf import settings
+from django.core.cache import caches
+
+VERSION_KEY = 'availability:version'
+# Bumped for changes whose users aren't known (bulk updates, room edits); part of every user's version
+USERS_EPOCH_KEY = 'bookings:users:version'
+
+_stats_lock = threading.Lock()
+_stats = {'hits': 0, 'misses': 0}
+
+
+def get_cache():
+    return caches[settings.AVAILABILITY_CACHE_ALIAS]
+
+
+def _counter(key):
+    cache = get_cache()
+    version = cache.get(key)
+    if version is None:
+        # Seed from the clock so an evicted counter never reuses an old version
+        cache.add(key, int(time.time() * 1000), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def _bump(key):
+    # Returns the new value
+    cache = get_cache()
+    try:
+        version = cache.incr(key)
+    except ValueError:
+        version = _counter(key)
+    cache.set(f'{key}:changed', time.time(), timeout=None)
+    return version
+
+
+def _changed(key):
+    cache = get_cache()
+    changed = cache.get(f'{key}:changed')
+    if changed is None:
+        # Unknown after eviction; treat it as changed now so clients refetch once
+        cache.add(f'{key}:changed', time.time(), timeout=None)
+        changed = cache.get(f'{key}:changed')
+    return datetime.fromtimestamp(int(changed), tz=timezone.utc)
+
+
+def current_version():
+    return _counter(VERSION_KEY)
+
+
+def bump_version():
+    return _bump(VERSION_KEY)
+
+
+def last_changed():
+    # When bookings or rooms last changed, as an aware UTC datetime (for Last-Modified)
+    return _changed(VERSION_KEY)
+
+
+def _user_key(user_id):
+    return f'bookings:user:{user_id}:version'
+
+
+def user_version(user_id):
+    return f'{_counter(USERS_EPOCH_KEY)}.{_counter(_user_key(user_id))}'
+
+
+def bump_user_versions(user_ids=None):
+    # None: the change may touch anyone's bookings
+    if user_ids is None:
+        _bump(USERS_EPOCH_KEY)
+    else:
+        for user_id in set(user_ids):
+            _bump(_user_key(user_id))
+
+
+def user_last_changed(user_id):
+    return max(_changed(USERS_EPOCH_KEY), _changed(_user_key(user_id)))
+
+
+def make_key(params, version):
+    digest = hashlib.sha1(json.dumps(params, sort_keys=True, default=str).encode()).hexdigest()
+    return f'availability:{version}:{digest}'
+
+
+# Callers read current_version() once, before querying, and pass it to both calls: a
+# response built from rows read before a write then lands under the old version's key
+def get_response(params, version):
+    data = get_cache().get(make_key(params, version))
+    with _stats_lock:
+        _stats['hits' if data is not None else 'misses'] += 1
+    return data
+
+
+def set_response(params, data, version):
+    get_cache().set(make_key(params, version), data, timeout=settings.AVAILABILITY_CACHE_TIMEOUT)
+
+
+def cache_stats():
+    with _stats_lock:
+        return dict(_stats)
+
+
+def reset_stats():
+    with _stats_lock:
+        _stats.update(hits=0, misses=0)
@@ -2,6 +2,8 @@ from django import forms
 from .models import Room, Booking
 from django.utils import timezone
 from datetime import date
+from .utils import parse_resources
+from .recurrence import parse_rule
 
 class RoomForm(forms.ModelForm):
     class Meta:
@@ -21,11 +23,13 @@ class RoomForm(forms.ModelForm):
 class BookingForm(forms.ModelForm):
     class Meta:
         model = Booking
-        fields = ['room', 'start_time', 'end_time', 'attendees', 'required_resources', 'recurrence', 'recurrence_end']
+        fields = ['room', 'start_time', 'end_time', 'attendees', 'required_resources', 'recurrence', 'recurrence_end',
+                  'recurrence_rule']
         widgets = {
             'start_time': forms.DateTimeInput(attrs={'type': 'datetime-local'}),
             'end_time': forms.DateTimeInput(attrs={'type': 'datetime-local'}),
             'recurrence_end': forms.DateInput(attrs={'type': 'date'}),
+            'recurrence_rule': forms.Textarea(attrs={'rows': 2, 'placeholder': 'FREQ=WEEKLY;BYDAY=MO,WE;COUNT=10'}),
         }
 
     def clean(self):
@@ -38,23 +42,33 @@ class BookingForm(forms.ModelForm):
         recurrence = cleaned_data.get('recurrence')
         recurrence_end = cleaned_data.get('recurrence_end')
 
-        valid_recurrences = ['none', 'daily', 'weekly']
+        valid_recurrences = ['none', 'daily', 'weekly', 'monthly', 'custom']
         if recurrence not in valid_recurrences:
             raise forms.ValidationError("Invalid recurrence value.")
 
+        rule = None
+        if recurrence == 'custom':
+            try:
+                rule = parse_rule(cleaned_data.get('recurrence_rule') or '')
+            except ValueError as error:
+                raise forms.ValidationError(f"Invalid recurrence rule: {error}")
+            if start and rule.until and rule.until < timezone.localtime(start).date():
+                raise forms.ValidationError("Recurrence rule ends before the booking starts.")
+
         if start and end:
             if start < timezone.now():
                 raise forms.ValidationError("Booking must be in the future.")
             if start >= end:
                 raise forms.ValidationError("End time must be after start time.")
 
-        if recurrence != 'none' and not recurrence_end:
+        # A custom rule with COUNT or UNTIL carries its own end
+        if recurrence != 'none' and not recurrence_end and not (rule and (rule.count or rule.until)):
             raise forms.ValidationError("Recurrence end date is required for recurring bookings.")
 
         if room:
             if attendees and room.capacity < attendees:
                 raise forms.ValidationError("Room does not have enough capacity.")
-            if resources and resources.lower() not in room.resources.lower():
+            if not set(parse_resources(resources)) <= room.resource_names:
                 raise forms.ValidationError("Requested resource not available in room.")
 
 class BookingEditForm(forms.ModelForm):
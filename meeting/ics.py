@@ -0,0 +1,250 @@
+# ics.py
+# iCalendar (RFC 5545) feeds of bookings, produced line by line so views can
+# stream them. A stored series is one VEVENT with an RRULE; its cancelled
+# occurrences become EXDATEs and moved ones standalone events. Bookings are
+# read with .iterator(), so a feed never holds all rows in memory. Times are
+# local to settings.TIME_ZONE, which the feed defines in a VTIMEZONE so that
+# clients don't need to know the zone (or read the times as floating).
+from datetime import datetime, timedelta, timezone as dt_timezone
+from functools import lru_cache
+from zoneinfo import ZoneInfo
+from django.conf import settings
+from django.core import signing
+from django.db.models import Q
+from django.utils import timezone
+from .models import Booking, BookingSeries
+from .recurrence import parse_rule
+
+CRLF = '\r\n'
+PRODID = '-//Meeting Room Booking//Bookings Feed//EN'
+UID_DOMAIN = 'meeting-rooms'
+FEED_LOOKBACK_DAYS = 30  # Past bookings kept in feeds
+FEED_CHUNK_SIZE = 500
+TOKEN_SALT = 'meeting.ics.user-feed'
+VTIMEZONE_YEARS = 10  # Offset changes listed ahead; clients keep the last offset after that
+
+LEGACY_RULES = {'daily': 'FREQ=DAILY', 'weekly': 'FREQ=WEEKLY'}
+
+
+def feed_token(user):
+    # Calendar clients can't log in, so the user feed URL carries a signed user id
+    return signing.Signer(salt=TOKEN_SALT).sign(str(user.pk))
+
+
+def user_id_for_token(token):
+    try:
+        return int(signing.Signer(salt=TOKEN_SALT).unsign(token))
+    except (signing.BadSignature, ValueError):
+        return None
+
+
+def _escape(text):
+    return (str(text).replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+            .replace('\r\n', '\\n').replace('\n', '\\n'))
+
+
+def _fold(line):
+    # Content lines are at most 75 octets; longer ones continue on lines starting with a space
+    encoded = line.encode('utf-8')
+    if len(encoded) <= 75:
+        return line + CRLF
+    chunks = []
+    while encoded:
+        limit = 75 if not chunks else 74
+        cut = min(limit, len(encoded))
+        while cut < len(encoded) and (encoded[cut] & 0xC0) == 0x80:
+            cut -= 1  # Don't split a multi-byte character
+        chunks.append(encoded[:cut].decode('utf-8'))
+        encoded = encoded[cut:]
+    return (CRLF + ' ').join(chunks) + CRLF
+
+
+def _utc(value):
+    return value.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def _local(value):
+    return timezone.localtime(value).strftime('%Y%m%dT%H%M%S')
+
+
+def _offset(delta):
+    minutes = int(delta.total_seconds()) // 60
+    sign = '-' if minutes < 0 else '+'
+    return f'{sign}{abs(minutes) // 60:02d}{abs(minutes) % 60:02d}'
+
+
+def _transitions(zone, start, end):
+    # UTC instants in [start, end) where the zone's UTC offset changes: sampled weekly, then
+    # bisected to the second (offsets never change twice in a week)
+    step = timedelta(days=7)
+    cursor = start
+    while cursor < end:
+        later = min(cursor + step, end)
+        if cursor.astimezone(zone).utcoffset() != later.astimezone(zone).utcoffset():
+            low, high = cursor, later
+            while high - low > timedelta(seconds=1):
+                middle = low + (high - low) / 2
+                if middle.astimezone(zone).utcoffset() == low.astimezone(zone).utcoffset():
+                    low = middle
+                else:
+                    high = middle
+            yield high.replace(microsecond=0)
+        cursor = later
+
+
+def _observance(zone, moment, offset_from):
+    # One STANDARD/DAYLIGHT block starting at `moment` (UTC); DTSTART is in the previous offset
+    local = moment.astimezone(zone)
+    kind = 'DAYLIGHT' if local.dst() else 'STANDARD'
+    return [
+        f'BEGIN:{kind}',
+        f"DTSTART:{(moment + offset_from).strftime('%Y%m%dT%H%M%S')}",
+        f'TZOFFSETFROM:{_offset(offset_from)}',
+        f'TZOFFSETTO:{_offset(local.utcoffset())}',
+        f'TZNAME:{local.tzname()}',
+        f'END:{kind}',
+    ]
+
+
+@lru_cache(maxsize=16)
+def vtimezone(tzid, first_year, last_year):
+    # Content lines of a VTIMEZONE for `tzid` covering first_year..last_year
+    zone = ZoneInfo(tzid)
+    start = datetime(first_year, 1, 1, tzinfo=dt_timezone.utc)
+    end = datetime(last_year + 1, 1, 1, tzinfo=dt_timezone.utc)
+    lines = ['BEGIN:VTIMEZONE', f'TZID:{tzid}']
+    lines += _observance(zone, start, start.astimezone(zone).utcoffset())
+    for moment in _transitions(zone, start, end):
+        lines += _observance(zone, moment, (moment - timedelta(seconds=1)).astimezone(zone).utcoffset())
+    lines.append('END:VTIMEZONE')
+    return tuple(lines)
+
+
+def series_rrule(series):
+    # RRULE for a stored series, bounded by its (already resolved) recurrence end
+    last_day = timezone.make_aware(datetime.combine(series.recurrence_end, datetime.max.time().replace(microsecond=0)))
+    until = _utc(last_day)
+    if series.recurrence == 'custom':
+        return parse_rule(series.recurrence_rule).format(until=until)
+    if series.recurrence == 'monthly':
+        day = timezone.localtime(series.start_time).day
+        if day > 28:
+            # Clamped to the month's last day like the series itself (Jan 31 -> Feb 28)
+            return f"FREQ=MONTHLY;BYMONTHDAY={','.join(map(str, range(28, day + 1)))};BYSETPOS=-1;UNTIL={until}"
+        return f'FREQ=MONTHLY;BYMONTHDAY={day};UNTIL={until}'
+    return f'{LEGACY_RULES[series.recurrence]};UNTIL={until}'
+
+
+def _event(uid, start, end, stamp, summary, location='', description='', extra=()):
+    tzid = settings.TIME_ZONE
+    yield _fold('BEGIN:VEVENT')
+    yield _fold(f'UID:{uid}')
+    yield _fold(f'DTSTAMP:{_utc(stamp)}')
+    yield _fold(f'DTSTART;TZID={tzid}:{_local(start)}')
+    yield _fold(f'DTEND;TZID={tzid}:{_local(end)}')
+    yield _fold(f'SUMMARY:{_escape(summary)}')
+    if location:
+        yield _fold(f'LOCATION:{_escape(location)}')
+    if description:
+        yield _fold(f'DESCRIPTION:{_escape(description)}')
+    for line in extra:
+        yield _fold(line)
+    yield _fold('END:VEVENT')
+
+
+def _details(item, busy_only):
+    if busy_only:
+        return 'Busy', '', ''
+    return (
+        f'{item.room.name} booking',
+        ', '.join(filter(None, [item.room.name, item.room.location])),
+        f'Attendees: {item.attendees}',
+    )
+
+
+def booking_events(booking, busy_only=False):
+    summary, location, description = _details(booking, busy_only)
+    return _event(
+        f'booking-{booking.id}@{UID_DOMAIN}', booking.start_time, booking.end_time, booking.created_at,
+        summary, location, description
+    )
+
+
+def series_events(series, cancelled_dates=(), busy_only=False):
+    # One recurring VEVENT; dates cancelled on the series or on their booking rows are
+    # excluded, and moved occurrences are published as events of their own
+    summary, location, description = _details(series, busy_only)
+    exceptions = series.exceptions_by_date()
+    excluded = set(cancelled_dates) | set(exceptions)
+    if series.recurrence == 'custom':
+        excluded |= parse_rule(series.recurrence_rule).exdates
+
+    extra = [f'RRULE:{series_rrule(series)}']
+    if excluded:
+        starts = sorted(_local(series.occurrence_at(day)[0]) for day in excluded)
+        extra.append(f"EXDATE;TZID={settings.TIME_ZONE}:{','.join(starts)}")
+    yield from _event(
+        f'series-{series.id}@{UID_DOMAIN}', series.start_time, series.end_time, series.created_at,
+        summary, location, description, extra
+    )
+
+    for day, exception in sorted(exceptions.items()):
+        if not exception.cancelled and exception.start_time:
+            yield from _event(
+                f'series-{series.id}-{day:%Y%m%d}@{UID_DOMAIN}', exception.start_time, exception.end_time,
+                series.created_at, summary, location, description
+            )
+
+
+def _cancelled_series_dates(series_ids):
+    # Booking rows of stored series that were cancelled or auto-released, by series
+    dates = {}
+    rows = Booking.objects.filter(series_id__in=series_ids).filter(Q(cancelled=True) | Q(is_active=False))
+    for series_id, start in rows.values_list('series_id', 'start_time').iterator(chunk_size=FEED_CHUNK_SIZE):
+        dates.setdefault(series_id, set()).add(timezone.localtime(start).date())
+    return dates
+
+
+def calendar(name, bookings, series, busy_only=False):
+    # bookings/series: querysets, consumed lazily as the feed is written out
+    yield _fold('BEGIN:VCALENDAR')
+    yield _fold('VERSION:2.0')
+    yield _fold(f'PRODID:{PRODID}')
+    yield _fold('CALSCALE:GREGORIAN')
+    yield _fold(f'X-WR-CALNAME:{_escape(name)}')
+    yield _fold(f'X-WR-TIMEZONE:{settings.TIME_ZONE}')
+
+    since = timezone.now() - timedelta(days=FEED_LOOKBACK_DAYS)
+    for line in vtimezone(settings.TIME_ZONE, since.year - 1, since.year + VTIMEZONE_YEARS):
+        yield _fold(line)
+    series = series.filter(cancelled=False, recurrence_end__gte=since.date())
+    cancelled = _cancelled_series_dates(series.values('id'))
+    for item in series.select_related('room').prefetch_related('exceptions').iterator(chunk_size=FEED_CHUNK_SIZE):
+        yield from series_events(item, cancelled.get(item.id, ()), busy_only)
+
+    # Rows of a stored series are covered by its RRULE
+    bookings = bookings.filter(cancelled=False, is_active=True, end_time__gte=since).exclude(
+        series_id__in=BookingSeries.objects.values('id')
+    ).select_related('room').order_by('start_time')
+    for booking in bookings.iterator(chunk_size=FEED_CHUNK_SIZE):
+        yield from booking_events(booking, busy_only)
+
+    yield _fold('END:VCALENDAR')
+
+
+def user_feed(user):
+    return calendar(
+        f'Bookings for {user.get_username()}',
+        Booking.objects.filter(user=user),
+        BookingSeries.objects.filter(user=user),
+    )
+
+
+def room_feed(room):
+    # Public schedule: times only, no booking details
+    return calendar(
+        f'{room.name} schedule',
+        Booking.objects.filter(room=room),
+        BookingSeries.objects.filter(room=room),
+        busy_only=True,
+    )
@@ -0,0 +1,92 @@
+# meeting/management/commands/bench_auto_cancel.py
+import random
+import time
+from datetime import timedelta
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+from meeting.autocancel import describe, reset_checkpoint, run_sweep
+from meeting.models import Room, Booking
+
+BENCH_USERNAME = 'bench-autocancel-user'
+BENCH_LOCATION = 'bench-autocancel'
+
+
+class Command(BaseCommand):
+    help = ('Seeds synthetic bookings (a year of history plus the last hour) and times the auto-cancel sweep: '
+            'the full-history scan the old task did, a first run from the lookback window and an incremental '
+            'run from the checkpoint. Writes to the configured database; run against a scratch database only.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=5_000_000, help='Bookings to seed.')
+        parser.add_argument('--recent', type=int, default=20_000,
+                            help='Of those, bookings starting in the last hour (sweep candidates).')
+        parser.add_argument('--rooms', type=int, default=200)
+        parser.add_argument('--batch-size', type=int, default=None, help='Sweep batch size.')
+        parser.add_argument('--seed-batch-size', type=int, default=10_000)
+        parser.add_argument('--skip-seed', action='store_true', help='Reuse bookings from a previous run.')
+        parser.add_argument('--cleanup', action='store_true', help='Delete the seeded rooms and bookings and exit.')
+
+    def handle(self, *args, **options):
+        if options['cleanup']:
+            bookings = Booking.objects.filter(room__location=BENCH_LOCATION)
+            while True:
+                # In chunks: one cascading delete of millions of rows exceeds SQLite's variable limit
+                ids = list(bookings.values_list('id', flat=True)[:10_000])
+                if not ids:
+                    break
+                Booking.objects.filter(id__in=ids).delete()
+            Room.objects.filter(location=BENCH_LOCATION).delete()
+            User.objects.filter(username=BENCH_USERNAME).delete()
+            reset_checkpoint()
+            self.stdout.write(self.style.SUCCESS('Benchmark data removed.'))
+            return
+
+        if not options['skip_seed']:
+            self.seed(options['rows'], options['recent'], options['rooms'], options['seed_batch_size'])
+        self.stdout.write(f'Backend: {connection.vendor}, bookings: {Booking.objects.count()}')
+
+        # What the old task loaded every five minutes: every past unchecked booking
+        started = time.perf_counter()
+        scanned = sum(1 for _ in Booking.objects.filter(
+            checked_in=False, cancelled=False, start_time__lt=timezone.now()
+        ).values_list('id', 'start_time').iterator(chunk_size=10_000))
+        self.stdout.write(f'full-history scan: {scanned} rows loaded in {(time.perf_counter() - started) * 1000:.0f} ms')
+
+        reset_checkpoint()
+        first = run_sweep(batch_size=options['batch_size'], time_budget=float('inf'))
+        self.stdout.write(f'first sweep (lookback): {describe(first)}')
+
+        incremental = run_sweep(batch_size=options['batch_size'], time_budget=float('inf'))
+        self.stdout.write(f'incremental sweep: {describe(incremental)}')
+
+    def seed(self, rows, recent, room_count, batch_size):
+        user, _ = User.objects.get_or_create(username=BENCH_USERNAME)
+        Room.objects.bulk_create([
+            Room(name=f'Autocancel bench {i}', location=BENCH_LOCATION, capacity=10, resources='')
+            for i in range(room_count)
+        ], ignore_conflicts=True)
+        room_ids = list(Room.objects.filter(location=BENCH_LOCATION).values_list('id', flat=True))
+
+        now = timezone.now()
+        started = time.perf_counter()
+        for offset in range(0, rows, batch_size):
+            batch = []
+            for number in range(offset, min(offset + batch_size, rows)):
+                if number < recent:
+                    start = now - timedelta(minutes=random.randint(0, 60))
+                else:
+                    start = now - timedelta(minutes=random.randint(61, 60 * 24 * 365))
+                batch.append(Booking(
+                    user=user,
+                    room_id=random.choice(room_ids),
+                    start_time=start,
+                    end_time=start + timedelta(minutes=random.choice([30, 60, 90])),
+                    attendees=1,
+                    cancelled=random.random() < 0.1,
+                    checked_in=random.random() < 0.7,
+                ))
+            Booking.objects.bulk_create(batch)
+            self.stdout.write(f'Seeded {offset + len(batch)}/{rows} bookings', ending='\r')
+        self.stdout.write(f'\nSeeding took {time.perf_counter() - started:.1f}s')
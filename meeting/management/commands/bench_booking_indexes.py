@@ -0,0 +1,156 @@
+# meeting/management/commands/bench_booking_indexes.py
+import random
+import time
+from datetime import timedelta
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+from meeting.models import Room, Booking
+
+BENCH_USERNAME = 'bench-index-user'
+BENCH_LOCATION = 'bench-index'
+
+# Indexes added in 0002_booking_overlap_indexes; dropped for the "before" run
+BENCH_INDEX_NAMES = [
+    'booking_room_conflict_idx',
+    'booking_active_window_idx',
+    'booking_checkin_sweep_idx',
+    'booking_room_open_idx',
+    'booking_active_open_idx',
+    'booking_unchecked_idx',
+]
+
+
+class Command(BaseCommand):
+    help = ('Seeds synthetic bookings and prints EXPLAIN plans and timings for the booking overlap '
+            'queries with and without the composite/partial indexes. Run against a scratch database only.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=2_000_000, help='Bookings to seed.')
+        parser.add_argument('--rooms', type=int, default=200, help='Rooms to spread bookings over.')
+        parser.add_argument('--batch-size', type=int, default=10_000)
+        parser.add_argument('--repeat', type=int, default=20, help='Executions per query when timing.')
+        parser.add_argument('--skip-seed', action='store_true', help='Reuse bookings from a previous run.')
+        parser.add_argument('--cleanup', action='store_true', help='Delete the seeded rooms and bookings and exit.')
+
+    def handle(self, *args, **options):
+        if options['cleanup']:
+            Room.objects.filter(location=BENCH_LOCATION).delete()  # Cascades to bookings
+            User.objects.filter(username=BENCH_USERNAME).delete()
+            self.stdout.write(self.style.SUCCESS('Benchmark data removed.'))
+            return
+
+        if not options['skip_seed']:
+            self.seed(options['rows'], options['rooms'], options['batch_size'])
+            self.analyze()
+
+        rooms = list(Room.objects.filter(location=BENCH_LOCATION).values_list('id', flat=True))
+        if not rooms:
+            self.stderr.write('No benchmark rooms found; run without --skip-seed first.')
+            return
+
+        self.stdout.write(f'Backend: {connection.vendor}, bookings: {Booking.objects.count()}')
+
+        after = self.run_queries(rooms, options['repeat'], 'with indexes')
+        dropped = self.drop_indexes()
+        self.analyze()
+        try:
+            before = self.run_queries(rooms, options['repeat'], 'without indexes')
+        finally:
+            self.restore_indexes(dropped)
+            self.analyze()
+
+        self.stdout.write('\nSummary (mean ms per query):')
+        for name in after:
+            speedup = before[name] / after[name] if after[name] else float('inf')
+            self.stdout.write(f'  {name:<22} before {before[name]:9.3f}  after {after[name]:9.3f}  x{speedup:.1f}')
+
+    def seed(self, rows, room_count, batch_size):
+        user, _ = User.objects.get_or_create(username=BENCH_USERNAME)
+        rooms = [
+            Room(name=f'Bench {i}', location=BENCH_LOCATION, capacity=random.randint(2, 30), resources='')
+            for i in range(room_count)
+        ]
+        Room.objects.bulk_create(rooms, ignore_conflicts=True)
+        room_ids = list(Room.objects.filter(location=BENCH_LOCATION).values_list('id', flat=True))
+
+        # Spread bookings over two years around now, 30-180 minutes long
+        origin = timezone.now() - timedelta(days=365)
+        started = time.perf_counter()
+        for offset in range(0, rows, batch_size):
+            batch = []
+            for _ in range(min(batch_size, rows - offset)):
+                start = origin + timedelta(minutes=15 * random.randint(0, 4 * 24 * 730))
+                cancelled = random.random() < 0.1
+                batch.append(Booking(
+                    user=user,
+                    room_id=random.choice(room_ids),
+                    start_time=start,
+                    end_time=start + timedelta(minutes=random.choice([30, 60, 90, 120, 180])),
+                    attendees=1,
+                    cancelled=cancelled,
+                    is_active=not cancelled,
+                    checked_in=random.random() < 0.7,
+                ))
+            Booking.objects.bulk_create(batch)
+            self.stdout.write(f'Seeded {offset + len(batch)}/{rows} bookings', ending='\r')
+        self.stdout.write(f'\nSeeding took {time.perf_counter() - started:.1f}s')
+
+    def analyze(self):
+        # Refresh planner statistics so the plans reflect the seeded distribution
+        table = connection.ops.quote_name(Booking._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.execute(f'ANALYZE TABLE {table}' if connection.vendor == 'mysql' else f'ANALYZE {table}')
+
+    def queries(self, rooms):
+        now = timezone.now()
+        room_id = random.choice(rooms)
+        start = now + timedelta(hours=random.randint(1, 24 * 30))
+        end = start + timedelta(hours=1)
+        return {
+            # Booking.is_conflicting
+            'conflict check': Booking.objects.filter(
+                room_id=room_id, start_time__lt=end, end_time__gt=start, cancelled=False
+            ),
+            # AvailableRoomsAPIView (ORM fallback path)
+            'availability window': Booking.objects.filter(
+                is_active=True, start_time__lt=end, end_time__gt=start
+            ).values_list('room_id', flat=True),
+            # edit_recurring_date
+            'exact slot lookup': Booking.objects.filter(room_id=room_id, start_time=start, end_time=end),
+            # Auto-cancel jobs
+            'auto-cancel sweep': Booking.objects.filter(
+                checked_in=False, cancelled=False,
+                start_time__lte=now - timedelta(minutes=10), start_time__gt=now - timedelta(hours=1)
+            ).values_list('id', flat=True),
+        }
+
+    def run_queries(self, rooms, repeat, label):
+        self.stdout.write(self.style.MIGRATE_HEADING(f'\n=== {label} ==='))
+        timings = {}
+        for name, queryset in self.queries(rooms).items():
+            self.stdout.write(f'\n-- {name}\n{queryset.explain()}')
+            total = 0.0
+            for _ in range(repeat):
+                queryset = self.queries(rooms)[name]  # Fresh parameters each time
+                started = time.perf_counter()
+                list(queryset[:1000])
+                total += time.perf_counter() - started
+            timings[name] = total / repeat * 1000
+            self.stdout.write(f'mean {timings[name]:.3f} ms over {repeat} runs')
+        return timings
+
+    def drop_indexes(self):
+        dropped = []
+        with connection.schema_editor() as editor:
+            for index in Booking._meta.indexes:
+                if index.name in BENCH_INDEX_NAMES:
+                    editor.remove_index(Booking, index)
+                    dropped.append(index)
+        return dropped
+
+    def restore_indexes(self, indexes):
+        with connection.schema_editor() as editor:
+            for index in indexes:
+                editor.add_index(Booking, index)
@@ -0,0 +1,57 @@
+# meeting/management/commands/bench_recurrence.py
+import time
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+from uuid import uuid4
+from django.core.management.base import BaseCommand
+from meeting.utils import SeriesDateExpander, expand_recurrence, iter_recurrence_dates
+
+
+class Command(BaseCommand):
+    help = ('Benchmarks recurrence date expansion for the rows of multi-year series, '
+            'per-row expansion (one list per booking row) vs the shared cached expansion. '
+            'No database access.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--years', type=int, default=3)
+        parser.add_argument('--series', type=int, default=20)
+        parser.add_argument('--rule', choices=['daily', 'weekly', 'monthly'], default='daily')
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def handle(self, *args, **options):
+        start = date(2025, 1, 1)
+        end = start + timedelta(days=365 * options['years'])
+        rows = []
+        for _ in range(options['series']):
+            series_id = uuid4()
+            for day in iter_recurrence_dates(start, options['rule'], end):
+                rows.append(SimpleNamespace(
+                    start_time=datetime.combine(day, datetime.min.time()),
+                    recurrence=options['rule'], recurrence_end=end, series_id=series_id
+                ))
+        self.stdout.write(f"{options['series']} {options['rule']} series over {options['years']} years, {len(rows)} rows")
+
+        def per_row():
+            # Every row expands the rule from its own date
+            for row in rows:
+                list(iter_recurrence_dates(row.start_time.date(), row.recurrence, row.recurrence_end))
+
+        def shared():
+            expand_recurrence.cache_clear()
+            expander = SeriesDateExpander()
+            for row in rows:
+                expander.dates_for(row)
+
+        for label, run in (('per-row', per_row), ('shared', shared)):
+            best = None
+            for _ in range(options['repeat']):
+                started = time.perf_counter()
+                run()
+                elapsed = time.perf_counter() - started
+                best = elapsed if best is None else min(best, elapsed)
+            self.stdout.write(f"{label:>8}: best of {options['repeat']}: {best * 1000:.1f} ms")
+
+        expand_recurrence.cache_clear()
+        started = time.perf_counter()
+        expand_recurrence(start, options['rule'], end)
+        self.stdout.write(f"   cold expansion of one series: {(time.perf_counter() - started) * 1e6:.0f} us")
@@ -0,0 +1,48 @@
+# meeting/management/commands/bench_room_serialization.py
+import time
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+from meeting.models import Room
+from meeting.renderers import FastJSONRenderer, orjson
+from meeting.serializers import RoomSerializer, room_rows
+
+BENCH_LOCATION = 'bench-serialization'
+
+
+class Command(BaseCommand):
+    help = ('Compares RoomSerializer + JSONRenderer with the lean values_list + FastJSONRenderer path '
+            'for room listings. Rooms are created inside a transaction that is rolled back.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='10,100,1000', help='Comma-separated room counts.')
+        parser.add_argument('--repeat', type=int, default=50)
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options['sizes'].split(',')]
+        self.stdout.write(f"JSON encoder: {'orjson' if orjson else 'json (install orjson for the fast path)'}")
+        self.stdout.write(f"{'rooms':>6} {'serializer ms':>14} {'lean ms':>9} {'speedup':>8}")
+
+        with transaction.atomic():
+            Room.objects.bulk_create([
+                Room(name=f'Bench {i}', location=BENCH_LOCATION, capacity=i % 30 + 1, resources='projector, whiteboard')
+                for i in range(max(sizes))
+            ])
+            rooms = Room.objects.filter(location=BENCH_LOCATION).order_by('id')
+
+            for size in sizes:
+                queryset = rooms[:size]
+                serializer_ms = self.measure(
+                    lambda: JSONRenderer().render(RoomSerializer(queryset.all(), many=True).data), options['repeat'])
+                lean_ms = self.measure(
+                    lambda: FastJSONRenderer().render(room_rows(queryset.all())), options['repeat'])
+                self.stdout.write(f"{size:>6} {serializer_ms:>14.3f} {lean_ms:>9.3f} {serializer_ms / lean_ms:>7.1f}x")
+
+            transaction.set_rollback(True)
+
+    def measure(self, func, repeat):
+        func()  # Warm-up
+        started = time.perf_counter()
+        for _ in range(repeat):
+            func()
+        return (time.perf_counter() - started) / repeat * 1000
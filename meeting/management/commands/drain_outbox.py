@@ -0,0 +1,37 @@
+# meeting/management/commands/drain_outbox.py
+import time
+from django.core.management.base import BaseCommand
+from meeting.outbox import drain, queue_depth
+
+BACKENDS = {
+    'console': 'django.core.mail.backends.console.EmailBackend',
+    'locmem': 'django.core.mail.backends.locmem.EmailBackend',
+    'smtp': 'django.core.mail.backends.smtp.EmailBackend',
+}
+
+
+class Command(BaseCommand):
+    help = ('Sends queued outbox emails in-process, without a Celery worker. '
+            'With --loop it keeps polling, e.g. "drain_outbox --backend console --loop 5" for local development.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--backend', default=None,
+                            help='console, locmem, smtp or a dotted backend path; defaults to EMAIL_BACKEND.')
+        parser.add_argument('--batch-size', type=int, default=None, help='Messages per mail connection.')
+        parser.add_argument('--time-budget', type=float, default=None, help='Seconds per drain.')
+        parser.add_argument('--loop', type=float, default=None, metavar='SECONDS',
+                            help='Drain again every SECONDS until interrupted.')
+
+    def handle(self, *args, **options):
+        backend = BACKENDS.get(options['backend'], options['backend'])
+        while True:
+            result = drain(batch_size=options['batch_size'], time_budget=options['time_budget'], backend=backend)
+            counts, age = queue_depth()
+            self.stdout.write(
+                f"{result['sent']} sent, {result['retried']} to retry, {result['failed']} failed "
+                f"({result['elapsed_ms']:.0f} ms); queue: {counts['pending']} pending, {counts['failed']} failed, "
+                f"oldest pending {age:.0f}s"
+            )
+            if options['loop'] is None:
+                return
+            time.sleep(options['loop'])
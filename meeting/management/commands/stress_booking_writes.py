@@ -0,0 +1,97 @@
+# meeting/management/commands/stress_booking_writes.py
+import random
+import threading
+import time
+from datetime import timedelta
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection
+from django.utils import timezone
+from meeting.models import Booking, Room
+
+
+class Command(BaseCommand):
+    help = ('Books a few contended slots from many threads at once and reports throughput and '
+            'double-bookings. Writes to the configured database; use a disposable one. '
+            '--unsafe skips the room lock to show the race it prevents.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--attempts', type=int, default=50, help='Booking attempts per thread.')
+        parser.add_argument('--rooms', type=int, default=4)
+        parser.add_argument('--slots', type=int, default=20, help='Distinct (overlapping) slots per room.')
+        parser.add_argument('--unsafe', action='store_true', help='Check then save without locking the room.')
+
+    def handle(self, *args, **options):
+        user, _ = User.objects.get_or_create(username='stress-writer')
+        rooms = [
+            Room.objects.get_or_create(name=f'stress-room-{number}', location='stress', defaults={'capacity': 10})[0]
+            for number in range(options['rooms'])
+        ]
+        Booking.objects.filter(room__in=rooms).delete()
+
+        origin = (timezone.now() + timedelta(days=1)).replace(minute=0, second=0, microsecond=0)
+        # Half-hour starts with one-hour bookings, so neighbouring slots overlap too
+        slots = [(origin + timedelta(minutes=30 * n), origin + timedelta(minutes=30 * n + 60))
+                 for n in range(options['slots'])]
+        room_ids = [room.id for room in rooms]
+        results = {'reserved': 0, 'rejected': 0, 'errors': 0}
+        lock = threading.Lock()
+        start_barrier = threading.Barrier(options['threads'])
+
+        def worker(seed):
+            rng = random.Random(seed)
+            counts = {'reserved': 0, 'rejected': 0, 'errors': 0}
+            start_barrier.wait()
+            try:
+                for _ in range(options['attempts']):
+                    start, end = rng.choice(slots)
+                    booking = Booking(user=user, room_id=rng.choice(room_ids), start_time=start, end_time=end, attendees=1)
+                    try:
+                        if options['unsafe']:
+                            saved = not booking.is_conflicting()
+                            if saved:
+                                time.sleep(0.001)  # Widen the check-to-insert gap like a slow request would
+                                booking.save()
+                        else:
+                            saved = Booking.reserve(booking)
+                    except OperationalError:
+                        counts['errors'] += 1  # e.g. SQLite's lock timeout
+                        continue
+                    counts['reserved' if saved else 'rejected'] += 1
+            finally:
+                connection.close()  # Each thread has its own connection
+            with lock:
+                for key, value in counts.items():
+                    results[key] += value
+
+        threads = [threading.Thread(target=worker, args=(seed,)) for seed in range(options['threads'])]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        double_bookings = self.count_overlaps(rooms)
+        attempts = options['threads'] * options['attempts']
+        self.stdout.write(
+            f"{options['threads']} threads x {options['attempts']} attempts on {len(rooms)} rooms "
+            f"({'unlocked' if options['unsafe'] else 'locked'})"
+        )
+        self.stdout.write(f"reserved: {results['reserved']}, rejected: {results['rejected']}, errors: {results['errors']}")
+        self.stdout.write(f"throughput: {attempts / elapsed:.0f} attempts/s ({elapsed * 1000:.0f} ms)")
+        self.stdout.write(f"double-bookings: {double_bookings}")
+
+    def count_overlaps(self, rooms):
+        # Bookings that start before the latest end seen so far in their room
+        overlaps = 0
+        for room in rooms:
+            latest_end = None
+            for start, end in Booking.objects.filter(room=room, cancelled=False).order_by('start_time').values_list(
+                'start_time', 'end_time'
+            ):
+                if latest_end is not None and start < latest_end:
+                    overlaps += 1
+                latest_end = end if latest_end is None or end > latest_end else latest_end
+        return overlaps
@@ -0,0 +1,54 @@
+# matrix.py
+# Rooms x time-slots occupancy matrix for whole-day / whole-week availability grids.
+import base64
+import numpy as np
+
+ENCODINGS = ('bitset', 'rle')
+
+
+def occupancy_matrix(room_ids, bookings, start, end, slot):
+    # room_ids: room IDs in row order; bookings: iterable of (room_id, start_time, end_time).
+    # Returns a (rooms, slots) boolean array, True where any booking touches the slot.
+    slot_seconds = slot.total_seconds()
+    slot_count = int(np.ceil((end - start).total_seconds() / slot_seconds))
+    matrix = np.zeros((len(room_ids), slot_count), dtype=bool)
+
+    bookings = list(bookings)
+    if not bookings or not room_ids:
+        return matrix
+
+    order = np.argsort(room_ids)
+    sorted_ids = np.asarray(room_ids)[order]
+    booking_rooms = np.fromiter((b[0] for b in bookings), dtype=np.int64, count=len(bookings))
+    positions = np.searchsorted(sorted_ids, booking_rooms)
+    positions = np.clip(positions, 0, len(sorted_ids) - 1)
+    known = sorted_ids[positions] == booking_rooms
+
+    origin = start.timestamp()
+    starts = np.fromiter((b[1].timestamp() for b in bookings), dtype=np.float64, count=len(bookings))
+    ends = np.fromiter((b[2].timestamp() for b in bookings), dtype=np.float64, count=len(bookings))
+    first = np.clip(np.floor((starts - origin) / slot_seconds), 0, slot_count).astype(np.int64)
+    last = np.clip(np.ceil((ends - origin) / slot_seconds), 0, slot_count).astype(np.int64)
+    keep = known & (first < last)
+
+    # Difference array: +1 where a booking starts covering slots, -1 after it stops
+    rows = order[positions[keep]]
+    diff = np.zeros((len(room_ids), slot_count + 1), dtype=np.int32)
+    np.add.at(diff, (rows, first[keep]), 1)
+    np.add.at(diff, (rows, last[keep]), -1)
+    matrix[:] = np.cumsum(diff[:, :-1], axis=1) > 0
+    return matrix
+
+
+def encode_row(row, encoding):
+    if encoding == 'bitset':
+        # One bit per slot, most significant bit first, base64 encoded
+        return base64.b64encode(np.packbits(row).tobytes()).decode('ascii')
+
+    # Run lengths alternating free/busy, always starting with a (possibly empty) free run
+    boundaries = np.flatnonzero(np.diff(row.astype(np.int8))) + 1
+    edges = np.concatenate(([0], boundaries, [len(row)]))
+    runs = np.diff(edges).tolist()
+    if len(row) and row[0]:
+        runs.insert(0, 0)
+    return runs
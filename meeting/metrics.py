@@ -0,0 +1,149 @@
+# metrics.py
+# In-process metrics registry rendered in the Prometheus text exposition format.
+import threading
+from bisect import bisect_left
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+
+class Histogram:
+    def __init__(self, name, documentation, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._series = {}  # labels tuple -> [bucket counts..., count, sum]
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        position = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 2)
+            series[position] += 1  # position == len(buckets) is the +Inf overflow slot
+            series[-1] += value
+
+    def samples(self):
+        with self._lock:
+            snapshot = {key: list(series) for key, series in self._series.items()}
+        for key, series in sorted(snapshot.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                yield f'{self.name}_bucket', key + (('le', format_number(bound)),), cumulative
+            cumulative += series[len(self.buckets)]
+            yield f'{self.name}_bucket', key + (('le', '+Inf'),), cumulative
+            yield f'{self.name}_count', key, cumulative
+            yield f'{self.name}_sum', key, series[-1]
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        lines.extend(format_sample(name, labels, value) for name, labels, value in self.samples())
+        return lines
+
+
+class Collector:
+    # Values read at scrape time from a callback returning {labels tuple: value}
+    def __init__(self, name, documentation, metric_type, callback):
+        self.name = name
+        self.documentation = documentation
+        self.metric_type = metric_type
+        self.callback = callback
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.metric_type}']
+        lines.extend(format_sample(self.name, labels, value) for labels, value in sorted(self.callback().items()))
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics[metric.name] = metric
+        return metric
+
+    def histogram(self, name, documentation, buckets=DEFAULT_BUCKETS):
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = Histogram(name, documentation, buckets)
+            return self._metrics[name]
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+def format_number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def format_sample(name, labels, value):
+    if labels:
+        rendered = ','.join(
+            '{}="{}"'.format(key, str(val).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+            for key, val in labels
+        )
+        return f'{name}{{{rendered}}} {format_number(value)}'
+    return f'{name} {format_number(value)}'
+
+
+registry = Registry()
+
+request_duration = registry.histogram(
+    'meeting_request_duration_seconds', 'Wall time per request, by view.')
+request_queries = registry.histogram(
+    'meeting_request_db_queries', 'ORM queries executed per request, by view.', QUERY_COUNT_BUCKETS)
+request_db_duration = registry.histogram(
+    'meeting_request_db_duration_seconds', 'Total SQL time per request, by view.')
+
+
+def _availability_cache_counts():
+    from .cache import cache_stats
+
+    return {(('result', result),): count for result, count in cache_stats().items()}
+
+
+registry.register(Collector(
+    'meeting_availability_cache_requests_total',
+    'Availability response cache lookups, by result.',
+    'counter',
+    _availability_cache_counts,
+))
+
+
+def _outbox_depth():
+    from .outbox import queue_depth
+
+    counts, _ = queue_depth()
+    return {(('status', status),): count for status, count in counts.items()}
+
+
+def _outbox_oldest_pending():
+    from .outbox import queue_depth
+
+    _, age = queue_depth()
+    return {(): age}
+
+
+registry.register(Collector(
+    'meeting_outbox_messages',
+    'Outgoing emails not yet sent, by status (failed: gave up after retries).',
+    'gauge',
+    _outbox_depth,
+))
+registry.register(Collector(
+    'meeting_outbox_oldest_pending_age_seconds',
+    'Age of the oldest pending outgoing email.',
+    'gauge',
+    _outbox_oldest_pending,
+))
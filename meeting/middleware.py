@@ -0,0 +1,48 @@
+# middleware.py
+import time
+from contextlib import ExitStack
+from django.db import connections
+from .metrics import request_duration, request_queries, request_db_duration
+
+
+class QueryCounter:
+    # Installed with connection.execute_wrapper(); works with DEBUG off
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.duration += time.perf_counter() - started
+
+
+def view_path(func):
+    # Dotted path of an unnamed view; class-based views by their class
+    func = getattr(func, 'view_class', func)
+    return f'{func.__module__}.{func.__qualname__}'
+
+
+class RequestMetricsMiddleware:
+    # Records per-view wall time, query count and SQL time into the metrics registry
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        counter = QueryCounter()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(counter))
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - started
+
+        match = getattr(request, 'resolver_match', None)
+        view = (match.view_name or view_path(match.func)) if match else 'unresolved'
+        request_duration.observe(elapsed, view=view)
+        request_queries.observe(counter.count, view=view)
+        request_db_duration.observe(counter.duration, view=view)
+        return response
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.30 on 2026-10-17 06:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('meeting', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['room', 'start_time', 'end_time', 'cancelled'], name='booking_room_conflict_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['is_active', 'end_time', 'start_time'], name='booking_active_window_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['checked_in', 'cancelled', 'start_time'], name='booking_checkin_sweep_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(condition=models.Q(('cancelled', False)), fields=['room', 'start_time', 'end_time'], name='booking_room_open_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['end_time', 'start_time'], name='booking_active_open_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(condition=models.Q(('cancelled', False), ('checked_in', False)), fields=['start_time'], name='booking_unchecked_idx'),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 4.2.30 on 2026-10-17 06:25
+
+from django.db import migrations, models
+
+
+def populate_resource_tags(apps, schema_editor):
+    # Splits the existing free-text Room.resources into normalized tags
+    Room = apps.get_model('meeting', 'Room')
+    Resource = apps.get_model('meeting', 'Resource')
+    RoomTag = Room.resource_tags.through
+
+    tags = {}
+    links = []
+    for room_id, resources in Room.objects.values_list('id', 'resources').iterator():
+        names = []
+        for name in (resources or '').split(','):
+            name = ' '.join(name.split()).lower()
+            if name and name not in names:
+                names.append(name)
+        for name in names:
+            if name not in tags:
+                tags[name] = Resource.objects.get_or_create(name=name)[0].id
+            links.append(RoomTag(room_id=room_id, resource_id=tags[name]))
+
+    RoomTag.objects.bulk_create(links, batch_size=1000, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('meeting', '0002_booking_overlap_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Resource',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='room',
+            name='resource_tags',
+            field=models.ManyToManyField(blank=True, related_name='rooms', to='meeting.resource'),
+        ),
+        migrations.RunPython(populate_resource_tags, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,82 @@
+# Generated by Django 4.2.30 on 2026-10-17 06:31
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+def create_series_for_existing_bookings(apps, schema_editor):
+    # Existing series are fully materialized: one Booking row per occurrence
+    Booking = apps.get_model('meeting', 'Booking')
+    BookingSeries = apps.get_model('meeting', 'BookingSeries')
+
+    firsts = (
+        Booking.objects.filter(series_id__isnull=False, recurrence_end__isnull=False)
+        .values('series_id')
+        .annotate(first_id=models.Min('id'))
+        .values_list('first_id', flat=True)
+    )
+    series = []
+    for booking in Booking.objects.filter(id__in=list(firsts)).iterator():
+        series.append(BookingSeries(
+            id=booking.series_id,
+            user_id=booking.user_id,
+            room_id=booking.room_id,
+            start_time=booking.start_time,
+            end_time=booking.end_time,
+            recurrence=booking.recurrence,
+            recurrence_end=booking.recurrence_end,
+            attendees=booking.attendees,
+            required_resources=booking.required_resources,
+            materialized_until=booking.recurrence_end,
+        ))
+    BookingSeries.objects.bulk_create(series, batch_size=1000, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('meeting', '0003_room_resource_tags'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookingSeries',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('start_time', models.DateTimeField()),
+                ('end_time', models.DateTimeField()),
+                ('recurrence', models.CharField(choices=[('none', 'Does not repeat'), ('daily', 'Daily'), ('weekly', 'Weekly'), ('monthly', 'Monthly')], max_length=10)),
+                ('recurrence_end', models.DateField()),
+                ('attendees', models.PositiveIntegerField()),
+                ('required_resources', models.TextField(blank=True, null=True)),
+                ('materialized_until', models.DateField()),
+                ('cancelled', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('room', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='series', to='meeting.room')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SeriesException',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('original_date', models.DateField()),
+                ('start_time', models.DateTimeField(blank=True, null=True)),
+                ('end_time', models.DateTimeField(blank=True, null=True)),
+                ('cancelled', models.BooleanField(default=False)),
+                ('booking', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='meeting.booking')),
+                ('series', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='exceptions', to='meeting.bookingseries')),
+            ],
+            options={
+                'unique_together': {('series', 'original_date')},
+            },
+        ),
+        migrations.AddIndex(
+            model_name='bookingseries',
+            index=models.Index(fields=['room', 'recurrence_end', 'materialized_until'], name='series_room_window_idx'),
+        ),
+        migrations.RunPython(create_series_for_existing_bookings, migrations.RunPython.noop),
+    ]
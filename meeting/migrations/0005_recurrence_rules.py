@@ -0,0 +1,33 @@
+# Generated by Django 4.2.30 on 2026-10-17 06:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('meeting', '0004_booking_series'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bookingseries',
+            name='recurrence_rule',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.AlterField(
+            model_name='booking',
+            name='recurrence',
+            field=models.CharField(choices=[('none', 'Does not repeat'), ('daily', 'Daily'), ('weekly', 'Weekly'), ('monthly', 'Monthly'), ('custom', 'Custom (RRULE)')], default='none', max_length=10),
+        ),
+        migrations.AlterField(
+            model_name='booking',
+            name='recurrence_rule',
+            field=models.TextField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='bookingseries',
+            name='recurrence',
+            field=models.CharField(choices=[('none', 'Does not repeat'), ('daily', 'Daily'), ('weekly', 'Weekly'), ('monthly', 'Monthly'), ('custom', 'Custom (RRULE)')], max_length=10),
+        ),
+    ]
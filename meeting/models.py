@@ -1,16 +1,61 @@
-from django.db import models
+from django.db import connections, models, transaction
 from django.contrib.auth.models import User
 from django.utils import timezone
-from datetime import timedelta
+from datetime import timedelta, datetime, date
+import heapq
+import uuid
 from django.conf import settings
 from django.utils.timezone import now
+from django.db.models import BooleanField, Case, CharField, Count, F, Value, When
+from .utils import parse_resources, iter_recurrence_dates, count_recurrence_dates, reversed_recurrence_dates
+
+
+class Resource(models.Model):
+    name = models.CharField(max_length=255, unique=True)  # Normalized: trimmed and lower-case
+
+    def __str__(self):
+        return self.name
+
+
+class RoomQuerySet(models.QuerySet):
+    def with_resources(self, names):
+        # Rooms tagged with every requested resource: one indexed GROUP BY over the join table
+        names = parse_resources(names)
+        if not names:
+            return self
+
+        matching = (
+            Room.resource_tags.through.objects
+            .filter(resource__name__in=names)
+            .values('room_id')
+            .annotate(matched=Count('resource_id'))
+            .filter(matched=len(names))
+            .values('room_id')
+        )
+        return self.filter(id__in=matching)
+
+    def lock_for_booking(self, room_ids):
+        # Serializes booking writers per room until the surrounding transaction ends, so a
+        # conflict check and the insert after it can't interleave with another writer's.
+        # Rooms are locked in id order, so writers taking several rooms can't deadlock.
+        room_ids = sorted(set(room_ids))
+        if connections[self.db].features.has_select_for_update:
+            list(self.select_for_update().filter(id__in=room_ids).order_by('id').values_list('id', flat=True))
+        else:
+            # SQLite has no row locks: a no-op UPDATE takes the database write lock up front
+            # instead (serializing all writers, not just this room's)
+            self.filter(id__in=room_ids).update(id=F('id'))
+
 
 class Room(models.Model):
     name = models.CharField(max_length=100)
     location = models.CharField(max_length=100)
     capacity = models.PositiveIntegerField()
-    resources = models.CharField(max_length=255)  
+    resources = models.CharField(max_length=255)  # Free text as entered; mirrored into resource_tags
     is_available = models.BooleanField(default=True)
+    resource_tags = models.ManyToManyField(Resource, blank=True, related_name='rooms')
+
+    objects = RoomQuerySet.as_manager()
 
     class Meta:
         unique_together = ('name', 'location')  # Ensures uniqueness at the DB level
@@ -18,6 +63,66 @@ class Room(models.Model):
     def __str__(self):
         return f"{self.name} - {self.location}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._synced_resources = instance.__dict__.get('resources')
+        return instance
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # Only touch the tag table when the resources text actually changed
+        if self.resources != getattr(self, '_synced_resources', None):
+            self.sync_resource_tags()
+
+    @property
+    def resource_names(self):
+        return set(parse_resources(self.resources))
+
+    def sync_resource_tags(self):
+        names = parse_resources(self.resources)
+        Resource.objects.bulk_create([Resource(name=name) for name in names], ignore_conflicts=True)
+        self.resource_tags.set(Resource.objects.filter(name__in=names))
+        self._synced_resources = self.resources
+
+
+CHECKIN_WINDOW = timedelta(minutes=10)
+BOOKING_STATUSES = ('Active', 'Checked In', 'Missed', 'Cancelled')
+
+
+class BookingQuerySet(models.QuerySet):
+    def with_status(self, at=None):
+        # display_status and checkin_allowed computed by the database as of `at` (default now),
+        # so they can be filtered and counted like columns
+        at = at or timezone.now()
+        return self.annotate(
+            display_status=Case(
+                When(cancelled=True, then=Value('Cancelled')),
+                When(checked_in=True, then=Value('Checked In')),
+                When(end_time__lt=at, then=Value('Missed')),
+                default=Value('Active'),
+                output_field=CharField(),
+            ),
+            checkin_allowed=Case(
+                When(
+                    checked_in=False, cancelled=False, start_time__lte=at, start_time__gte=at - CHECKIN_WINDOW,
+                    then=Value(True)
+                ),
+                default=Value(False),
+                output_field=BooleanField(),
+            ),
+        )
+
+    def shift(self, start_offset, end_offset, **values):
+        # One UPDATE moving every row by the offsets (each occurrence keeps its own date)
+        # and setting `values`. Skips post_save: callers run signals.bookings_changed_in_bulk()
+        # with moved_ids, which also reschedules check-in expiry
+        return self.update(
+            start_time=F('start_time') + start_offset,
+            end_time=F('end_time') + end_offset,
+            **values
+        )
+
 
 class Booking(models.Model):
     RECUR_CHOICES = [
@@ -25,6 +130,7 @@ class Booking(models.Model):
         ('daily', 'Daily'),
         ('weekly', 'Weekly'),
         ('monthly', 'Monthly'),
+        ('custom', 'Custom (RRULE)'),
     ]
 
     user = models.ForeignKey(User, on_delete=models.CASCADE)
@@ -46,7 +152,34 @@ class Booking(models.Model):
         on_delete=models.SET_NULL, related_name='cancelled_bookings'
     )  
     recurrence_group = models.IntegerField(null=True, blank=True)
-    recurrence_rule = models.CharField(max_length=100, blank=True, null=True)  # e.g. daily, weekly, etc
+    recurrence_rule = models.TextField(blank=True, null=True)  # RFC 5545 RRULE (+ EXDATE) when recurrence is 'custom'
+
+    objects = BookingQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Composite indexes usable on every backend (equality columns first, then the range);
+            # end_time leads the availability index since upcoming windows select on end_time > start
+            models.Index(fields=['room', 'start_time', 'end_time', 'cancelled'], name='booking_room_conflict_idx'),
+            models.Index(fields=['is_active', 'end_time', 'start_time'], name='booking_active_window_idx'),
+            models.Index(fields=['checked_in', 'cancelled', 'start_time'], name='booking_checkin_sweep_idx'),
+            # Partial indexes; skipped on backends without support for them (MySQL)
+            models.Index(
+                fields=['room', 'start_time', 'end_time'],
+                condition=models.Q(cancelled=False),
+                name='booking_room_open_idx',
+            ),
+            models.Index(
+                fields=['end_time', 'start_time'],
+                condition=models.Q(is_active=True),
+                name='booking_active_open_idx',
+            ),
+            models.Index(
+                fields=['start_time'],
+                condition=models.Q(checked_in=False, cancelled=False),
+                name='booking_unchecked_idx',
+            ),
+        ]
  
 
     def __str__(self):
@@ -54,11 +187,67 @@ class Booking(models.Model):
 
     def is_conflicting(self):
         return Booking.objects.filter(
-            room=self.room,
+            room_id=self.room_id,
             start_time__lt=self.end_time,
             end_time__gt=self.start_time,
             cancelled=False  # Ignore cancelled bookings
-        ).exclude(id=self.id).exists()
+        ).exclude(id=self.id).exists() or bool(
+            BookingSeries.lazy_rows(self.start_time, self.end_time, room=self.room_id)
+        )
+
+    @classmethod
+    def reserve(cls, booking):
+        # Saves `booking` unless it overlaps another booking in its room; returns whether it was saved.
+        # The room lock makes the check and the insert atomic with respect to other writers.
+        with transaction.atomic():
+            Room.objects.lock_for_booking([booking.room_id])
+            if booking.is_conflicting():
+                return False
+            booking.save()
+        return True
+
+    @classmethod
+    def find_conflicts(cls, room, slots, exclude_ids=(), exclude_series=()):
+        # Returns every (start, end) slot that overlaps a non-cancelled booking in `room`.
+        # One query loads the room's bookings across the whole span; a sweep over both
+        # start-sorted lists then finds the overlaps in memory.
+        slots = sorted(slots)
+        if not slots:
+            return []
+
+        span_end = max(end for _, end in slots)
+        existing = cls.objects.filter(
+            room=room,
+            start_time__lt=span_end,
+            end_time__gt=slots[0][0],
+            cancelled=False
+        ).exclude(id__in=exclude_ids).order_by('start_time').values_list('start_time', 'end_time')
+
+        # Occurrences of other series beyond their materialized horizon count as bookings too
+        lazy = sorted(
+            (start, end) for _, start, end, series_id in BookingSeries.lazy_rows(slots[0][0], span_end, room=room)
+            if series_id not in exclude_series
+        )
+        existing = heapq.merge(existing, lazy) if lazy else iter(existing)
+
+        conflicts = []
+        # min-heap by start of bookings starting before the latest slot end seen so far. Slots
+        # differ in length, so an entry pushed for a long slot may start after a later short one ends.
+        active = []
+        pending = next(existing, None)
+
+        for slot_start, slot_end in slots:
+            while pending is not None and pending[0] < slot_end:
+                heapq.heappush(active, pending)
+                pending = next(existing, None)
+            # Bookings ending at or before this slot starts can't touch later slots either
+            while active and active[0][1] <= slot_start:
+                heapq.heappop(active)
+            # The earliest-starting live booking ends after slot_start; it overlaps if it starts before slot_end
+            if active and active[0][0] < slot_end:
+                conflicts.append((slot_start, slot_end))
+
+        return conflicts
     
    
     @property
@@ -70,7 +259,7 @@ class Booking(models.Model):
         return (
             not self.checked_in and
             not self.cancelled and
-            self.start_time <= now <= self.start_time + timedelta(minutes=10)
+            self.start_time <= now <= self.start_time + CHECKIN_WINDOW
         )
     
     def cancel_auto_release(self):
@@ -106,4 +295,389 @@ class Booking(models.Model):
         now_time = timezone.now()
         start_time = timezone.localtime(self.start_time)  # Convert to same timezone
         time_diff = start_time - timezone.localtime(now_time)
-        return time_diff >= timedelta(minutes=15)
\ No newline at end of file
+        return time_diff >= timedelta(minutes=15)
+
+
+def series_horizon():
+    # Last date for which recurring series have Booking rows materialized
+    return timezone.localdate() + timedelta(days=settings.BOOKING_SERIES_HORIZON_DAYS)
+
+
+class BookingSeriesQuerySet(models.QuerySet):
+    def with_lazy_occurrences(self):
+        # Series that still have occurrences beyond their materialized horizon
+        return self.filter(cancelled=False, materialized_until__lt=F('recurrence_end'))
+
+
+class BookingSeries(models.Model):
+    # A recurring booking stored once with its rule. Booking rows are materialized only up
+    # to a rolling horizon (materialized_until); later occurrences are expanded on demand.
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)  # == Booking.series_id
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    room = models.ForeignKey(Room, on_delete=models.CASCADE, related_name='series')
+    start_time = models.DateTimeField()  # First occurrence
+    end_time = models.DateTimeField()
+    recurrence = models.CharField(max_length=10, choices=Booking.RECUR_CHOICES)
+    recurrence_end = models.DateField()  # Last occurrence date; resolved from COUNT/UNTIL for custom rules
+    recurrence_rule = models.TextField(blank=True, default='')
+    attendees = models.PositiveIntegerField()
+    required_resources = models.TextField(blank=True, null=True)
+    materialized_until = models.DateField()  # Booking rows exist for occurrences up to this date
+    cancelled = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = BookingSeriesQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['room', 'recurrence_end', 'materialized_until'], name='series_room_window_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.room.name} - {self.get_recurrence_display()} from {self.start_time.strftime('%Y-%m-%d %H:%M')}"
+
+    @property
+    def duration(self):
+        return self.end_time - self.start_time
+
+    def occurrence_at(self, day):
+        # Same local wall-clock time on `day`
+        local_start = timezone.localtime(self.start_time)
+        start = timezone.make_aware(datetime.combine(day, local_start.time().replace(tzinfo=None)))
+        return start, start + self.duration
+
+    def occurrence_dates(self, after=None, until=None):
+        return iter_recurrence_dates(
+            timezone.localtime(self.start_time).date(), self.recurrence, self.recurrence_end, after, until,
+            rule=self.recurrence_rule
+        )
+
+    def occurrences(self):
+        # Every occurrence of the rule, ignoring exceptions (used for conflict checks on creation)
+        for day in self.occurrence_dates():
+            yield self.occurrence_at(day)
+
+    def exceptions_by_date(self):
+        return {exception.original_date: exception for exception in self.exceptions.all()}
+
+    def lazy_occurrences(self, window_start, window_end):
+        # (start, end) of the not-yet-materialized occurrences overlapping the window
+        exceptions = self.exceptions_by_date()
+        first = self.materialized_until + timedelta(days=1)
+        after = max(first, timezone.localtime(window_start - self.duration).date())
+        until = timezone.localtime(window_end).date()
+
+        for day in self.occurrence_dates(after, until):
+            if day in exceptions:
+                continue
+            start, end = self.occurrence_at(day)
+            if start < window_end and end > window_start:
+                yield start, end
+
+        # Occurrences moved by an exception are placed at their new time
+        for day, exception in exceptions.items():
+            if day >= first and not exception.cancelled and exception.start_time:
+                if exception.start_time < window_end and exception.end_time > window_start:
+                    yield exception.start_time, exception.end_time
+
+    def upcoming_lazy_occurrences(self, after=None):
+        # Not-yet-materialized occurrences starting after `after` (default: all), in start order.
+        # Expands lazily, so taking the next page costs a page of work however long the series is
+        exceptions = self.exceptions_by_date()
+        first = self.materialized_until + timedelta(days=1)
+        if after is not None:
+            first = max(first, timezone.localtime(after).date())
+
+        regular = (
+            self.occurrence_at(day) for day in self.occurrence_dates(after=first)
+            if day not in exceptions
+        )
+        moved = sorted(
+            (exception.start_time, exception.end_time) for day, exception in exceptions.items()
+            if day > self.materialized_until and not exception.cancelled and exception.start_time
+        )
+        for start, end in heapq.merge(regular, moved):
+            if after is None or start > after:
+                yield start, end
+
+    def lazy_occurrence_on(self, day):
+        # (original date, start) of the not-yet-materialized occurrence held on local date `day`,
+        # which for a moved occurrence is its new date; None if there isn't one
+        exceptions = self.exceptions_by_date()
+        for original, exception in exceptions.items():
+            if original > self.materialized_until and not exception.cancelled and exception.start_time \
+                    and timezone.localtime(exception.start_time).date() == day:
+                return original, exception.start_time
+        if day > self.materialized_until and day not in exceptions and next(self.occurrence_dates(day, day), None) == day:
+            return day, self.occurrence_at(day)[0]
+        return None
+
+    def cancel_occurrence(self, day=None, booking=None):
+        # Records an occurrence as cancelled, by its original date or by the row it was
+        # materialized as, so materializing or shifting the series never brings it back
+        exception = self.exceptions.filter(booking=booking).first() if booking is not None else None
+        if exception is None:
+            day = day or timezone.localtime(booking.start_time).date()
+            exception, _ = SeriesException.objects.get_or_create(series=self, original_date=day)
+        exception.cancelled = True
+        exception.save()
+        return exception
+
+    @classmethod
+    def record_cancelled_row(cls, booking):
+        # For a row being cancelled or deleted; a no-op for bookings outside a stored series
+        series = cls.objects.filter(id=booking.series_id).first() if booking.series_id else None
+        if series is not None:
+            series.cancel_occurrence(booking=booking)
+
+    def cancel(self, user):
+        # Ends the series: nothing further is materialized or held lazily, and its rows that
+        # can still be cancelled (see Booking.cancel) are. The caller reports the bulk update
+        # through signals.bookings_changed_in_bulk(). Returns the number of rows cancelled.
+        now = timezone.now()
+        self.cancelled = True
+        self.save(update_fields=['cancelled'])
+        return Booking.objects.filter(
+            series_id=self.id, cancelled=False, start_time__gte=now + timedelta(minutes=15)
+        ).update(cancelled=True, is_active=False, cancelled_at=now, cancelled_by=user)
+
+    def lazy_summary(self):
+        # (occurrences, cancelled, last end) of the not-yet-materialized part, counted like the
+        # series' rows: cancelled dates included in occurrences. Costs a walk of the exceptions,
+        # not of the dates; last end is None if every lazy occurrence is cancelled.
+        exceptions = self.exceptions_by_date()
+        local_start = timezone.localtime(self.start_time).date()
+        occurrences = count_recurrence_dates(
+            local_start, self.recurrence, self.recurrence_end, self.materialized_until + timedelta(days=1),
+            rule=self.recurrence_rule
+        )
+        lazy = {day: exception for day, exception in exceptions.items() if day > self.materialized_until}
+        cancelled = sum(1 for exception in lazy.values() if exception.cancelled)
+
+        # Moved occurrences may end after the last regular one
+        ends = [exception.end_time for exception in lazy.values() if not exception.cancelled and exception.start_time]
+        for day in reversed_recurrence_dates(local_start, self.recurrence, self.recurrence_end, self.recurrence_rule):
+            if day <= self.materialized_until:
+                break
+            if day not in exceptions:
+                ends.append(self.occurrence_at(day)[1])
+                break
+        return occurrences, cancelled, max(ends, default=None)
+
+    def remaining_occurrences(self):
+        # Every occurrence not materialized yet, exceptions applied
+        return self.lazy_occurrences(
+            timezone.make_aware(datetime.combine(self.materialized_until + timedelta(days=1), datetime.min.time())),
+            timezone.make_aware(datetime.combine(self.recurrence_end + timedelta(days=2), datetime.min.time())),
+        )
+
+    @classmethod
+    def lazy_rows(cls, window_start, window_end, room=None, room_ids=None):
+        # (room_id, start, end, series_id) for lazily held occurrences overlapping the window
+        series = cls.objects.with_lazy_occurrences().filter(
+            start_time__lt=window_end,
+            # Occurrences are assumed shorter than a day when pruning by date
+            recurrence_end__gte=timezone.localtime(window_start).date() - timedelta(days=1),
+            materialized_until__lt=timezone.localtime(window_end).date(),
+        )
+        if room is not None:
+            series = series.filter(room=room)
+        if room_ids is not None:
+            series = series.filter(room_id__in=room_ids)
+
+        return [
+            (item.room_id, start, end, item.id)
+            for item in series.prefetch_related('exceptions')
+            for start, end in item.lazy_occurrences(window_start, window_end)
+        ]
+
+    def shift(self, start_offset, end_offset, **values):
+        # Moves the rule and its exceptions along with the materialized rows (see
+        # BookingQuerySet.shift); occurrence dates move with the start's local date
+        day_shift = timezone.localtime(self.start_time + start_offset).date() - timezone.localtime(self.start_time).date()
+        self.start_time += start_offset
+        self.end_time += end_offset
+        self.materialized_until += day_shift
+        self.recurrence_end += day_shift
+        for field, value in values.items():
+            setattr(self, field, value)
+        self.save()
+
+        exceptions = list(self.exceptions.all())
+        if exceptions:
+            for exception in exceptions:
+                exception.original_date += day_shift
+                if exception.start_time:
+                    exception.start_time += start_offset
+                    exception.end_time += end_offset
+            # Re-inserted rather than updated in place: shifted dates may collide mid-UPDATE
+            self.exceptions.all().delete()
+            SeriesException.objects.bulk_create(exceptions)
+
+    def materialize(self, until, batch_size=None, on_chunk=None):
+        # Creates Booking rows for occurrences after materialized_until up to `until`; the caller
+        # passes the returned rows to signals.bookings_written() (bulk_create skips post_save).
+        # With batch_size, rows are inserted in chunks, each in its own transaction that also
+        # advances materialized_until, and on_chunk(chunk, done, total) runs after every chunk.
+        until = min(until, self.recurrence_end)
+        if until <= self.materialized_until:
+            return []
+
+        exceptions = self.exceptions_by_date()
+        bookings = []
+        days = []
+        for day in self.occurrence_dates(self.materialized_until + timedelta(days=1), until):
+            exception = exceptions.get(day)
+            if exception and exception.cancelled:
+                continue
+            start, end = (exception.start_time, exception.end_time) if exception and exception.start_time \
+                else self.occurrence_at(day)
+            bookings.append(Booking(
+                user_id=self.user_id,
+                room_id=self.room_id,
+                start_time=start,
+                end_time=end,
+                attendees=self.attendees,
+                required_resources=self.required_resources,
+                recurrence=self.recurrence,
+                recurrence_end=self.recurrence_end,
+                recurrence_rule=self.recurrence_rule or None,
+                series_id=self.id,
+            ))
+            days.append(day)
+
+        batch_size = batch_size or max(len(bookings), 1)
+        for position in range(0, max(len(bookings), 1), batch_size):
+            chunk = bookings[position:position + batch_size]
+            with transaction.atomic():
+                Booking.objects.bulk_create(chunk)
+                done = position + len(chunk)
+                self.materialized_until = until if done == len(bookings) else days[done - 1]
+                self.save(update_fields=['materialized_until'])
+            if on_chunk is not None:
+                on_chunk(chunk, done, len(bookings))
+        return bookings
+
+
+class BookingSeriesJob(models.Model):
+    # Background creation of a large series (tasks.create_booking_series): the request only
+    # stores the validated form values; the worker conflict-checks and inserts in chunks
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='series_jobs')
+    series = models.OneToOneField(BookingSeries, null=True, blank=True, on_delete=models.SET_NULL, related_name='job')
+    params = models.JSONField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    occurrences = models.PositiveIntegerField(default=0)
+    rows_total = models.PositiveIntegerField(default=0)    # Booking rows to insert up to the horizon
+    rows_created = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.id} ({self.status})"
+
+    @staticmethod
+    def series_params(series):
+        return {
+            'room_id': series.room_id,
+            'start_time': series.start_time.isoformat(),
+            'end_time': series.end_time.isoformat(),
+            'recurrence': series.recurrence,
+            'recurrence_end': series.recurrence_end.isoformat(),
+            'recurrence_rule': series.recurrence_rule,
+            'attendees': series.attendees,
+            'required_resources': series.required_resources,
+        }
+
+    def build_series(self):
+        params = self.params
+        start_time = datetime.fromisoformat(params['start_time'])
+        return BookingSeries(
+            user_id=self.user_id,
+            room_id=params['room_id'],
+            start_time=start_time,
+            end_time=datetime.fromisoformat(params['end_time']),
+            recurrence=params['recurrence'],
+            recurrence_end=date.fromisoformat(params['recurrence_end']),
+            recurrence_rule=params['recurrence_rule'],
+            attendees=params['attendees'],
+            required_resources=params['required_resources'],
+            materialized_until=timezone.localtime(start_time).date() - timedelta(days=1),
+        )
+
+    def as_status(self):
+        return {
+            'id': str(self.id),
+            'status': self.status,
+            'occurrences': self.occurrences,
+            'rows_total': self.rows_total,
+            'rows_created': self.rows_created,
+            'progress': round(self.rows_created / self.rows_total, 4) if self.rows_total else (1.0 if self.status == 'done' else 0.0),
+            'series_id': str(self.series_id) if self.series_id else None,
+            'error': self.error,
+            'updated_at': self.updated_at.isoformat(),
+        }
+
+
+class SeriesException(models.Model):
+    # Per-date override of a series occurrence: moved (new start/end) or cancelled
+    series = models.ForeignKey(BookingSeries, on_delete=models.CASCADE, related_name='exceptions')
+    original_date = models.DateField()
+    start_time = models.DateTimeField(null=True, blank=True)
+    end_time = models.DateTimeField(null=True, blank=True)
+    cancelled = models.BooleanField(default=False)
+    booking = models.ForeignKey(Booking, null=True, blank=True, on_delete=models.SET_NULL, related_name='+')
+
+    class Meta:
+        unique_together = ('series', 'original_date')
+
+    def __str__(self):
+        return f"{self.series_id} - {self.original_date}"
+
+
+class SweepCheckpoint(models.Model):
+    # High-water mark of a periodic sweep: the last booking (start_time, id) it has handled
+    name = models.CharField(max_length=50, unique=True)
+    start_time = models.DateTimeField()
+    booking_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} @ {self.start_time.isoformat()} #{self.booking_id}"
+
+
+class OutboxMessage(models.Model):
+    # An email written in the same transaction as the change it reports; outbox.drain()
+    # sends it after commit, so a rolled-back booking never mails and SMTP stays off the request
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),  # Gave up after OUTBOX_MAX_ATTEMPTS
+    ]
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=255)
+    recipients = models.JSONField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)  # Also the lease of a claimed message
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='outbox_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} -> {', '.join(self.recipients)} ({self.status})"
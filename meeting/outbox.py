@@ -0,0 +1,135 @@
+# outbox.py
+# Transactional email outbox.
+#
+# queue_email() inserts an OutboxMessage inside the caller's transaction and
+# asks for a drain once that transaction commits, so the request never waits
+# on SMTP and a rolled-back booking never sends mail. drain() claims due
+# messages in short transactions, leasing them by moving next_attempt_at
+# forward so concurrent drainers don't send a message twice. It sends each
+# claimed batch over one mail connection and records the outcome: sent,
+# retried later with exponential backoff, or failed after OUTBOX_MAX_ATTEMPTS.
+# A drainer that dies mid-batch leaves its messages to be claimed again once
+# the lease runs out.
+import logging
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import Count, F, Min
+from django.utils import timezone
+from .models import OutboxMessage
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FROM_EMAIL = 'noreply@bookingsystem.com'
+
+
+def queue_email(subject, body, recipients, from_email=DEFAULT_FROM_EMAIL):
+    # Call inside the transaction that makes the change; returns None if nobody has an address
+    recipients = [address for address in recipients if address]
+    if not recipients:
+        return None
+    message = OutboxMessage.objects.create(subject=subject, body=body, from_email=from_email, recipients=recipients)
+    from .tasks import enqueue_outbox_drain  # tasks.py imports this module
+
+    transaction.on_commit(enqueue_outbox_drain)
+    return message
+
+
+def retry_delay(attempts):
+    # OUTBOX_RETRY_BASE_SECONDS after the first failure, doubling up to OUTBOX_RETRY_MAX_SECONDS
+    seconds = settings.OUTBOX_RETRY_BASE_SECONDS * 2 ** (attempts - 1)
+    return timedelta(seconds=min(seconds, settings.OUTBOX_RETRY_MAX_SECONDS))
+
+
+def claim(batch_size, now):
+    # Leases up to batch_size due messages and counts the attempt; returns them in queue order
+    lease = now + timedelta(seconds=settings.OUTBOX_LEASE_SECONDS)
+    with transaction.atomic():
+        due = OutboxMessage.objects.filter(status='pending', next_attempt_at__lte=now)
+        ids = list(due.order_by('next_attempt_at', 'id').select_for_update(skip_locked=True).values_list(
+            'id', flat=True
+        )[:batch_size])
+        if not ids:
+            return []
+        due.filter(id__in=ids).update(attempts=F('attempts') + 1, next_attempt_at=lease)
+    return list(OutboxMessage.objects.filter(id__in=ids, next_attempt_at=lease).order_by('id'))
+
+
+def _record_failure(message, error, now):
+    if message.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+        status, next_attempt_at = 'failed', now
+        logger.error("Giving up on outbox message %s after %d attempts: %s", message.id, message.attempts, error)
+    else:
+        status, next_attempt_at = 'pending', now + retry_delay(message.attempts)
+        logger.warning("Outbox message %s attempt %d failed: %s", message.id, message.attempts, error)
+    OutboxMessage.objects.filter(id=message.id).update(
+        status=status, next_attempt_at=next_attempt_at, last_error=str(error)[:2000]
+    )
+    return status
+
+
+def send_batch(messages, backend=None, now=None):
+    # Sends claimed messages over one connection; returns (sent, retried, failed)
+    sent_ids, failures = [], []
+    try:
+        with get_connection(backend) as connection:
+            for message in messages:
+                email = EmailMessage(message.subject, message.body, message.from_email, message.recipients,
+                                     connection=connection)
+                try:
+                    email.send()
+                except Exception as error:
+                    failures.append((message, error))
+                else:
+                    sent_ids.append(message.id)
+    except Exception as error:
+        # Opening or closing the connection failed; messages not yet handled are retried
+        handled = set(sent_ids) | {message.id for message, _ in failures}
+        failures += [(message, error) for message in messages if message.id not in handled]
+
+    now = now or timezone.now()
+    if sent_ids:
+        OutboxMessage.objects.filter(id__in=sent_ids).update(status='sent', sent_at=now, last_error='')
+    statuses = [_record_failure(message, error, now) for message, error in failures]
+    return len(sent_ids), statuses.count('pending'), statuses.count('failed')
+
+
+def drain(batch_size=None, time_budget=None, backend=None, now=None):
+    # Sends due messages batch by batch until none are left or the time budget is spent.
+    # `now` pins the clock (tests); `backend` overrides EMAIL_BACKEND. Returns a summary dict.
+    started = time.perf_counter()
+    batch_size = batch_size or settings.OUTBOX_BATCH_SIZE
+    time_budget = settings.OUTBOX_TIME_BUDGET_SECONDS if time_budget is None else time_budget
+    result = {'sent': 0, 'retried': 0, 'failed': 0, 'batches': 0}
+
+    while True:
+        messages = claim(batch_size, now or timezone.now())
+        if not messages:
+            break
+        sent, retried, failed = send_batch(messages, backend, now)
+        result['batches'] += 1
+        result['sent'] += sent
+        result['retried'] += retried
+        result['failed'] += failed
+        if len(messages) < batch_size or time.perf_counter() - started >= time_budget:
+            break
+
+    result['elapsed_ms'] = round((time.perf_counter() - started) * 1000, 1)
+    if result['batches']:
+        logger.info("Outbox drain: %d sent, %d to retry, %d failed in %d batches, %.1f ms",
+                    result['sent'], result['retried'], result['failed'], result['batches'], result['elapsed_ms'])
+    return result
+
+
+def queue_depth():
+    # Unsent messages by status, and the age in seconds of the oldest pending one (0 if none).
+    # Sent rows are history and aren't counted, so the scrape stays on the status index.
+    counts = {'pending': 0, 'failed': 0}
+    counts.update(OutboxMessage.objects.filter(status__in=('pending', 'failed')).values_list('status').annotate(
+        count=Count('id')
+    ).order_by())
+    oldest = OutboxMessage.objects.filter(status='pending').aggregate(oldest=Min('created_at'))['oldest']
+    age = (timezone.now() - oldest).total_seconds() if oldest else 0
+    return counts, age
@@ -0,0 +1,236 @@
+# recurrence.py
+# RFC 5545 recurrence rules for booking series.
+#
+# Rules are stored as text, e.g. "FREQ=WEEKLY;INTERVAL=2;BYDAY=MO,WE;COUNT=10",
+# optionally followed by an "EXDATE:20300105,20300112" line. Occurrences are
+# expanded with dateutil, but never from the series start: the rule's dtstart
+# is moved to the last period boundary before the requested window, so asking
+# for one week of a ten-year series costs one week of work.
+from datetime import datetime, timedelta
+from functools import lru_cache
+from dateutil import rrule as du
+from dateutil.relativedelta import relativedelta
+
+FREQUENCIES = {
+    'DAILY': du.DAILY,
+    'WEEKLY': du.WEEKLY,
+    'MONTHLY': du.MONTHLY,
+    'YEARLY': du.YEARLY,
+}
+WEEKDAYS = {'MO': du.MO, 'TU': du.TU, 'WE': du.WE, 'TH': du.TH, 'FR': du.FR, 'SA': du.SA, 'SU': du.SU}
+
+
+def _parse_date(value):
+    # UNTIL/EXDATE as DATE (20300105) or DATE-TIME (20300105T090000[Z]); only the date matters here
+    try:
+        return datetime.strptime(value[:8], '%Y%m%d').date()
+    except ValueError:
+        raise ValueError(f"Invalid date '{value}' in recurrence rule.")
+
+
+def _parse_int_list(value, name, low, high):
+    try:
+        numbers = [int(part) for part in value.split(',')]
+    except ValueError:
+        raise ValueError(f"{name} must be a comma-separated list of integers.")
+    if any(n == 0 or not low <= n <= high for n in numbers):
+        raise ValueError(f"{name} values must be between {low} and {high}, excluding 0.")
+    return tuple(numbers)
+
+
+class RecurrenceRule:
+    def __init__(self, freq, interval=1, byday=(), bymonthday=(), bymonth=(), count=None, until=None,
+                 wkst='MO', exdates=frozenset()):
+        self.freq = freq
+        self.interval = interval
+        self.byday = byday            # (weekday code, ordinal or None), e.g. ('TU', 2) for the 2nd Tuesday
+        self.bymonthday = bymonthday
+        self.bymonth = bymonth
+        self.count = count
+        self.until = until            # date
+        self.wkst = wkst
+        self.exdates = exdates        # frozenset of dates
+
+    @classmethod
+    def parse(cls, text):
+        # Accepts the RRULE value with or without the "RRULE:" prefix and optional EXDATE lines
+        if not text or not text.strip():
+            raise ValueError("Recurrence rule is empty.")
+
+        parts = {}
+        exdates = set()
+        for line in text.strip().splitlines():
+            line = line.strip()
+            name, _, value = line.partition(':') if ':' in line else ('RRULE', '', line)
+            name = name.split(';')[0].upper()  # EXDATE;VALUE=DATE:...
+            if name == 'EXDATE':
+                exdates.update(_parse_date(item) for item in value.split(',') if item)
+            elif name == 'RRULE':
+                for item in value.split(';'):
+                    key, sep, val = item.partition('=')
+                    if not sep or not val:
+                        raise ValueError(f"Malformed rule part '{item}'.")
+                    parts[key.strip().upper()] = val.strip().upper()
+            else:
+                raise ValueError(f"Unsupported recurrence line '{name}'.")
+
+        unsupported = set(parts) - {'FREQ', 'INTERVAL', 'BYDAY', 'BYMONTHDAY', 'BYMONTH', 'COUNT', 'UNTIL', 'WKST'}
+        if unsupported:
+            raise ValueError(f"Unsupported rule parts: {', '.join(sorted(unsupported))}.")
+        if parts.get('FREQ') not in FREQUENCIES:
+            raise ValueError(f"FREQ must be one of: {', '.join(FREQUENCIES)}.")
+        if 'COUNT' in parts and 'UNTIL' in parts:
+            raise ValueError("COUNT and UNTIL cannot both be set.")
+
+        try:
+            interval = int(parts.get('INTERVAL', 1))
+            count = int(parts['COUNT']) if 'COUNT' in parts else None
+        except ValueError:
+            raise ValueError("INTERVAL and COUNT must be integers.")
+        if interval < 1 or (count is not None and count < 1):
+            raise ValueError("INTERVAL and COUNT must be positive.")
+
+        byday = []
+        for item in filter(None, parts.get('BYDAY', '').split(',')):
+            code, ordinal = item[-2:], item[:-2]
+            if code not in WEEKDAYS:
+                raise ValueError(f"Invalid BYDAY value '{item}'.")
+            try:
+                ordinal = int(ordinal) if ordinal else None
+            except ValueError:
+                raise ValueError(f"Invalid BYDAY value '{item}'.")
+            if ordinal is not None and (ordinal == 0 or abs(ordinal) > 53 or parts['FREQ'] not in ('MONTHLY', 'YEARLY')):
+                raise ValueError(f"Invalid BYDAY value '{item}'.")
+            byday.append((code, ordinal))
+
+        wkst = parts.get('WKST', 'MO')
+        if wkst not in WEEKDAYS:
+            raise ValueError(f"Invalid WKST value '{wkst}'.")
+
+        return cls(
+            freq=parts['FREQ'],
+            interval=interval,
+            byday=tuple(byday),
+            bymonthday=_parse_int_list(parts['BYMONTHDAY'], 'BYMONTHDAY', -31, 31) if 'BYMONTHDAY' in parts else (),
+            bymonth=_parse_int_list(parts['BYMONTH'], 'BYMONTH', 1, 12) if 'BYMONTH' in parts else (),
+            count=count,
+            until=_parse_date(parts['UNTIL']) if 'UNTIL' in parts else None,
+            wkst=wkst,
+            exdates=frozenset(exdates),
+        )
+
+    def _rrule(self, dtstart, start_date, until=None, count=None):
+        # dateutil fills BYxxx defaults from dtstart; they are pinned to the real series
+        # start so that moving dtstart forward doesn't change which days match
+        byweekday = [WEEKDAYS[code](ordinal) if ordinal else WEEKDAYS[code] for code, ordinal in self.byday]
+        bymonthday = list(self.bymonthday)
+        bymonth = list(self.bymonth)
+        if not byweekday and not bymonthday:
+            if self.freq == 'WEEKLY':
+                byweekday = [start_date.weekday()]
+            elif self.freq in ('MONTHLY', 'YEARLY'):
+                bymonthday = [start_date.day]
+                if self.freq == 'YEARLY' and not bymonth:
+                    bymonth = [start_date.month]
+
+        return du.rrule(
+            FREQUENCIES[self.freq],
+            dtstart=datetime.combine(dtstart, datetime.min.time()),
+            interval=self.interval,
+            wkst=WEEKDAYS[self.wkst],
+            byweekday=byweekday or None,
+            bymonthday=bymonthday or None,
+            bymonth=bymonth or None,
+            until=datetime.combine(until, datetime.min.time()) if until else None,
+            count=count,
+        )
+
+    def _period_start(self, start_date, after):
+        # Latest period boundary of the rule (a multiple of INTERVAL periods from the
+        # series start) that is on or before `after`
+        if after <= start_date:
+            return start_date
+        if self.freq == 'DAILY':
+            return start_date + timedelta(days=(after - start_date).days // self.interval * self.interval)
+        if self.freq == 'WEEKLY':
+            # Periods are weeks starting on WKST
+            week_start = start_date - timedelta(days=(start_date.weekday() - WEEKDAYS[self.wkst].weekday) % 7)
+            weeks = (after - week_start).days // 7 // self.interval * self.interval
+            return max(start_date, week_start + timedelta(weeks=weeks))
+        if self.freq == 'MONTHLY':
+            months = ((after.year - start_date.year) * 12 + after.month - start_date.month) // self.interval * self.interval
+            return max(start_date, start_date.replace(day=1) + relativedelta(months=months))
+        years = (after.year - start_date.year) // self.interval * self.interval
+        return max(start_date, start_date.replace(month=1, day=1) + relativedelta(years=years))
+
+    def format(self, until=None):
+        # The RRULE value; `until` (an iCalendar DATE or DATE-TIME string) replaces COUNT/UNTIL.
+        # EXDATEs aren't part of RRULE and are left to the caller.
+        parts = [f'FREQ={self.freq}']
+        if self.interval != 1:
+            parts.append(f'INTERVAL={self.interval}')
+        if self.byday:
+            parts.append('BYDAY=' + ','.join(f"{ordinal or ''}{code}" for code, ordinal in self.byday))
+        if self.bymonthday:
+            parts.append('BYMONTHDAY=' + ','.join(map(str, self.bymonthday)))
+        if self.bymonth:
+            parts.append('BYMONTH=' + ','.join(map(str, self.bymonth)))
+        if self.wkst != 'MO':
+            parts.append(f'WKST={self.wkst}')
+        if until:
+            parts.append(f'UNTIL={until}')
+        elif self.count:
+            parts.append(f'COUNT={self.count}')
+        elif self.until:
+            parts.append(f"UNTIL={self.until.strftime('%Y%m%d')}")
+        return ';'.join(parts)
+
+    def last_date(self, start_date):
+        # Final occurrence date, or None for an unbounded rule; COUNT is resolved once per series
+        if self.until:
+            return self.until
+        if self.count:
+            return _count_end(self, start_date)
+        return None
+
+    def dates(self, start_date, after=None, until=None):
+        # Yields occurrence dates in [after, until] (both optional), in order, skipping EXDATEs
+        end = self.last_date(start_date)
+        if until is not None:
+            end = min(end, until) if end else until
+        if end is None:
+            raise ValueError("An unbounded rule needs an `until` date to expand.")
+
+        after = max(after or start_date, start_date)
+        if after > end:
+            return
+        # COUNT has been turned into an end date, so expansion can start at the window
+        rule = self._rrule(self._period_start(start_date, after), start_date, until=end)
+        for occurrence in rule:
+            day = occurrence.date()
+            if day >= after and day not in self.exdates:
+                yield day
+
+    def __eq__(self, other):
+        return isinstance(other, RecurrenceRule) and vars(self) == vars(other)
+
+    def __hash__(self):
+        return hash((self.freq, self.interval, self.byday, self.bymonthday, self.bymonth, self.count,
+                     self.until, self.wkst, self.exdates))
+
+
+@lru_cache(maxsize=1024)
+def _count_end(rule, start_date):
+    last = None
+    for last in rule._rrule(start_date, start_date, count=rule.count):
+        pass
+    return last.date() if last else start_date
+
+
+@lru_cache(maxsize=1024)
+def parse_rule(text):
+    return RecurrenceRule.parse(text)
+
+
+def iter_rule_dates(start_date, text, after=None, until=None):
+    return parse_rule(text).dates(start_date, after, until)
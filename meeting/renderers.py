@@ -0,0 +1,16 @@
+# renderers.py
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # Optional; falls back to the standard json module
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    # Uses orjson when installed; output is compact JSON either way
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        return orjson.dumps(data, default=JSONEncoder().default)
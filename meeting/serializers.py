@@ -1,7 +1,34 @@
+from functools import lru_cache
 from rest_framework import serializers
 from .models import Room
 
 class RoomSerializer(serializers.ModelSerializer):
     class Meta:
         model = Room
-        fields = '__all__'
+        exclude = ['resource_tags']
+
+
+# ---------- Lean room rows ----------
+# Room listings only ever expose plain columns, so they can skip DRF's per-field
+# machinery and build rows straight from .values_list() tuples.
+
+@lru_cache(maxsize=None)
+def room_fields():
+    # The same fields RoomSerializer exposes, in the same order; computed once
+    return tuple(RoomSerializer().fields)
+
+
+def parse_fields(value):
+    # ?fields=id,name -> ('id', 'name') in canonical order; raises ValueError on unknown names
+    if not value:
+        return room_fields()
+    requested = {name.strip() for name in value.split(',') if name.strip()}
+    unknown = requested - set(room_fields())
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+    return tuple(name for name in room_fields() if name in requested)
+
+
+def room_rows(queryset, fields=None):
+    fields = fields or room_fields()
+    return [dict(zip(fields, row)) for row in queryset.values_list(*fields)]
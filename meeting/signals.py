@@ -0,0 +1,123 @@
+# signals.py
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+from django.utils import timezone
+from .availability import booking_index, bump_indexed_version
+from .cache import bump_user_versions
+from .models import Booking, Room, BookingSeries, SeriesException
+
+
+def _aware(value):
+    # Bookings may be saved with naive datetimes; the index only holds aware ones
+    return timezone.make_aware(value) if timezone.is_naive(value) else value
+
+
+def _apply_and_bump(apply):
+    # On commit, so rolled-back writes never reach the in-process index; the index change
+    # comes first so the version bump can keep it current (see availability.py)
+    def callback():
+        apply()
+        bump_indexed_version()
+
+    transaction.on_commit(callback)
+
+
+def index_bookings(bookings):
+    if any(b.id is None for b in bookings):
+        # bulk_create on backends that don't return primary keys (e.g. MySQL)
+        _apply_and_bump(booking_index.invalidate)
+        return
+
+    entries = [
+        (b.id, b.room_id, _aware(b.start_time), _aware(b.end_time), b.is_active)
+        for b in bookings
+    ]
+
+    def apply():
+        for entry in entries:
+            booking_index.update(*entry)
+
+    _apply_and_bump(apply)
+
+
+def bookings_written(bookings):
+    # For writes that bypass post_save (bulk_create)
+    from .tasks import schedule_checkin_expiry  # tasks imports this module
+
+    index_bookings(bookings)
+    schedule_checkin_expiry([
+        (b.id, _aware(b.start_time)) for b in bookings
+        if b.id is not None and not b.checked_in and not b.cancelled
+    ])
+    user_ids = {b.user_id for b in bookings}
+    transaction.on_commit(lambda: bump_user_versions(user_ids))
+
+
+def bookings_changed_in_bulk(user_ids=None, moved_ids=None):
+    # For QuerySet.update()/delete() paths that change bookings without signals;
+    # user_ids=None when the affected users aren't known. moved_ids (ids or a values('id')
+    # subquery) are bookings whose times changed, so their check-in expiry is queued again;
+    # a task left at the old deadline finds the window still open and does nothing.
+    from .tasks import schedule_checkin_expiry  # tasks imports this module
+
+    _apply_and_bump(booking_index.invalidate)
+    if moved_ids is not None:
+        schedule_checkin_expiry(Booking.objects.filter(
+            id__in=moved_ids, checked_in=False, cancelled=False
+        ).values_list('id', 'start_time'))
+    transaction.on_commit(lambda: bump_user_versions(user_ids))
+
+
+@receiver(post_save, sender=Booking)
+def booking_saved(sender, instance, **kwargs):
+    bookings_written([instance])
+
+
+@receiver(post_delete, sender=Booking)
+def booking_deleted(sender, instance, **kwargs):
+    booking_id, user_id = instance.id, instance.user_id
+    _apply_and_bump(lambda: booking_index.discard(booking_id))
+    transaction.on_commit(lambda: bump_user_versions([user_id]))
+
+
+def _rooms_changed():
+    bump_indexed_version()  # The index holds no room data
+    bump_user_versions()  # Every user's booking pages show room details
+
+
+# Cached availability responses include room details, so room writes invalidate them too
+@receiver(post_save, sender=Room)
+@receiver(post_delete, sender=Room)
+def room_changed(sender, **kwargs):
+    transaction.on_commit(_rooms_changed)
+
+
+@receiver(m2m_changed, sender=Room.resource_tags.through)
+def room_resources_changed(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        transaction.on_commit(_rooms_changed)
+
+
+def _refresh_series(series_id, user_id=None):
+    def apply():
+        if booking_index.is_warm:
+            series = BookingSeries.objects.prefetch_related('exceptions').filter(id=series_id).first()
+            booking_index.update_series(series_id, series)
+        bump_indexed_version()
+        owner = user_id or BookingSeries.objects.filter(id=series_id).values_list('user_id', flat=True).first()
+        bump_user_versions([owner] if owner else None)
+
+    transaction.on_commit(apply)
+
+
+@receiver(post_save, sender=BookingSeries)
+@receiver(post_delete, sender=BookingSeries)
+def series_changed(sender, instance, **kwargs):
+    _refresh_series(instance.id, instance.user_id)
+
+
+@receiver(post_save, sender=SeriesException)
+@receiver(post_delete, sender=SeriesException)
+def series_exception_changed(sender, instance, **kwargs):
+    _refresh_series(instance.series_id)
@@ -1,20 +1,190 @@
 from celery import shared_task # A decorator that registers a function as a task runs async
 from django.utils import timezone
 from datetime import timedelta
-from .models import Booking
+import logging
+from itertools import groupby
+from django.conf import settings
+from django.core.mail import send_mass_mail
+from django.db import transaction
+from .models import CHECKIN_WINDOW, Room, Booking, BookingSeries, BookingSeriesJob, series_horizon
+from .autocancel import expire_booking, run_sweep
+from .outbox import drain
+from .signals import bookings_written
+
+logger = logging.getLogger(__name__)
 
 @shared_task # task scheduled or called in background as async
 def auto_cancel_unchecked_bookings():
+    # Safety net for expiries whose ETA task was lost; batched and checkpointed, see autocancel.py
+    return run_sweep(on_cancelled=enqueue_cancellation_notices)
+
+
+def enqueue_cancellation_notices(booking_ids):
+    # Mail goes out from the notifications queue, not from the worker running the sweep
+    booking_ids = list(booking_ids)
+    if settings.BOOKING_JOBS_EAGER:
+        send_cancellation_notices(booking_ids)
+        return
+    try:
+        send_cancellation_notices.delay(booking_ids)
+    except Exception:
+        logger.warning("Could not queue auto-cancel notices for %d bookings.", len(booking_ids))
+
+
+@shared_task(ignore_result=True)
+def send_cancellation_notices(booking_ids):
+    # One email per user listing all of their auto-cancelled bookings, built from a single
+    # query and sent over one mail connection
+    bookings = Booking.objects.filter(id__in=booking_ids).exclude(user__email='').select_related(
+        'room', 'user'
+    ).order_by('user_id', 'start_time')
+
+    messages = []
+    for user, user_bookings in groupby(bookings, key=lambda booking: booking.user):
+        lines = [
+            f"- {booking.room.name} at {timezone.localtime(booking.start_time).strftime('%Y-%m-%d %H:%M')}"
+            for booking in user_bookings
+        ]
+        subject = "Booking Auto-Cancelled" if len(lines) == 1 else f"{len(lines)} Bookings Auto-Cancelled"
+        body = ("The following bookings were auto-cancelled because you did not check in within "
+                "10 minutes of the start time:\n" + "\n".join(lines))
+        messages.append((subject, body, "noreply@bookingsystem.com", [user.email]))
+
+    sent = send_mass_mail(messages, fail_silently=True) if messages else 0
+    logger.info("Sent %d auto-cancel notices for %d bookings", sent, len(booking_ids))
+    return sent
+
+
+def enqueue_outbox_drain():
+    # Runs after the transaction that queued a message commits
+    if settings.BOOKING_JOBS_EAGER:
+        drain()
+        return
+    try:
+        drain_outbox.delay()
+    except Exception:
+        logger.warning("Could not queue an outbox drain; the periodic drain will send the message.")
+
+
+@shared_task(ignore_result=True)
+def drain_outbox():
+    return drain()
+
+
+@shared_task(ignore_result=True)
+def expire_booking_checkin(booking_id):
+    return expire_booking(booking_id, on_cancelled=enqueue_cancellation_notices)
+
+
+def expiry_schedule_ahead():
+    # ETA tasks are only queued this close to their deadline: the scheduler below runs every
+    # BOOKING_EXPIRY_SCHEDULE_MINUTES and covers two intervals, so nothing falls between runs
+    return timedelta(minutes=2 * settings.BOOKING_EXPIRY_SCHEDULE_MINUTES)
+
+
+def schedule_checkin_expiry(entries):
+    # entries: (booking_id, start_time) of unchecked bookings just written. Queues an expiry
+    # task at each check-in deadline once the write commits; deadlines further out are
+    # picked up later by schedule_checkin_expiries().
+    horizon = timezone.now() + expiry_schedule_ahead()
+    grace = timedelta(seconds=settings.BOOKING_EXPIRY_GRACE_SECONDS)
+    due = [
+        (booking_id, start + CHECKIN_WINDOW + grace) for booking_id, start in entries
+        if start + CHECKIN_WINDOW < horizon
+    ]
+    if due:
+        transaction.on_commit(lambda: _enqueue_expiries(due))
+
+
+def _enqueue_expiries(due):
+    try:
+        for booking_id, eta in due:
+            expire_booking_checkin.apply_async((booking_id,), eta=eta)
+    except Exception:
+        # The booking is saved either way; the safety-net sweep cancels it if it's never checked in
+        logger.warning("Could not queue check-in expiry for %d bookings; leaving them to the sweep.", len(due))
+
+
+@shared_task
+def schedule_checkin_expiries():
+    # Queues expiry tasks for deadlines in the next scheduling window: one range query on
+    # the unchecked-bookings index rather than a scan of the table
     now = timezone.now()
-    # Fetch all bookings where start_time has passed but not checked_in
-    bookings = Booking.objects.filter(
-        checked_in=False, 
-        start_time__lt=now,  # The start time is in the past.
-        cancelled=False
+    upcoming = Booking.objects.filter(
+        checked_in=False,
+        cancelled=False,
+        start_time__gte=now - CHECKIN_WINDOW,
+        start_time__lt=now - CHECKIN_WINDOW + expiry_schedule_ahead(),
+    ).values_list('id', 'start_time')
+    grace = timedelta(seconds=settings.BOOKING_EXPIRY_GRACE_SECONDS)
+    due = [(booking_id, start + CHECKIN_WINDOW + grace) for booking_id, start in upcoming]
+    _enqueue_expiries(due)
+    return len(due)
+
+
+@shared_task
+def extend_series_materialization():
+    # Rolls every series' materialized horizon forward so upcoming occurrences have Booking rows
+    horizon = series_horizon()
+    created = 0
+    pending = BookingSeries.objects.with_lazy_occurrences().filter(materialized_until__lt=horizon)
+    for series in pending.prefetch_related('exceptions').iterator(chunk_size=500):
+        bookings = series.materialize(horizon)
+        bookings_written(bookings)
+        created += len(bookings)
+    return created
+
+
+def enqueue_series_job(job):
+    # Dispatched once the job row is committed; BOOKING_JOBS_EAGER runs it in-process (tests, no broker)
+    if settings.BOOKING_JOBS_EAGER:
+        transaction.on_commit(lambda: create_booking_series(str(job.id)))
+    else:
+        transaction.on_commit(lambda: create_booking_series.delay(str(job.id)))
+
+
+@shared_task
+def create_booking_series(job_id):
+    # Claimed with one conditional UPDATE, so of two workers handed the same job only one runs it
+    claimed = BookingSeriesJob.objects.filter(id=job_id, status='pending').update(
+        status='running', updated_at=timezone.now()
     )
+    if not claimed:  # Unknown, or already picked up by a redelivered message
+        return None
+    job = BookingSeriesJob.objects.get(id=job_id)
+    try:
+        series = job.build_series()
+        occurrences = list(series.occurrences())
+        with transaction.atomic():
+            # Once saved, every occurrence is visible to other writers' conflict checks
+            # (as lazy rows until materialized), so only the check and this save need the lock
+            Room.objects.lock_for_booking([series.room_id])
+            conflicts = Booking.find_conflicts(series.room_id, occurrences)
+            if not conflicts:
+                series.save()
+                job.series = series
+                job.save(update_fields=['series', 'updated_at'])
+
+        if conflicts:
+            job.status = 'failed'
+            job.error = '\n'.join(
+                f"Conflict for slot {timezone.localtime(start).strftime('%Y-%m-%d %H:%M')}." for start, _ in conflicts
+            )
+            job.save(update_fields=['status', 'error', 'updated_at'])
+            return job.status
 
-    for booking in bookings:
-        if now - booking.start_time >= timedelta(minutes=10):  # Check if more than 10 minutes passed
-            booking.cancel_auto_release()  # Auto-cancel and release the room
-            print(f"Booking {booking.id} has been auto-canceled.")
+        def progress(chunk, done, total):
+            bookings_written(chunk)
+            job.rows_created, job.rows_total = done, total
+            job.save(update_fields=['rows_created', 'rows_total', 'updated_at'])
 
+        until = max(series_horizon(), timezone.localtime(occurrences[0][0]).date()) if occurrences else series_horizon()
+        series.materialize(until, batch_size=settings.BOOKING_SERIES_CHUNK_SIZE, on_chunk=progress)
+        job.status = 'done'
+        job.save(update_fields=['status', 'updated_at'])
+    except Exception as error:
+        logger.exception("Booking series job %s failed", job_id)
+        job.status = 'failed'
+        job.error = str(error)
+        job.save(update_fields=['status', 'error', 'updated_at'])
+    return job.status
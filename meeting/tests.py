@@ -1,28 +1,75 @@
-from django.test import TestCase, Client, RequestFactory
+from django.test import TestCase, TransactionTestCase, Client, RequestFactory, override_settings
 from django.contrib.auth.models import User, AnonymousUser
 from django.utils import timezone
 from datetime import timedelta, date, datetime
-from .models import Room, Booking, User
+from .models import Room, Booking, User, Resource, BookingSeries, SeriesException, BookingSeriesJob, SweepCheckpoint, OutboxMessage
 from .forms import RoomForm, BookingForm, BookingEditForm
-from .utils import get_recurrence_dates
+from .utils import get_recurrence_dates, parse_resources, iter_recurrence_dates, expand_recurrence, SeriesDateExpander, count_recurrence_dates, reversed_recurrence_dates
 from dateutil.relativedelta import relativedelta
 import unittest
 from types import SimpleNamespace
 from django.urls import reverse
 from django.views import View
-from meeting.views import AdminRequiredMixin
+from meeting.views import AdminRequiredMixin, RoomListView, metrics_view
 from django.contrib.auth import get_user_model
 from unittest.mock import patch
 from uuid import UUID
 from rest_framework.test import APIClient
 from rest_framework import status
 from io import StringIO
+from django.core.management import call_command
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend as LocmemBackend
 import csv
 import json
 from django.utils.timezone import make_aware
 import pdb
 from django.db import connection
+from django.db.models.functions import Trunc
+from django.test.utils import CaptureQueriesContext
 from django.contrib.messages import get_messages
+from .availability import booking_index, RoomIntervals, check_index_consistency, earliest_free_start, find_free_slots
+from .matrix import occupancy_matrix, encode_row
+from . import cache as availability_cache
+from .metrics import Histogram
+from .serializers import RoomSerializer, parse_fields, room_rows
+from .renderers import FastJSONRenderer
+from .recurrence import RecurrenceRule, parse_rule
+from . import ics
+from .autocancel import run_sweep
+from dateutil import rrule as du
+import base64
+import time
+import numpy as np
+
+
+class ColdAvailabilityMixin:
+    # The interval index and the availability cache are process-wide, so every test starts them cold.
+    # Stale indexes are rebuilt in the requesting thread, where the test transaction is visible.
+
+    def setUp(self):
+        super().setUp()
+        inline_rebuilds = override_settings(AVAILABILITY_INDEX_REBUILD_IN_BACKGROUND=False,
+                                            AVAILABILITY_INDEX_REBUILD_SECONDS=0)
+        inline_rebuilds.enable()
+        self.addCleanup(inline_rebuilds.disable)
+        booking_index.reset()
+        availability_cache.get_cache().clear()
+
+    def create_series(self, days=5, horizon_days=5):
+        # Daily series of one-hour bookings at self.start in self.room, posted through the booking form
+        with self.settings(BOOKING_SERIES_HORIZON_DAYS=horizon_days), self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('booking-create'), {
+                'room': self.room.id,
+                'start_time': self.start.strftime('%Y-%m-%d %H:%M:%S'),
+                'end_time': (self.start + timedelta(hours=1)).strftime('%Y-%m-%d %H:%M:%S'),
+                'attendees': 2,
+                'required_resources': '',
+                'recurrence': 'daily',
+                'recurrence_end': (self.start + timedelta(days=days - 1)).date().strftime('%Y-%m-%d'),
+            })
+        self.assertEqual(response.status_code, 302)
+        return BookingSeries.objects.get()
 
 
 class RoomModelTest(TestCase):
@@ -39,6 +86,38 @@ class RoomModelTest(TestCase):
             Room.objects.create(name="Conference A", location="Salem", capacity=5, resources="TV")
 
 
+class RoomResourceTagsTest(TestCase):
+    def test_parse_resources_normalizes(self):
+        self.assertEqual(parse_resources(" Projector,  smart  Board ,projector,, "), ['projector', 'smart board'])
+        self.assertEqual(parse_resources(['TV', ' tv ']), ['tv'])
+        self.assertEqual(parse_resources(None), [])
+
+    def test_tags_follow_resources_text(self):
+        room = Room.objects.create(name="Tagged", location="HQ", capacity=4, resources="Projector, TV-stand")
+        self.assertEqual(set(room.resource_tags.values_list('name', flat=True)), {'projector', 'tv-stand'})
+
+        room.resources = "TV"
+        room.save()
+        self.assertEqual(set(room.resource_tags.values_list('name', flat=True)), {'tv'})
+        self.assertEqual(Resource.objects.filter(name='tv-stand').count(), 1)  # Tags are shared, never duplicated
+
+    def test_unchanged_resources_skip_tag_sync(self):
+        room = Room.objects.create(name="Quiet", location="HQ", capacity=4, resources="Projector")
+        room = Room.objects.get(pk=room.pk)
+        with self.assertNumQueries(1):
+            room.is_available = False
+            room.save()
+
+    def test_with_resources_requires_every_tag_exactly(self):
+        both = Room.objects.create(name="Both", location="HQ", capacity=4, resources="Projector, TV")
+        Room.objects.create(name="Stand", location="HQ", capacity=4, resources="Projector, TV-stand")
+        Room.objects.create(name="Projector only", location="HQ", capacity=4, resources="projector")
+
+        self.assertEqual(list(Room.objects.with_resources(['tv', 'PROJECTOR'])), [both])
+        self.assertEqual(Room.objects.with_resources("projector").count(), 3)
+        self.assertEqual(Room.objects.with_resources([]).count(), 3)
+
+
 class BookingModelTest(TestCase):
     def setUp(self):
         self.user = User.objects.create_user(username='tester', password='pass')
@@ -227,6 +306,27 @@ class BookingFormTest(TestCase):
         })
         self.assertTrue(form.is_valid())
 
+    def test_monthly_and_bounded_custom_recurrence_are_valid(self):
+        start = (timezone.now() + timedelta(days=1)).replace(microsecond=0)
+        data = {
+            'room': self.room.id,
+            'start_time': start.strftime('%Y-%m-%dT%H:%M'),
+            'end_time': (start + timedelta(hours=1)).strftime('%Y-%m-%dT%H:%M'),
+            'attendees': 3,
+            'required_resources': 'Projector',
+            'recurrence': 'monthly',
+            'recurrence_end': (start + timedelta(days=90)).strftime('%Y-%m-%d'),
+        }
+        self.assertTrue(BookingForm(data=data).is_valid())
+
+        data.update(recurrence='custom', recurrence_end='', recurrence_rule='FREQ=WEEKLY;BYDAY=MO,TH;COUNT=6')
+        self.assertTrue(BookingForm(data=data).is_valid())
+
+        data.update(recurrence_rule='FREQ=WEEKLY;BYDAY=MO')  # Unbounded and no recurrence end
+        form = BookingForm(data=data)
+        self.assertFalse(form.is_valid())
+        self.assertIn('Recurrence end date is required for recurring bookings.', form.errors['__all__'])
+
     def test_start_in_past(self):
         start = (timezone.now() - timedelta(days=1)).replace(microsecond=0)
         end = timezone.now() + timedelta(hours=1)
@@ -284,6 +384,19 @@ class BookingFormTest(TestCase):
         self.assertFalse(form.is_valid())
         self.assertIn('Room does not have enough capacity.', form.errors['__all__'])
 
+    def test_resource_prefix_does_not_match(self):
+        room = Room.objects.create(name="RoomStand", location="Floor2", capacity=5, resources="TV-stand")
+        form = BookingForm(data={
+            'room': room.id,
+            'start_time': timezone.now() + timedelta(days=1),
+            'end_time': timezone.now() + timedelta(days=1, hours=1),
+            'attendees': 2,
+            'required_resources': 'TV',
+            'recurrence': 'none',
+        })
+        self.assertFalse(form.is_valid())
+        self.assertIn("Requested resource not available in room.", form.non_field_errors())
+
     def test_resource_not_available(self):
         start = (timezone.now() + timedelta(days=1)).replace(microsecond=0)
         end = start + timedelta(hours=1)
@@ -450,6 +563,117 @@ class GetRecurrenceDatesTestCase(unittest.TestCase):
         result = get_recurrence_dates(booking)
         self.assertEqual(result, [])  # Since no code block for 'yearly'
 
+class RecurrenceExpansionTests(unittest.TestCase):
+
+    def row(self, start_date, recurrence='daily', recurrence_end=date(2028, 12, 31), series_id=None):
+        return SimpleNamespace(
+            start_time=datetime.combine(start_date, datetime.min.time()),
+            recurrence=recurrence, recurrence_end=recurrence_end, series_id=series_id
+        )
+
+    def test_multi_year_expansion_matches_the_rule(self):
+        for rule in ('daily', 'weekly', 'monthly'):
+            expected = list(iter_recurrence_dates(date(2025, 1, 31), rule, date(2028, 12, 31)))
+            self.assertEqual(list(expand_recurrence(date(2025, 1, 31), rule, date(2028, 12, 31))), expected)
+        self.assertEqual(len(expand_recurrence(date(2025, 1, 1), 'daily', date(2028, 12, 31))), 1461)
+
+    def test_counts_and_reversed_dates_match_the_rule(self):
+        start, end = date(2025, 1, 31), date(2027, 6, 15)
+        rules = [('daily', None), ('weekly', None), ('monthly', None), ('custom', 'FREQ=WEEKLY;BYDAY=MO,TH')]
+        for recurrence, rule in rules:
+            dates = list(iter_recurrence_dates(start, recurrence, end, rule=rule))
+            self.assertEqual(list(reversed_recurrence_dates(start, recurrence, end, rule)), dates[::-1])
+            for after in (None, date(2025, 2, 28), date(2026, 3, 1), date(2027, 6, 16)):
+                expected = len([day for day in dates if after is None or day >= after])
+                self.assertEqual(count_recurrence_dates(start, recurrence, end, after, rule), expected, (recurrence, after))
+
+    def test_expansion_is_cached(self):
+        first = expand_recurrence(date(2025, 3, 1), 'weekly', date(2027, 3, 1))
+        self.assertIs(expand_recurrence(date(2025, 3, 1), 'weekly', date(2027, 3, 1)), first)
+        self.assertEqual(expand_recurrence(date(2025, 3, 1), 'weekly', None), ())
+
+    def test_series_rows_share_one_expansion(self):
+        series_id = UUID(int=1)
+        expander = SeriesDateExpander()
+        rows = [self.row(date(2025, 1, 1) + timedelta(days=d), series_id=series_id) for d in range(3)]
+
+        dates = [expander.dates_for(row) for row in rows]
+
+        self.assertIs(dates[0].dates, dates[2].dates)
+        self.assertEqual(dates[2][0], date(2025, 1, 3))
+        self.assertEqual(list(dates[1])[:2], [date(2025, 1, 2), date(2025, 1, 3)])
+        self.assertEqual(len(dates[2]), len(dates[0]) - 2)
+        self.assertEqual(list(dates[2]), get_recurrence_dates(rows[2]))
+
+    def test_row_moved_off_the_rule_expands_from_its_own_date(self):
+        series_id = UUID(int=2)
+        expander = SeriesDateExpander()
+        expander.dates_for(self.row(date(2025, 1, 1), 'weekly', series_id=series_id))
+
+        moved = expander.dates_for(self.row(date(2025, 1, 10), 'weekly', series_id=series_id))
+
+        self.assertEqual(moved[0], date(2025, 1, 10))
+        self.assertEqual(moved[1], date(2025, 1, 17))
+        with self.assertRaises(TypeError):
+            moved['0']  # Django templates try a key lookup before the index
+
+
+class RecurrenceRuleTests(unittest.TestCase):
+
+    def reference(self, text, start_date):
+        # dateutil's own expansion from the series start, EXDATEs removed
+        rule = parse_rule(text)
+        dates = du.rrulestr(text.splitlines()[0], dtstart=datetime.combine(start_date, datetime.min.time()))
+        return [d.date() for d in dates if d.date() not in rule.exdates]
+
+    def test_rule_parts_match_dateutil(self):
+        rules = [
+            "FREQ=DAILY;INTERVAL=3;UNTIL=20281231",
+            "FREQ=WEEKLY;INTERVAL=2;BYDAY=MO,WE,FR;UNTIL=20281231",
+            "FREQ=WEEKLY;INTERVAL=3;WKST=SU;BYDAY=SU,SA;COUNT=200",
+            "FREQ=MONTHLY;BYMONTHDAY=-1,15;UNTIL=20281231",
+            "FREQ=MONTHLY;INTERVAL=2;BYDAY=2TU,-1FR;COUNT=40",
+            "FREQ=YEARLY;INTERVAL=2;BYMONTH=3,9;BYDAY=1MO;UNTIL=20401231",
+            "RRULE:FREQ=DAILY;BYDAY=MO,TU;INTERVAL=5;UNTIL=20271231\nEXDATE:20260105,20260106",
+        ]
+        for start in (date(2025, 1, 31), date(2025, 3, 5)):
+            for text in rules:
+                with self.subTest(rule=text, start=start):
+                    self.assertEqual(list(parse_rule(text).dates(start)), self.reference(text, start))
+
+    def test_window_expansion_matches_full_expansion(self):
+        start = date(2025, 1, 31)
+        for text in ("FREQ=WEEKLY;INTERVAL=2;BYDAY=TU,SU;WKST=SU;COUNT=300",
+                     "FREQ=MONTHLY;BYMONTHDAY=31;UNTIL=20351231",
+                     "FREQ=YEARLY;BYMONTH=2;BYMONTHDAY=29;UNTIL=20501231"):
+            rule = parse_rule(text)
+            full = list(rule.dates(start))
+            for offset in (0, 45, 400, 1000, 3000):
+                after, until = start + timedelta(days=offset), start + timedelta(days=offset + 90)
+                with self.subTest(rule=text, offset=offset):
+                    self.assertEqual(list(rule.dates(start, after, until)), [d for d in full if after <= d <= until])
+
+    def test_far_window_skips_earlier_periods(self):
+        rule = parse_rule("FREQ=DAILY;UNTIL=21241231")
+        with patch.object(RecurrenceRule, '_rrule', wraps=rule._rrule) as expand:
+            dates = list(rule.dates(date(2025, 1, 1), date(2120, 1, 1), date(2120, 1, 7)))
+        self.assertEqual(dates, [date(2120, 1, d) for d in range(1, 8)])
+        self.assertEqual(expand.call_args.args[0], date(2120, 1, 1))  # dtstart moved to the window
+
+    def test_count_is_resolved_to_an_end_date(self):
+        rule = parse_rule("FREQ=WEEKLY;BYDAY=MO;COUNT=3\nEXDATE:20300114")
+        self.assertEqual(rule.last_date(date(2030, 1, 7)), date(2030, 1, 21))
+        self.assertEqual(list(rule.dates(date(2030, 1, 7))), [date(2030, 1, 7), date(2030, 1, 21)])
+
+    def test_invalid_rules(self):
+        for text in ("", "FREQ=HOURLY", "FREQ=DAILY;COUNT=2;UNTIL=20300101", "FREQ=WEEKLY;BYDAY=XX",
+                     "FREQ=DAILY;BYDAY=1MO", "FREQ=MONTHLY;BYMONTHDAY=0", "FREQ=DAILY;BYSETPOS=1", "FREQ=DAILY;INTERVAL=0"):
+            with self.subTest(rule=text), self.assertRaises(ValueError):
+                RecurrenceRule.parse(text)
+        with self.assertRaises(ValueError):
+            list(parse_rule("FREQ=DAILY").dates(date(2030, 1, 1)))  # Unbounded without a window end
+
+
 class AuthDashboardViewTests(TestCase):
     def setUp(self):
         self.client = Client()
@@ -614,7 +838,7 @@ class BookingCreateViewTests(TestCase):
 
     def setUp(self):
         # Create user and login client
-        self.user = User.objects.create_user(username='testuser', password='pass')
+        self.user = User.objects.create_user(username='testuser', password='pass', email='testuser@example.com')
         self.client = Client()
         self.client.login(username='testuser', password='pass')
 
@@ -638,14 +862,21 @@ class BookingCreateViewTests(TestCase):
             'recurrence_end': '',
         }
 
-        with patch('meeting.views.send_mail') as mock_send_mail:
-            response = self.client.post(self.url, data)
+        with patch('meeting.tasks.enqueue_outbox_drain') as enqueue_drain:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(self.url, data)
             self.assertRedirects(response, reverse('booking-list'))
             self.assertEqual(Booking.objects.count(), 1)
             booking = Booking.objects.first()
             self.assertEqual(booking.user, self.user)
             self.assertEqual(booking.room, self.room)
-            mock_send_mail.assert_called_once()
+            enqueue_drain.assert_called_once()
+
+        # Queued with the booking, not sent from the request
+        message = OutboxMessage.objects.get()
+        self.assertEqual((message.subject, message.recipients), ("Room Booking Confirmed", ['testuser@example.com']))
+        self.assertEqual(message.status, 'pending')
+        self.assertEqual(mail.outbox, [])
 
     def test_booking_duration_less_than_30_minutes(self):
         short_end = self.start_time + timedelta(minutes=20)
@@ -675,16 +906,15 @@ class BookingCreateViewTests(TestCase):
             'recurrence_end': recurrence_end.strftime('%Y-%m-%d'),
         }
 
-        with patch('meeting.views.send_mail') as mock_send_mail:
-            response = self.client.post(self.url, data)
-            self.assertRedirects(response, reverse('booking-list'))  # Should redirect to success_url (booking list)
-            self.assertEqual(Booking.objects.count(), 4)     # 4 bookings: day 1 + 3 recurring days
-            series_id = Booking.objects.first().series_id
+        response = self.client.post(self.url, data)
+        self.assertRedirects(response, reverse('booking-list'))  # Should redirect to success_url (booking list)
+        self.assertEqual(Booking.objects.count(), 4)     # 4 bookings: day 1 + 3 recurring days
+        series_id = Booking.objects.first().series_id
 
-            self.assertTrue(all(isinstance(b.series_id, UUID) for b in Booking.objects.all()))
-            self.assertTrue(all(b.series_id == series_id for b in Booking.objects.all()))
+        self.assertTrue(all(isinstance(b.series_id, UUID) for b in Booking.objects.all()))
+        self.assertTrue(all(b.series_id == series_id for b in Booking.objects.all()))
 
-            mock_send_mail.assert_not_called()  # Email only sent for single booking, not bulk create
+        self.assertFalse(OutboxMessage.objects.exists())  # Email only sent for single booking, not bulk create
 
     def test_booking_create_with_invalid_recurrence(self):
         recurrence_end = (self.start_time + timedelta(days=3)).date()
@@ -702,6 +932,431 @@ class BookingCreateViewTests(TestCase):
         self.assertFormError(response, 'form', None, 'Invalid recurrence value.')
         self.assertEqual(Booking.objects.count(), 0)
 
+class SeriesConflictTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='seriesuser', password='pass')
+        self.client.login(username='seriesuser', password='pass')
+        self.room = Room.objects.create(name="Series Room", capacity=10)
+        self.start = timezone.localtime(timezone.now() + timedelta(days=1)).replace(
+            hour=10, minute=0, second=0, microsecond=0
+        )
+
+    def create_booking(self, start, end, **kwargs):
+        return Booking.objects.create(
+            user=self.user, room=self.room, start_time=start, end_time=end, attendees=1, **kwargs
+        )
+
+    def daily_slots(self, days):
+        return [(self.start + timedelta(days=d), self.start + timedelta(days=d, hours=1)) for d in range(days)]
+
+    def test_find_conflicts_returns_every_conflicting_slot(self):
+        self.create_booking(self.start + timedelta(days=1), self.start + timedelta(days=1, minutes=30))
+        # Spans days 3-4 entirely, nested bookings inside it must not hide it
+        self.create_booking(self.start + timedelta(days=3, hours=-1), self.start + timedelta(days=4, hours=2))
+        self.create_booking(self.start + timedelta(days=3), self.start + timedelta(days=3, minutes=5))
+        self.create_booking(self.start + timedelta(days=6), self.start + timedelta(days=6, hours=1), cancelled=True)
+        self.create_booking(self.start + timedelta(days=5, hours=1), self.start + timedelta(days=5, hours=2))  # Touches only
+
+        with self.assertNumQueries(2):
+            conflicts = Booking.find_conflicts(self.room, self.daily_slots(7))
+
+        self.assertEqual([c[0] for c in conflicts], [
+            self.start + timedelta(days=1),
+            self.start + timedelta(days=3),
+            self.start + timedelta(days=4),
+        ])
+
+    def test_overlapping_single_booking_is_rejected(self):
+        self.create_booking(self.start + timedelta(minutes=30), self.start + timedelta(hours=2))
+
+        response = self.client.post(reverse('booking-create'), {
+            'room': self.room.id,
+            'start_time': self.start.strftime('%Y-%m-%d %H:%M:%S'),
+            'end_time': (self.start + timedelta(hours=1)).strftime('%Y-%m-%d %H:%M:%S'),
+            'attendees': 2,
+            'required_resources': '',
+            'recurrence': 'none',
+        })
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('already booked', response.context['form'].non_field_errors()[0])
+        self.assertEqual(Booking.objects.count(), 1)
+
+    def test_reserve_locks_the_room_before_checking(self):
+        booking = Booking(user=self.user, room=self.room, attendees=1,
+                          start_time=self.start, end_time=self.start + timedelta(hours=1))
+        with CaptureQueriesContext(connection) as queries:
+            self.assertTrue(Booking.reserve(booking))
+        sql = [q['sql'] for q in queries.captured_queries if 'meeting_room' in q['sql'] or 'meeting_booking' in q['sql']]
+        self.assertTrue(sql[0].startswith('UPDATE "meeting_room"') or 'FOR UPDATE' in sql[0])
+        self.assertFalse(Booking.reserve(Booking(user=self.user, room=self.room, attendees=1,
+                                                 start_time=self.start, end_time=self.start + timedelta(minutes=30))))
+
+    def test_find_conflicts_with_mixed_slot_durations(self):
+        midnight = self.start.replace(hour=0)
+        self.create_booking(midnight + timedelta(hours=3), midnight + timedelta(hours=4))
+        slots = [
+            (midnight, midnight + timedelta(hours=8)),                                 # Contains the booking
+            (midnight + timedelta(hours=1), midnight + timedelta(hours=1, minutes=30)),  # Ends before it starts
+            (midnight + timedelta(hours=3, minutes=30), midnight + timedelta(hours=5)),  # Overlaps its end
+            (midnight + timedelta(hours=4), midnight + timedelta(hours=4, minutes=30)),  # Starts as it ends
+        ]
+        self.assertEqual(Booking.find_conflicts(self.room, slots), [slots[0], slots[2]])
+
+    def test_find_conflicts_empty_series(self):
+        with self.assertNumQueries(0):
+            self.assertEqual(Booking.find_conflicts(self.room, []), [])
+
+    def test_series_create_reports_all_conflicts(self):
+        self.create_booking(self.start + timedelta(days=1), self.start + timedelta(days=1, hours=1))
+        self.create_booking(self.start + timedelta(days=2, minutes=30), self.start + timedelta(days=2, hours=2))
+
+        response = self.client.post(reverse('booking-create'), {
+            'room': self.room.id,
+            'start_time': self.start.strftime('%Y-%m-%d %H:%M:%S'),
+            'end_time': (self.start + timedelta(hours=1)).strftime('%Y-%m-%d %H:%M:%S'),
+            'attendees': 2,
+            'required_resources': '',
+            'recurrence': 'daily',
+            'recurrence_end': (self.start + timedelta(days=4)).date().strftime('%Y-%m-%d'),
+        })
+
+        self.assertEqual(response.status_code, 200)
+        errors = response.context['form'].non_field_errors()
+        self.assertEqual(len(errors), 2)
+        self.assertIn((self.start + timedelta(days=1)).strftime('%Y-%m-%d %H:%M'), errors[0])
+        self.assertIn((self.start + timedelta(days=2)).strftime('%Y-%m-%d %H:%M'), errors[1])
+        self.assertEqual(Booking.objects.count(), 2)
+
+
+class BookingSeriesTests(ColdAvailabilityMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username='seriesowner', password='pass')
+        self.client.login(username='seriesowner', password='pass')
+        self.room = Room.objects.create(name="Lazy Room", capacity=10)
+        self.start = timezone.localtime(timezone.now() + timedelta(days=1)).replace(
+            hour=10, minute=0, second=0, microsecond=0
+        )
+
+    def test_custom_rule_series(self):
+        with self.settings(BOOKING_SERIES_HORIZON_DAYS=5):
+            response = self.client.post(reverse('booking-create'), {
+                'room': self.room.id,
+                'start_time': self.start.strftime('%Y-%m-%d %H:%M:%S'),
+                'end_time': (self.start + timedelta(hours=1)).strftime('%Y-%m-%d %H:%M:%S'),
+                'attendees': 2,
+                'required_resources': '',
+                'recurrence': 'custom',
+                'recurrence_rule': 'FREQ=DAILY;INTERVAL=2;COUNT=10',
+            })
+
+        self.assertEqual(response.status_code, 302)
+        series = BookingSeries.objects.get()
+        self.assertEqual(series.recurrence_end, (self.start + timedelta(days=18)).date())
+        self.assertEqual(Booking.objects.filter(series_id=series.id).count(), 3)  # Days 0, 2, 4
+        self.assertEqual(len(list(series.remaining_occurrences())), 7)
+        lazy_start = self.start + timedelta(days=16)
+        self.assertTrue(Booking(room=self.room, start_time=lazy_start, end_time=lazy_start + timedelta(minutes=30)).is_conflicting())
+        self.assertFalse(Booking(room=self.room, start_time=lazy_start + timedelta(days=1),
+                                 end_time=lazy_start + timedelta(days=1, minutes=30)).is_conflicting())
+
+    def test_invalid_custom_rule_is_rejected(self):
+        response = self.client.post(reverse('booking-create'), {
+            'room': self.room.id,
+            'start_time': self.start.strftime('%Y-%m-%d %H:%M:%S'),
+            'end_time': (self.start + timedelta(hours=1)).strftime('%Y-%m-%d %H:%M:%S'),
+            'attendees': 2,
+            'required_resources': '',
+            'recurrence': 'custom',
+            'recurrence_rule': 'FREQ=SECONDLY',
+        })
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Invalid recurrence rule', response.context['form'].non_field_errors()[0])
+        self.assertFalse(BookingSeries.objects.exists())
+
+    def test_iter_recurrence_dates_jumps_to_window(self):
+        start = date(2030, 1, 31)
+        self.assertEqual(
+            list(iter_recurrence_dates(start, 'weekly', date(2030, 12, 31), after=date(2030, 3, 1), until=date(2030, 3, 21))),
+            [date(2030, 3, 7), date(2030, 3, 14), date(2030, 3, 21)]
+        )
+        self.assertEqual(
+            list(iter_recurrence_dates(start, 'monthly', date(2030, 5, 31))),
+            [date(2030, 1, 31), date(2030, 2, 28), date(2030, 3, 31), date(2030, 4, 30), date(2030, 5, 31)]
+        )
+
+    def test_rows_are_only_materialized_up_to_the_horizon(self):
+        series = self.create_series(days=30)
+
+        self.assertEqual(Booking.objects.filter(series_id=series.id).count(), 5)
+        self.assertEqual(series.materialized_until, timezone.localdate() + timedelta(days=5))
+        self.assertEqual(len(list(series.occurrences())), 30)
+
+    def test_lazy_occurrences_block_availability_and_conflicts(self):
+        self.create_series(days=30)
+        lazy_start = self.start + timedelta(days=20)
+        lazy_end = lazy_start + timedelta(hours=1)
+
+        self.assertTrue(Booking(room=self.room, start_time=lazy_start, end_time=lazy_end).is_conflicting())
+        conflicts = Booking.find_conflicts(self.room, [(lazy_start, lazy_end), (lazy_end, lazy_end + timedelta(hours=1))])
+        self.assertEqual(conflicts, [(lazy_start, lazy_end)])
+
+        params = {'start': lazy_start.strftime("%Y-%m-%dT%H:%M"), 'end': lazy_end.strftime("%Y-%m-%dT%H:%M")}
+        url = reverse('api-room-availability')
+        self.assertEqual(self.client.get(url, params).json(), [])  # Cold index, ORM path
+        availability_cache.get_cache().clear()
+        self.assertTrue(booking_index.is_warm)
+        self.assertEqual(self.client.get(url, params).json(), [])  # Warm index
+
+    def test_extend_materialization_rolls_the_horizon(self):
+        from .tasks import extend_series_materialization
+
+        series = self.create_series(days=30)
+        with self.settings(BOOKING_SERIES_HORIZON_DAYS=10), self.captureOnCommitCallbacks(execute=True):
+            created = extend_series_materialization()
+
+        series.refresh_from_db()
+        self.assertEqual(created, 5)
+        self.assertEqual(Booking.objects.filter(series_id=series.id).count(), 10)
+        self.assertEqual(series.materialized_until, timezone.localdate() + timedelta(days=10))
+
+    def test_cancelled_lazy_occurrence_is_never_materialized_and_frees_the_room(self):
+        from .tasks import extend_series_materialization
+
+        series = self.create_series(days=30)
+        lazy_start = self.start + timedelta(days=20)
+        url = reverse('series-occurrence-cancel', args=[series.id, lazy_start.strftime('%Y-%m-%d')])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertRedirects(self.client.post(url), reverse('series-detail', args=[series.id]))
+
+        self.assertTrue(SeriesException.objects.get(series=series, original_date=lazy_start.date()).cancelled)
+        self.assertFalse(Booking(room=self.room, start_time=lazy_start, end_time=lazy_start + timedelta(hours=1)).is_conflicting())
+
+        with self.settings(BOOKING_SERIES_HORIZON_DAYS=40), self.captureOnCommitCallbacks(execute=True):
+            extend_series_materialization()
+        rows = Booking.objects.filter(series_id=series.id)
+        self.assertEqual(rows.count(), 29)
+        self.assertFalse(rows.filter(start_time=lazy_start).exists())
+
+        # Not an occurrence (any more)
+        self.assertEqual(self.client.post(url).status_code, 404)
+
+    def test_cancelled_and_deleted_rows_stay_out_of_the_series(self):
+        series = self.create_series(days=30)
+        first, second = Booking.objects.filter(series_id=series.id).order_by('start_time')[1:3]
+        self.client.post(reverse('booking-cancel', args=[first.id]))
+        self.client.post(reverse('booking-delete', args=[second.id]))
+
+        cancelled_dates = set(SeriesException.objects.filter(series=series, cancelled=True).values_list('original_date', flat=True))
+        self.assertEqual(cancelled_dates, {timezone.localtime(first.start_time).date(), timezone.localtime(second.start_time).date()})
+
+        # Materializing those dates again skips them
+        series = BookingSeries.objects.get()
+        Booking.objects.filter(series_id=series.id, start_time__gte=first.start_time).delete()
+        series.materialized_until = timezone.localtime(first.start_time).date() - timedelta(days=1)
+        created = series.materialize(timezone.localtime(second.start_time).date() + timedelta(days=1))
+        self.assertEqual([b.start_time for b in created], [second.start_time + timedelta(days=1)])
+
+    def test_cancel_series(self):
+        from .tasks import extend_series_materialization
+
+        series = self.create_series(days=30)
+        lazy_start = self.start + timedelta(days=20)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('series-cancel', args=[series.id]))
+        self.assertRedirects(response, reverse('series-summary'))
+
+        series.refresh_from_db()
+        self.assertTrue(series.cancelled)
+        self.assertFalse(Booking.objects.filter(series_id=series.id, cancelled=False).exists())
+        self.assertFalse(Booking(room=self.room, start_time=lazy_start, end_time=lazy_start + timedelta(hours=1)).is_conflicting())
+        with self.settings(BOOKING_SERIES_HORIZON_DAYS=40):
+            self.assertEqual(extend_series_materialization(), 0)
+
+        detail = self.client.get(reverse('series-detail', args=[series.id]))
+        self.assertEqual(len(detail.context['occurrences']), 5)  # Only the cancelled rows
+        self.assertNotContains(detail, 'Cancel series')
+
+    def test_exceptions_apply_to_lazy_and_materialized_occurrences(self):
+        series = self.create_series(days=30)
+        cancelled_day = (self.start + timedelta(days=20)).date()
+        moved_day = (self.start + timedelta(days=21)).date()
+        moved_start = self.start + timedelta(days=21, hours=4)
+        with self.captureOnCommitCallbacks(execute=True):
+            SeriesException.objects.create(series=series, original_date=cancelled_day, cancelled=True)
+            SeriesException.objects.create(series=series, original_date=moved_day,
+                                           start_time=moved_start, end_time=moved_start + timedelta(hours=1))
+
+        series = BookingSeries.objects.prefetch_related('exceptions').get()
+        window = (self.start + timedelta(days=19, hours=12), self.start + timedelta(days=22))
+        # Day 20 is cancelled and day 21 only occurs at its new time
+        self.assertEqual(list(series.lazy_occurrences(*window)), [(moved_start, moved_start + timedelta(hours=1))])
+
+        with self.settings(BOOKING_SERIES_HORIZON_DAYS=40):
+            bookings = series.materialize(timezone.localdate() + timedelta(days=40))
+        starts = [booking.start_time for booking in bookings]
+        self.assertNotIn(self.start + timedelta(days=20), starts)
+        self.assertIn(moved_start, starts)
+        self.assertEqual(len(bookings), 24)
+
+    def test_editing_a_materialized_occurrence_records_an_exception(self):
+        series = self.create_series(days=30)
+        booking = Booking.objects.filter(series_id=series.id).order_by('start_time')[1]
+        new_date = (booking.start_time + timedelta(days=40)).date()
+
+        response = self.client.post(
+            reverse('edit_recurring_date', args=[booking.id, booking.start_time.date()]),
+            {'attendees': 3, 'new_date': new_date}
+        )
+
+        self.assertEqual(response.status_code, 302)
+        exception = SeriesException.objects.get()
+        self.assertEqual(exception.original_date, timezone.localtime(self.start + timedelta(days=1)).date())
+        self.assertEqual(exception.booking, booking)
+        self.assertEqual(exception.start_time.date(), new_date)
+
+    def test_booking_list_includes_lazy_occurrences(self):
+        self.create_series(days=30)
+
+        response = self.client.get(reverse('booking-list'))
+
+        # The group counts every occurrence in the window but shows them a page at a time
+        bookings = response.context['grouped_bookings'][self.room]
+        self.assertEqual(len(bookings), 25)
+        self.assertContains(response, '30 bookings')
+        next_url = response.context['booking_groups'][0]['next_url']
+
+        response = self.client.get(reverse('booking-list') + next_url)
+        bookings = response.context['grouped_bookings'][self.room]
+        self.assertEqual(len(bookings), 5)
+        self.assertEqual(bookings[-1].start_time, self.start + timedelta(days=29))
+        self.assertIsNone(response.context['booking_groups'][0]['next_url'])
+
+
+class BookingSeriesJobTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='jobowner', password='pass')
+        self.client.login(username='jobowner', password='pass')
+        self.room = Room.objects.create(name="Job Room", capacity=10)
+        self.start = timezone.localtime(timezone.now() + timedelta(days=1)).replace(
+            hour=10, minute=0, second=0, microsecond=0
+        )
+
+    def post_series(self, days):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(reverse('booking-create'), {
+                'room': self.room.id,
+                'start_time': self.start.strftime('%Y-%m-%d %H:%M:%S'),
+                'end_time': (self.start + timedelta(hours=1)).strftime('%Y-%m-%d %H:%M:%S'),
+                'attendees': 2,
+                'required_resources': '',
+                'recurrence': 'daily',
+                'recurrence_end': (self.start + timedelta(days=days - 1)).date().strftime('%Y-%m-%d'),
+            })
+
+    @override_settings(BOOKING_SERIES_ASYNC_THRESHOLD=5, BOOKING_SERIES_CHUNK_SIZE=4, BOOKING_JOBS_EAGER=True,
+                       BOOKING_SERIES_HORIZON_DAYS=10)
+    def test_large_series_is_created_in_chunks_by_a_job(self):
+        with patch.object(Booking.objects, 'bulk_create', wraps=Booking.objects.bulk_create) as bulk_create:
+            response = self.post_series(days=30)
+
+        self.assertRedirects(response, reverse('booking-list'))
+        job = BookingSeriesJob.objects.get()
+        self.assertIn(f'href="{reverse("booking-job-status", args=[job.id])}"',
+                      [str(m) for m in get_messages(response.wsgi_request)][0])
+        self.assertEqual(job.status, 'done')
+        self.assertEqual((job.occurrences, job.rows_total, job.rows_created), (30, 10, 10))
+        self.assertEqual([len(call.args[0]) for call in bulk_create.call_args_list], [4, 4, 2])
+        self.assertEqual(Booking.objects.filter(series_id=job.series_id).count(), 10)
+        self.assertEqual(job.series.materialized_until, timezone.localdate() + timedelta(days=10))
+
+        status_response = self.client.get(reverse('booking-job-status', args=[job.id]))
+        self.assertEqual(status_response.json()['status'], 'done')
+        self.assertEqual(status_response.json()['progress'], 1.0)
+        self.assertFalse(OutboxMessage.objects.exists())
+
+    @override_settings(BOOKING_SERIES_ASYNC_THRESHOLD=5)
+    def test_job_waits_for_the_worker(self):
+        from .tasks import create_booking_series
+
+        with patch('meeting.tasks.create_booking_series.delay') as delay:
+            self.post_series(days=30)
+
+        job = BookingSeriesJob.objects.get()
+        delay.assert_called_once_with(str(job.id))
+        self.assertFalse(Booking.objects.exists())
+        self.assertEqual(self.client.get(reverse('booking-job-status', args=[job.id])).json()['status'], 'pending')
+
+        User.objects.create_user(username='someoneelse', password='pass')
+        self.client.login(username='someoneelse', password='pass')
+        self.assertEqual(self.client.get(reverse('booking-job-status', args=[job.id])).status_code, 404)
+
+        self.assertEqual(create_booking_series(str(job.id)), 'done')
+        self.assertIsNone(create_booking_series(str(job.id)))  # Redelivered message is a no-op
+
+    @override_settings(BOOKING_SERIES_ASYNC_THRESHOLD=5, BOOKING_JOBS_EAGER=True)
+    def test_conflicting_job_fails_without_writing(self):
+        Booking.objects.create(user=self.user, room=self.room, attendees=1,
+                               start_time=self.start + timedelta(days=7), end_time=self.start + timedelta(days=7, hours=1))
+
+        self.post_series(days=30)
+
+        job = BookingSeriesJob.objects.get()
+        self.assertEqual(job.status, 'failed')
+        self.assertIn((self.start + timedelta(days=7)).strftime('%Y-%m-%d %H:%M'), job.error)
+        self.assertFalse(BookingSeries.objects.exists())
+        self.assertEqual(Booking.objects.count(), 1)
+
+    def test_small_series_stays_synchronous(self):
+        self.post_series(days=5)
+        self.assertFalse(BookingSeriesJob.objects.exists())
+        self.assertEqual(Booking.objects.count(), 5)
+
+    @override_settings(BOOKING_SERIES_ASYNC_THRESHOLD=5, BOOKING_SERIES_HORIZON_DAYS=3)
+    def test_threshold_counts_every_occurrence(self):
+        with patch('meeting.tasks.create_booking_series.delay'):
+            self.post_series(days=30)  # Only 3 rows up to the horizon, but 30 occurrences to check
+        self.assertEqual(BookingSeriesJob.objects.get().occurrences, 30)
+        self.assertFalse(Booking.objects.exists())
+
+    def test_multi_year_series_goes_to_a_job_with_default_settings(self):
+        with patch('meeting.tasks.create_booking_series.delay') as delay, \
+                patch.object(BookingSeries, 'occurrences') as occurrences:
+            self.post_series(days=3 * 365)
+        delay.assert_called_once()
+        occurrences.assert_not_called()  # Nothing expanded in the request
+        self.assertEqual(BookingSeriesJob.objects.get().occurrences, 3 * 365)
+
+    def test_a_job_is_claimed_once(self):
+        from .tasks import create_booking_series
+
+        job = BookingSeriesJob.objects.create(user=self.user, occurrences=3, params=BookingSeriesJob.series_params(
+            BookingSeries(room=self.room, start_time=self.start, end_time=self.start + timedelta(hours=1),
+                          recurrence='daily', recurrence_end=(self.start + timedelta(days=2)).date(),
+                          recurrence_rule='', attendees=2, required_resources='')
+        ))
+        # Another worker holding the same message got there first
+        BookingSeriesJob.objects.filter(id=job.id).update(status='running')
+        self.assertIsNone(create_booking_series(str(job.id)))
+        self.assertFalse(BookingSeries.objects.exists())
+
+
+class ConcurrentBookingTests(TransactionTestCase):
+
+    def test_concurrent_writers_never_double_book(self):
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            self.skipTest("Threads can't share an in-memory SQLite database; run against a file or server database.")
+        out = StringIO()
+        call_command('stress_booking_writes', threads=6, attempts=25, rooms=3, slots=10, stdout=out)
+        self.assertIn('double-bookings: 0', out.getvalue())
+        self.assertIn('errors: 0', out.getvalue())
+
+
 class BookingViewsTests(TestCase):
 
     def setUp(self):
@@ -810,9 +1465,10 @@ class BookingViewsTests(TestCase):
         response = self.client.get(url)
         self.assertEqual(response.status_code, 404)
 
-class AvailableRoomsAPIViewTests(TestCase):
+class AvailableRoomsAPIViewTests(ColdAvailabilityMixin, TestCase):
     
     def setUp(self):
+        super().setUp()
         self.client = APIClient()
         self.user = User.objects.create_user(username='testuser', password='pass')
     
@@ -911,6 +1567,489 @@ class AvailableRoomsAPIViewTests(TestCase):
         self.assertEqual(room_names, [self.room1.name])
 
 
+class BookingIntervalIndexTests(ColdAvailabilityMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username='indexuser', password='pass')
+        self.room1 = Room.objects.create(name="Index 1", capacity=5)
+        self.room2 = Room.objects.create(name="Index 2", capacity=5)
+        self.start = timezone.make_aware(datetime(2030, 1, 1, 10, 0))
+        self.url = reverse('api-room-availability')
+
+    def tearDown(self):
+        booking_index.reset()
+
+    def create_booking(self, room, start, end, **kwargs):
+        return Booking.objects.create(
+            user=self.user, room=room, start_time=start, end_time=end, attendees=1, **kwargs
+        )
+
+    def query(self, start, end):
+        response = APIClient().get(self.url, {
+            'start': timezone.localtime(start).strftime("%Y-%m-%dT%H:%M"),
+            'end': timezone.localtime(end).strftime("%Y-%m-%dT%H:%M"),
+        })
+        return sorted(room['name'] for room in response.data)
+
+    def test_room_intervals_overlap_with_nested_bookings(self):
+        intervals = RoomIntervals()
+        intervals.add(self.start, self.start + timedelta(hours=8), 1)  # Long booking
+        intervals.add(self.start + timedelta(hours=1), self.start + timedelta(hours=2), 2)
+
+        self.assertTrue(intervals.overlaps(self.start + timedelta(hours=5), self.start + timedelta(hours=6)))
+        self.assertFalse(intervals.overlaps(self.start + timedelta(hours=8), self.start + timedelta(hours=9)))
+        self.assertFalse(intervals.overlaps(self.start - timedelta(hours=1), self.start))
+
+        intervals.remove(self.start, self.start + timedelta(hours=8), 1)
+        self.assertFalse(intervals.overlaps(self.start + timedelta(hours=5), self.start + timedelta(hours=6)))
+        self.assertTrue(intervals.overlaps(self.start + timedelta(hours=1), self.start + timedelta(hours=3)))
+
+    def test_cold_index_falls_back_to_orm_and_warms(self):
+        self.create_booking(self.room1, self.start, self.start + timedelta(hours=1))
+        self.assertFalse(booking_index.is_warm)
+
+        names = self.query(self.start, self.start + timedelta(hours=1))
+        self.assertEqual(names, ["Index 2"])
+        self.assertTrue(booking_index.is_warm)
+
+        availability_cache.get_cache().clear()
+        booking_index.rebuild()  # Clearing the cache also reset the version the index was built at
+        with self.assertNumQueries(1):  # Only the room query; no booking subquery
+            names = self.query(self.start, self.start + timedelta(hours=1))
+        self.assertEqual(names, ["Index 2"])
+
+    def test_index_follows_saves_and_deletes(self):
+        booking_index.rebuild()
+        with self.captureOnCommitCallbacks(execute=True):
+            booking = self.create_booking(self.room2, self.start, self.start + timedelta(hours=1))
+        self.assertTrue(booking_index.is_busy(self.room2.id, self.start, self.start + timedelta(minutes=30)))
+        self.assertEqual(self.query(self.start, self.start + timedelta(hours=1)), ["Index 1"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            booking.is_active = False
+            booking.save()
+        self.assertFalse(booking_index.is_busy(self.room2.id, self.start, self.start + timedelta(hours=1)))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            booking.is_active = True
+            booking.save()
+            booking.delete()
+        self.assertEqual(self.query(self.start, self.start + timedelta(hours=1)), ["Index 1", "Index 2"])
+
+    def test_consistency_check_detects_drift_and_invalidates(self):
+        booking_index.rebuild()
+        # Not committed, so the index never hears about it
+        self.create_booking(self.room1, self.start, self.start + timedelta(hours=1))
+
+        mismatched = check_index_consistency(self.start, self.start + timedelta(hours=1))
+        self.assertEqual(mismatched, {self.room1.id})
+        self.assertFalse(booking_index.is_warm)
+
+        booking_index.rebuild()
+        self.assertEqual(check_index_consistency(self.start, self.start + timedelta(hours=1)), set())
+
+    def test_writes_from_other_processes_make_the_index_stale(self):
+        self.assertEqual(self.query(self.start, self.start + timedelta(hours=1)), ["Index 1", "Index 2"])
+        self.assertTrue(booking_index.is_current(availability_cache.current_version()))
+
+        # A Celery worker or another web process: the row and the shared version bump, no local signal
+        self.create_booking(self.room1, self.start, self.start + timedelta(hours=1))
+        availability_cache.bump_version()
+        self.assertFalse(booking_index.is_current(availability_cache.current_version()))
+
+        self.assertEqual(self.query(self.start, self.start + timedelta(hours=1)), ["Index 2"])  # ORM, then rebuilt
+        self.assertTrue(booking_index.is_current(availability_cache.current_version()))
+        self.assertTrue(booking_index.is_busy(self.room1.id, self.start, self.start + timedelta(hours=1)))
+
+    @override_settings(AVAILABILITY_INDEX_REBUILD_SECONDS=60)
+    def test_stale_index_is_rebuilt_at_most_once_per_interval(self):
+        self.query(self.start, self.start + timedelta(hours=1))
+        self.assertTrue(booking_index.is_warm)
+
+        with patch.object(booking_index, 'rebuild') as rebuild:
+            for _ in range(3):
+                availability_cache.bump_version()  # Writes from other processes
+                with self.assertNumQueries(3):  # Bookings, lazy series and rooms from the database
+                    self.query(self.start, self.start + timedelta(hours=1))
+        rebuild.assert_not_called()
+
+    @override_settings(AVAILABILITY_INDEX_REBUILD_IN_BACKGROUND=True)
+    def test_rebuild_runs_off_the_request_thread(self):
+        with patch('meeting.availability.threading.Thread') as thread:
+            self.assertEqual(self.query(self.start, self.start + timedelta(hours=1)), ["Index 1", "Index 2"])
+            thread.return_value.start.assert_called_once_with()
+            self.assertFalse(booking_index.is_warm)  # Not yet: the thread hasn't run
+            self.assertFalse(booking_index.request_rebuild())  # One rebuild at a time
+
+            # What the thread runs, minus closing its own connection
+            self.assertEqual(thread.call_args.kwargs['target'], booking_index._run_rebuild)
+            booking_index._run_rebuild(False)
+            self.assertTrue(booking_index.is_current(availability_cache.current_version()))
+            self.assertTrue(booking_index.request_rebuild())
+            self.assertEqual(thread.return_value.start.call_count, 2)
+
+    def test_local_writes_keep_the_index_current(self):
+        booking_index.rebuild()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_booking(self.room2, self.start, self.start + timedelta(hours=1))
+        self.assertTrue(booking_index.is_current(availability_cache.current_version()))
+
+    def test_change_during_a_rebuild_forces_another(self):
+        snapshot = booking_index._snapshot
+
+        def racing_snapshot(since):
+            rooms, bookings, series = snapshot(since)
+            # Committed after the snapshot was read
+            booking_index.update(999, self.room1.id, self.start, self.start + timedelta(hours=1), True)
+            return rooms, bookings, series
+
+        with patch.object(booking_index, '_snapshot', side_effect=racing_snapshot):
+            booking_index.rebuild()
+        self.assertTrue(booking_index.is_warm)
+        self.assertFalse(booking_index.is_current(availability_cache.current_version()))
+
+        booking_index.rebuild()
+        self.assertTrue(booking_index.is_current(availability_cache.current_version()))
+
+    def test_snapshot_skips_finished_bookings(self):
+        past = timezone.now() - timedelta(days=3)
+        self.create_booking(self.room1, past, past + timedelta(hours=1))
+        booking_index.rebuild()
+        self.assertFalse(booking_index.is_busy(self.room1.id, past, past + timedelta(hours=1)))
+        self.assertFalse(booking_index.covers(past))
+
+        # Windows before the snapshot's cutoff are answered by the database
+        self.assertEqual(self.query(past, past + timedelta(hours=1)), ["Index 2"])
+
+
+class LeanRoomSerializationTests(ColdAvailabilityMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.room = Room.objects.create(name="Lean", location="HQ", capacity=8, resources="Projector")
+        self.url = reverse('api-room-availability')
+        self.params = {'start': '2030-01-01T10:00', 'end': '2030-01-01T11:00'}
+
+    def test_room_rows_match_serializer_output(self):
+        self.assertEqual(room_rows(Room.objects.all()), [dict(row) for row in RoomSerializer(Room.objects.all(), many=True).data])
+
+    def test_parse_fields(self):
+        self.assertEqual(parse_fields('capacity, name,id'), ('id', 'name', 'capacity'))
+        self.assertEqual(parse_fields(''), parse_fields(None))
+        with self.assertRaises(ValueError):
+            parse_fields('name,password')
+
+    def test_sparse_fieldset(self):
+        response = self.client.get(self.url, {**self.params, 'fields': 'name,id'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content), [{'id': self.room.id, 'name': "Lean"}])
+
+        response = self.client.get(self.url, {**self.params, 'fields': 'name,secret'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_fast_renderer_matches_standard_json(self):
+        data = [{'id': 1, 'name': "Ünïcode", 'start': timezone.make_aware(datetime(2030, 1, 1, 10, 0))}]
+        rendered = FastJSONRenderer().render(data)
+        self.assertEqual(json.loads(rendered)[0]['name'], "Ünïcode")
+        with patch('meeting.renderers.orjson', None):
+            self.assertEqual(json.loads(FastJSONRenderer().render(data)), json.loads(rendered))
+
+
+class AvailabilityCacheTests(ColdAvailabilityMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        availability_cache.reset_stats()
+        self.user = User.objects.create_user(username='cacheuser', password='pass')
+        self.room = Room.objects.create(name="Cached", capacity=6, resources="Projector, TV")
+        self.start = timezone.localtime(timezone.now() + timedelta(days=2)).replace(minute=0, second=0, microsecond=0)
+        self.params = {
+            'start': self.start.strftime("%Y-%m-%dT%H:%M"),
+            'end': (self.start + timedelta(hours=1)).strftime("%Y-%m-%dT%H:%M"),
+            'capacity': '4',
+            'resources': 'tv,Projector',
+        }
+        self.url = reverse('api-room-availability')
+
+    def get_names(self, **overrides):
+        response = APIClient().get(self.url, {**self.params, **overrides})
+        return [room['name'] for room in response.data]
+
+    def test_repeated_query_is_served_from_cache(self):
+        self.assertEqual(self.get_names(), ["Cached"])
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get_names(resources=' projector , TV'), ["Cached"])  # Same normalized query
+        self.assertEqual(availability_cache.cache_stats(), {'hits': 1, 'misses': 1})
+
+    def test_booking_write_invalidates(self):
+        self.assertEqual(self.get_names(), ["Cached"])
+        with self.captureOnCommitCallbacks(execute=True):
+            booking = Booking.objects.create(
+                user=self.user, room=self.room, attendees=1,
+                start_time=self.start, end_time=self.start + timedelta(hours=1)
+            )
+        self.assertEqual(self.get_names(), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            booking.start_time = self.start + timedelta(days=1)
+            booking.end_time = self.start + timedelta(days=1, hours=1)
+            booking.save()
+        self.assertEqual(self.get_names(), ["Cached"])
+
+    def test_cancel_and_room_writes_invalidate(self):
+        booking = Booking.objects.create(
+            user=self.user, room=self.room, attendees=1,
+            start_time=self.start, end_time=self.start + timedelta(hours=1)
+        )
+        self.assertEqual(self.get_names(), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            booking.cancel(self.user)
+        self.assertEqual(self.get_names(), ["Cached"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.room.resources = "Projector"
+            self.room.save()
+        self.assertEqual(self.get_names(), [])
+
+    def test_redis_only_when_configured(self):
+        import runpy
+        from meeting_room_project import settings as project_settings
+
+        def backend(**environ):
+            with patch.dict('os.environ', environ, clear=True):
+                return runpy.run_path(project_settings.__file__)['CACHES']['default']
+
+        self.assertEqual(backend()['BACKEND'], 'django.core.cache.backends.locmem.LocMemCache')
+        redis = backend(REDIS_URL='redis://cache:6380')
+        self.assertEqual((redis['BACKEND'], redis['LOCATION']),
+                         ('django.core.cache.backends.redis.RedisCache', 'redis://cache:6380/1'))
+        self.assertEqual(backend(REDIS_URL='redis://cache:6380', CACHE_BACKEND='locmem')['BACKEND'],
+                         'django.core.cache.backends.locmem.LocMemCache')
+        self.assertEqual(backend(CACHE_BACKEND='redis')['LOCATION'], 'redis://localhost:6379/1')
+
+    def test_write_during_the_query_is_not_cached_under_its_version(self):
+        from .serializers import room_rows
+
+        def rows_then_write(*args):
+            rows = room_rows(*args)
+            # A booking from another worker commits after the query read the rows
+            Booking.objects.create(user=self.user, room=self.room, attendees=1,
+                                   start_time=self.start, end_time=self.start + timedelta(hours=1))
+            availability_cache.bump_version()
+            return rows
+
+        with patch('meeting.views.room_rows', side_effect=rows_then_write):
+            self.assertEqual(self.get_names(), ["Cached"])
+        self.assertEqual(self.get_names(), [])
+        self.assertEqual(availability_cache.cache_stats(), {'hits': 0, 'misses': 2})
+
+    def test_bulk_created_series_invalidates(self):
+        self.client.login(username='cacheuser', password='pass')
+        self.assertEqual(self.get_names(), ["Cached"])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('booking-create'), {
+                'room': self.room.id,
+                'start_time': (self.start - timedelta(days=1)).strftime('%Y-%m-%d %H:%M:%S'),
+                'end_time': (self.start - timedelta(days=1, minutes=-60)).strftime('%Y-%m-%d %H:%M:%S'),
+                'attendees': 2,
+                'required_resources': '',
+                'recurrence': 'daily',
+                'recurrence_end': self.start.date().strftime('%Y-%m-%d'),
+            })
+        self.assertEqual(Booking.objects.count(), 2)
+        self.assertEqual(self.get_names(), [])
+
+
+class AvailabilityMatrixTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='matrixuser', password='pass')
+        self.room1 = Room.objects.create(name="Grid 1", capacity=4, resources="Projector")
+        self.room2 = Room.objects.create(name="Grid 2", capacity=12)
+        self.day = timezone.make_aware(datetime(2030, 3, 4))
+        self.url = reverse('api-room-availability-matrix')
+
+    def book(self, room, start_hour, end_hour, **kwargs):
+        return Booking.objects.create(
+            user=self.user, room=room, attendees=1,
+            start_time=self.day + timedelta(hours=start_hour),
+            end_time=self.day + timedelta(hours=end_hour), **kwargs
+        )
+
+    def test_occupancy_matrix_marks_partially_covered_slots(self):
+        start = self.day + timedelta(hours=9)
+        bookings = [
+            (2, start + timedelta(minutes=45), start + timedelta(minutes=75)),  # Touches slots 1 and 2
+            (1, start - timedelta(hours=2), start + timedelta(minutes=30)),     # Clipped to slot 0
+            (99, start, start + timedelta(hours=2)),                            # Unknown room, ignored
+        ]
+        matrix = occupancy_matrix([2, 1], bookings, start, start + timedelta(hours=2), timedelta(minutes=30))
+
+        self.assertEqual(matrix.tolist(), [
+            [False, True, True, False],
+            [True, False, False, False],
+        ])
+
+    def test_encode_row(self):
+        row = np.array([True, True, False, False, False, True, False, False, False], dtype=bool)
+        self.assertEqual(encode_row(row, 'rle'), [0, 2, 3, 1, 3])
+        self.assertEqual(encode_row(row[2:], 'rle'), [3, 1, 3])
+        self.assertEqual(base64.b64decode(encode_row(row, 'bitset')), bytes([0b11000100, 0]))
+
+    def test_matrix_endpoint_for_a_whole_day(self):
+        self.book(self.room1, 9, 10)
+        self.book(self.room2, 13.5, 15)
+        self.book(self.room2, 16, 17, is_active=False)  # Cancelled bookings don't occupy slots
+
+        with self.assertNumQueries(3):  # Rooms, lazy series occurrences, then one bookings query
+            response = self.client.get(self.url, {'start': '2030-03-04', 'end': '2030-03-04', 'slot': 60, 'encoding': 'rle'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['slots'], 24)
+        self.assertEqual([room['name'] for room in response.data['rooms']], ["Grid 1", "Grid 2"])
+        self.assertEqual(response.data['occupancy'], [[9, 1, 14], [13, 2, 9]])
+
+    def test_matrix_endpoint_filters_and_validation(self):
+        response = self.client.get(self.url, {'start': '2030-03-04', 'end': '2030-03-04', 'capacity': 10})
+        self.assertEqual([room['name'] for room in response.data['rooms']], ["Grid 2"])
+
+        response = self.client.get(self.url, {'start': '2030-03-04', 'end': '2030-03-04', 'resources': 'projector'})
+        self.assertEqual([room['name'] for room in response.data['rooms']], ["Grid 1"])
+
+        for params in (
+            {'start': '2030-03-04'},
+            {'start': 'bad', 'end': '2030-03-04'},
+            {'start': '2030-03-05', 'end': '2030-03-04T10:00'},
+            {'start': '2030-03-04', 'end': '2030-03-04', 'encoding': 'png'},
+            {'start': '2030-03-04', 'end': '2030-03-04', 'slot': 1},
+            {'start': '2030-01-01', 'end': '2030-12-31', 'slot': 5},
+        ):
+            response = self.client.get(self.url, params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, params)
+
+
+class NextFreeSlotTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='slotuser', password='pass')
+        self.t0 = timezone.make_aware(datetime(2030, 5, 6, 9, 0))
+        self.url = reverse('api-room-next-free')
+
+    def at(self, minutes):
+        return self.t0 + timedelta(minutes=minutes)
+
+    def test_earliest_free_start_merges_overlapping_intervals(self):
+        busy = [(self.at(0), self.at(60)), (self.at(30), self.at(90)), (self.at(100), self.at(120))]
+        hour = timedelta(hours=1)
+        self.assertEqual(earliest_free_start(busy, self.at(0), self.at(600), hour), self.at(120))
+        self.assertEqual(earliest_free_start(busy, self.at(0), self.at(600), timedelta(minutes=10)), self.at(90))
+        self.assertIsNone(earliest_free_start(busy, self.at(0), self.at(150), hour))
+        self.assertEqual(earliest_free_start([], self.at(0), self.at(60), hour), self.at(0))
+
+    def test_find_free_slots_orders_rooms_and_includes_empty_rooms(self):
+        rows = [
+            (1, self.at(0), self.at(120)),
+            (2, self.at(0), self.at(30)),
+            (2, self.at(60), self.at(90)),  # 30 minute gap is too short for an hour
+            (3, self.at(0), self.at(600)),
+        ]
+        slots = find_free_slots([1, 2, 3, 4], iter(rows), self.at(0), self.at(600), timedelta(hours=1), 3)
+        self.assertEqual(slots, [(self.at(0), 4), (self.at(90), 2), (self.at(120), 1)])
+
+    def test_next_free_endpoint(self):
+        small = Room.objects.create(name="Small", capacity=2)
+        big = Room.objects.create(name="Big", capacity=20, resources="Projector")
+        other = Room.objects.create(name="Other big", capacity=20, resources="Projector")
+        for room, minutes in ((big, 90), (other, 30)):
+            Booking.objects.create(user=self.user, room=room, attendees=1, start_time=self.at(0), end_time=self.at(minutes))
+
+        params = {'duration': 60, 'capacity': 10, 'resources': 'projector',
+                  'after': timezone.localtime(self.t0).strftime("%Y-%m-%dT%H:%M"), 'horizon': 1, 'limit': 5}
+        with self.assertNumQueries(3):  # Rooms, lazy series occurrences, busy rows
+            response = self.client.get(self.url, params)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([(slot['room']['name'], slot['start']) for slot in response.data],
+                         [("Other big", self.at(30)), ("Big", self.at(90))])
+        self.assertEqual(response.data[0]['end'], self.at(90))
+        self.assertNotIn(small.id, [slot['room']['id'] for slot in response.data])
+
+    def test_next_free_endpoint_validation(self):
+        for params in ({}, {'duration': 'x'}, {'duration': 0}, {'duration': 30, 'horizon': 365}, {'duration': 30, 'limit': 500}):
+            response = self.client.get(self.url, params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, params)
+
+
+class MetricsTests(TestCase):
+
+    def test_histogram_renders_cumulative_buckets(self):
+        histogram = Histogram('test_seconds', 'Test histogram.', buckets=(0.1, 1))
+        histogram.observe(0.05, view='a')
+        histogram.observe(0.1, view='a')
+        histogram.observe(3, view='a')
+
+        lines = histogram.render()
+        self.assertEqual(lines[:2], ['# HELP test_seconds Test histogram.', '# TYPE test_seconds histogram'])
+        self.assertIn('test_seconds_bucket{view="a",le="0.1"} 2', lines)
+        self.assertIn('test_seconds_bucket{view="a",le="1"} 2', lines)
+        self.assertIn('test_seconds_bucket{view="a",le="+Inf"} 3', lines)
+        self.assertIn('test_seconds_count{view="a"} 3', lines)
+        self.assertIn('test_seconds_sum{view="a"} 3.15', lines)
+
+    def test_requests_are_recorded_and_exposed(self):
+        Room.objects.create(name="Metered", capacity=3)
+        self.client.get(reverse('api-room-availability-matrix'), {'start': '2030-01-01', 'end': '2030-01-01'})
+
+        self.client.force_login(User.objects.create_user(username='operator', is_staff=True))
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        body = response.content.decode()
+        self.assertIn('meeting_request_duration_seconds_count{view="api-room-availability-matrix"}', body)
+        self.assertIn('meeting_request_db_queries_bucket{view="api-room-availability-matrix",le="2"}', body)
+        self.assertIn('meeting_request_db_duration_seconds_sum{view="api-room-availability-matrix"}', body)
+        self.assertIn('meeting_availability_cache_requests_total{result="hits"}', body)
+
+    @override_settings(METRICS_TOKEN='s3cret', METRICS_ALLOWED_IPS=['10.0.0.5'])
+    def test_metrics_need_staff_a_token_or_an_allowed_address(self):
+        url = reverse('metrics')
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.assertEqual(self.client.get(url, HTTP_AUTHORIZATION='Bearer wrong').status_code, 403)
+        self.client.force_login(User.objects.create_user(username='regular'))
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+        self.assertEqual(self.client.get(url, HTTP_AUTHORIZATION='Bearer s3cret').status_code, 200)
+        self.assertEqual(self.client.get(url, REMOTE_ADDR='10.0.0.5').status_code, 200)
+        with self.settings(METRICS_TOKEN=''):
+            self.assertEqual(self.client.get(url, HTTP_AUTHORIZATION='Bearer ').status_code, 403)
+
+    def test_unnamed_views_are_labelled_by_their_path(self):
+        from .middleware import view_path
+        self.assertEqual(view_path(metrics_view), 'meeting.views.metrics_view')
+        self.assertEqual(view_path(RoomListView.as_view()), 'meeting.views.RoomListView')
+
+    def test_debug_queries_only_run_with_debug_logging(self):
+        Room.objects.create(name="Debugged", capacity=3)
+        params = {'start': '2030-01-01T10:00', 'end': '2030-01-01T11:00'}
+        url = reverse('api-room-availability')
+
+        availability_cache.get_cache().clear()
+        booking_index.rebuild()
+        with CaptureQueriesContext(connection) as quiet:
+            self.client.get(url, params)
+        availability_cache.get_cache().clear()
+        booking_index.rebuild()
+        with self.assertLogs('meeting.views', level='DEBUG'):
+            with CaptureQueriesContext(connection) as verbose:
+                self.client.get(url, params)
+        booking_index.reset()
+
+        self.assertEqual(len(quiet), 1)
+        self.assertEqual(len(verbose), 3)
+
+
 class ExportAnalyticsTests(TestCase):
     def setUp(self):
         self.client = Client()
@@ -1143,6 +2282,114 @@ class BookingEditViewTests(TestCase):
         response = self.client.get(reverse('booking-edit', args=[invalid_pk]))
         self.assertEqual(response.status_code, 404)
 
+    def edit_data(self, booking, start_shift, end_shift, **overrides):
+        data = {
+            'room': self.room.id,
+            'start_time': timezone.localtime(booking.start_time + start_shift).strftime('%Y-%m-%d %H:%M:%S'),
+            'end_time': timezone.localtime(booking.end_time + end_shift).strftime('%Y-%m-%d %H:%M:%S'),
+            'attendees': 4,
+            'required_resources': '',
+            'recurrence': booking.recurrence,
+            'recurrence_end': booking.recurrence_end or (timezone.localdate() + timedelta(days=30)),
+        }
+        data.update(overrides)
+        return data
+
+    def test_recurring_group_edit_shifts_each_occurrence(self):
+        # Whole minutes, as submitted through the form
+        Booking.objects.filter(recurrence_group=self.recurrence_group_id).update(
+            start_time=Trunc('start_time', 'minute'), end_time=Trunc('end_time', 'minute')
+        )
+        first = Booking.objects.get(pk=self.recurring_booking1.pk)
+        second = Booking.objects.get(pk=self.recurring_booking2.pk)
+
+        response = self.client.post(
+            reverse('booking-edit', args=[second.pk]),
+            self.edit_data(second, timedelta(hours=2), timedelta(hours=3))
+        )
+
+        self.assertRedirects(response, reverse('booking-list'))
+        shifted_first = Booking.objects.get(pk=first.pk)
+        shifted_second = Booking.objects.get(pk=second.pk)
+        self.assertEqual(shifted_first.start_time, first.start_time + timedelta(hours=2))
+        self.assertEqual(shifted_first.end_time, first.end_time + timedelta(hours=3))
+        self.assertEqual(shifted_second.start_time, second.start_time + timedelta(hours=2))
+        self.assertEqual(shifted_first.attendees, 4)
+        self.booking.refresh_from_db()
+        self.assertEqual(self.booking.attendees, 5)  # Outside the group
+
+    def test_series_edit_is_one_update_and_moves_the_rule(self):
+        start = timezone.localtime(timezone.now() + timedelta(days=3)).replace(hour=9, minute=0, second=0, microsecond=0)
+        with self.settings(BOOKING_SERIES_HORIZON_DAYS=10):
+            self.client.post(reverse('booking-create'), {
+                'room': self.room.id,
+                'start_time': start.strftime('%Y-%m-%d %H:%M:%S'),
+                'end_time': (start + timedelta(hours=1)).strftime('%Y-%m-%d %H:%M:%S'),
+                'attendees': 2, 'required_resources': '', 'recurrence': 'daily',
+                'recurrence_end': (start + timedelta(days=19)).date().strftime('%Y-%m-%d'),
+            })
+        series = BookingSeries.objects.get()
+        rows = list(Booking.objects.filter(series_id=series.id).order_by('start_time'))
+        SeriesException.objects.create(series=series, original_date=(start + timedelta(days=15)).date(), cancelled=True)
+        edited = rows[2]
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(
+                reverse('booking-edit', args=[edited.pk]),
+                self.edit_data(edited, timedelta(days=1, hours=1), timedelta(days=1, hours=1))
+            )
+
+        # Read before assertRedirects: following the redirect resets the query log
+        updates = [q['sql'] for q in queries.captured_queries if q['sql'].startswith('UPDATE "meeting_booking"')]
+        self.assertRedirects(response, reverse('booking-list'))
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(
+            list(Booking.objects.filter(series_id=series.id).order_by('start_time').values_list('start_time', flat=True)),
+            [row.start_time + timedelta(days=1, hours=1) for row in rows]
+        )
+        series.refresh_from_db()
+        self.assertEqual(timezone.localtime(series.start_time), start + timedelta(days=1, hours=1))
+        self.assertEqual(series.recurrence_end, (start + timedelta(days=20)).date())
+        self.assertEqual(series.exceptions.get().original_date, (start + timedelta(days=16)).date())
+        self.assertEqual(len(list(series.remaining_occurrences())), len(list(series.occurrences())) - len(rows) - 1)
+
+    def test_series_edit_conflict_changes_nothing(self):
+        second = Booking.objects.get(pk=self.recurring_booking2.pk)
+        blocker = Booking.objects.create(
+            user=self.user, room=self.room, attendees=1,
+            start_time=second.start_time + timedelta(hours=2), end_time=second.end_time + timedelta(hours=2)
+        )
+
+        response = self.client.post(
+            reverse('booking-edit', args=[self.recurring_booking1.pk]),
+            self.edit_data(Booking.objects.get(pk=self.recurring_booking1.pk), timedelta(hours=2), timedelta(hours=2))
+        )
+
+        self.assertEqual(response.status_code, 200)
+        errors = response.context['form'].non_field_errors()
+        self.assertEqual(len(errors), 1)
+        self.assertIn(timezone.localtime(blocker.start_time).strftime('%Y-%m-%d %H:%M'), errors[0])
+        self.assertEqual(Booking.objects.get(pk=second.pk).start_time, second.start_time)
+
+    def test_cancelled_group_rows_hold_no_slot(self):
+        Booking.objects.filter(recurrence_group=self.recurrence_group_id).update(
+            start_time=Trunc('start_time', 'minute'), end_time=Trunc('end_time', 'minute')
+        )
+        second = Booking.objects.get(pk=self.recurring_booking2.pk)
+        Booking.objects.filter(pk=second.pk).update(cancelled=True, is_active=False)
+        Booking.objects.create(
+            user=self.user, room=self.room, attendees=1,
+            start_time=second.start_time + timedelta(hours=2), end_time=second.end_time + timedelta(hours=2)
+        )
+        first = Booking.objects.get(pk=self.recurring_booking1.pk)
+
+        response = self.client.post(
+            reverse('booking-edit', args=[first.pk]), self.edit_data(first, timedelta(hours=2), timedelta(hours=2))
+        )
+
+        self.assertRedirects(response, reverse('booking-list'))
+        self.assertEqual(Booking.objects.get(pk=first.pk).start_time, first.start_time + timedelta(hours=2))
+
 class BookingGroupDetailViewTests(TestCase):
 
     def setUp(self):
@@ -1225,6 +2472,28 @@ class BookingGroupDetailViewTests(TestCase):
         bookings = response.context['group_bookings']
         self.assertTrue(hasattr(bookings[0], 'recurrence_dates'))
 
+    def test_status_filter_and_counts(self):
+        self.client.login(username='testuser', password='testpass')
+        self.create_booking(cancelled=True)
+        past_time = timezone.now() - timedelta(hours=2)
+        missed = self.create_booking(start_time=past_time, end_time=past_time + timedelta(minutes=30))
+
+        response = self.client.get(self.url, {'status': 'Missed'})
+
+        self.assertEqual(list(response.context['group_bookings']), [missed])
+        self.assertEqual(dict(response.context['status_counts']),
+                         {'Active': 0, 'Checked In': 0, 'Missed': 1, 'Cancelled': 1})
+
+    def test_status_comes_from_the_database(self):
+        self.client.login(username='testuser', password='testpass')
+        self.create_booking(start_time=timezone.now() - timedelta(minutes=5))
+        response = self.client.get(self.url)
+        booking = response.context['group_bookings'][0]
+        self.assertTrue(booking.checkin_allowed)
+        self.assertEqual(
+            list(Booking.objects.with_status().filter(checkin_allowed=True)), [booking]
+        )
+
 class RoomDeleteViewTests(TestCase):
     def setUp(self):
         self.client = Client()
@@ -1306,6 +2575,776 @@ class BookingDeleteViewTests(TestCase):
         self.assertEqual(response.status_code, 404)
 
 
+class CalendarFeedTests(ColdAvailabilityMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username='feeduser', password='pass')
+        self.client.login(username='feeduser', password='pass')
+        self.room = Room.objects.create(name="Feed Room", location="Floor 2", capacity=10)
+        self.start = timezone.localtime(timezone.now() + timedelta(days=1)).replace(
+            hour=10, minute=0, second=0, microsecond=0
+        )
+        self.token = ics.feed_token(self.user)
+
+    def get_feed(self, url, **headers):
+        response = self.client.get(url, **headers)
+        body = b''.join(response.streaming_content).decode() if response.status_code == 200 else ''
+        return response, body
+
+    def test_user_feed_streams_single_bookings(self):
+        Booking.objects.create(user=self.user, room=self.room, start_time=self.start,
+                               end_time=self.start + timedelta(hours=1), attendees=3)
+
+        response, body = self.get_feed(reverse('user-calendar-feed', args=[self.token]))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertTrue(response['Content-Type'].startswith('text/calendar'))
+        self.assertTrue(body.startswith('BEGIN:VCALENDAR\r\n'))
+        self.assertEqual(body.count('BEGIN:VEVENT'), 1)
+        self.assertIn(f"DTSTART;TZID=Asia/Kolkata:{self.start.strftime('%Y%m%dT%H%M%S')}", body)
+        self.assertIn('LOCATION:Feed Room\\, Floor 2', body)
+        self.assertNotIn('RRULE', body)
+
+    def test_series_is_one_event_with_rrule_and_exdates(self):
+        series = self.create_series(horizon_days=2)
+        cancelled_day = self.start + timedelta(days=1)
+        Booking.objects.filter(series_id=series.id, start_time=cancelled_day).update(cancelled=True)
+        moved_day = (self.start + timedelta(days=3)).date()
+        SeriesException.objects.create(series=series, original_date=moved_day,
+                                       start_time=self.start + timedelta(days=3, hours=4),
+                                       end_time=self.start + timedelta(days=3, hours=5))
+
+        _, body = self.get_feed(reverse('user-calendar-feed', args=[self.token]))
+
+        # The series row events are replaced by the rule, plus the moved occurrence
+        self.assertEqual(body.count('BEGIN:VEVENT'), 2)
+        self.assertIn('RRULE:FREQ=DAILY;UNTIL=', body)
+        exdate = [line for line in body.split('\r\n') if line.startswith('EXDATE')][0]
+        self.assertIn(cancelled_day.strftime('%Y%m%dT%H%M%S'), exdate)
+        self.assertIn(f"{moved_day:%Y%m%d}T100000", exdate)
+        self.assertIn((self.start + timedelta(days=3, hours=4)).strftime('%Y%m%dT%H%M%S'), body)
+
+    def test_room_feed_is_busy_only(self):
+        Booking.objects.create(user=self.user, room=self.room, start_time=self.start,
+                               end_time=self.start + timedelta(hours=1), attendees=3)
+        self.client.logout()
+
+        response, body = self.get_feed(reverse('room-calendar-feed', args=[self.room.id]))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('SUMMARY:Busy', body)
+        self.assertNotIn('Attendees', body)
+
+    def test_unchanged_feed_returns_304_without_queries(self):
+        url = reverse('user-calendar-feed', args=[self.token])
+        response, _ = self.get_feed(url)
+        etag = response['ETag']
+        self.assertTrue(response.has_header('Last-Modified'))
+
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Booking.objects.create(user=self.user, room=self.room, start_time=self.start,
+                                   end_time=self.start + timedelta(hours=1), attendees=3)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_user_feed_ignores_other_users_bookings(self):
+        url = reverse('user-calendar-feed', args=[self.token])
+        etag = self.client.get(url)['ETag']
+
+        other = User.objects.create_user(username='otherfeeduser')
+        with self.captureOnCommitCallbacks(execute=True):
+            Booking.objects.create(user=other, room=self.room, start_time=self.start,
+                                   end_time=self.start + timedelta(hours=1), attendees=3)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_feed_defines_its_time_zone(self):
+        _, body = self.get_feed(reverse('room-calendar-feed', args=[self.room.id]))
+        self.assertIn('BEGIN:VTIMEZONE\r\nTZID:Asia/Kolkata\r\nBEGIN:STANDARD\r\n', body)
+        self.assertIn('TZOFFSETFROM:+0530\r\nTZOFFSETTO:+0530\r\nTZNAME:IST\r\n', body)
+        self.assertLess(body.index('END:VTIMEZONE'), body.index('BEGIN:VEVENT') if 'BEGIN:VEVENT' in body else len(body))
+
+    def test_vtimezone_lists_daylight_saving_changes(self):
+        lines = ics.vtimezone('Europe/Berlin', 2030, 2030)
+        self.assertEqual(lines.count('BEGIN:DAYLIGHT'), 1)
+        self.assertEqual(lines.count('BEGIN:STANDARD'), 2)  # January, then the end of summer time
+        start = lines.index('BEGIN:DAYLIGHT')
+        self.assertEqual(lines[start + 1:start + 5], (
+            'DTSTART:20300331T020000', 'TZOFFSETFROM:+0100', 'TZOFFSETTO:+0200', 'TZNAME:CEST'
+        ))
+        self.assertIn('DTSTART:20301027T030000', lines)
+
+    def test_invalid_token_is_404(self):
+        response = self.client.get(reverse('user-calendar-feed', args=[f'{self.user.id}:forged']))
+        self.assertEqual(response.status_code, 404)
+
+    def test_feed_links(self):
+        response = self.client.get(reverse('calendar-feed-links'))
+        self.assertTrue(response.json()['user_feed'].endswith(f'/calendar/user/{self.token}.ics'))
+
+    def test_long_lines_are_folded(self):
+        line = ics._fold('DESCRIPTION:' + 'é' * 80)
+        parts = line[:-2].split('\r\n ')
+        self.assertTrue(all(len(part.encode()) <= 75 for part in parts))
+        self.assertEqual(''.join(parts), 'DESCRIPTION:' + 'é' * 80)
+
+    def test_monthly_rrule_clamps_to_month_end(self):
+        series = BookingSeries(
+            room=self.room, recurrence='monthly', recurrence_end=date(2031, 6, 30),
+            start_time=make_aware(datetime(2031, 1, 31, 9, 0)), end_time=make_aware(datetime(2031, 1, 31, 10, 0)),
+        )
+        self.assertTrue(ics.series_rrule(series).startswith('FREQ=MONTHLY;BYMONTHDAY=28,29,30,31;BYSETPOS=-1'))
+
+
+class BookingListViewTests(ColdAvailabilityMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username='listuser', password='pass')
+        self.client.login(username='listuser', password='pass')
+        self.rooms = [Room.objects.create(name=f"List Room {n}", capacity=10) for n in range(3)]
+        self.start = timezone.localtime(timezone.now() + timedelta(days=1)).replace(
+            hour=8, minute=0, second=0, microsecond=0
+        )
+
+    def add_bookings(self, count, offset_days=0):
+        Booking.objects.bulk_create(
+            Booking(user=self.user, room=room, attendees=2,
+                    start_time=self.start + timedelta(days=offset_days, hours=n),
+                    end_time=self.start + timedelta(days=offset_days, hours=n, minutes=30))
+            for room in self.rooms for n in range(count)
+        )
+
+    def query_count(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries.captured_queries)
+
+    @override_settings(BOOKING_LIST_PAGE_SIZE=5)
+    def test_query_count_does_not_grow_with_bookings(self):
+        self.add_bookings(3)
+        small = self.query_count(reverse('booking-list'))
+
+        self.add_bookings(12, offset_days=1)
+        self.assertEqual(self.query_count(reverse('booking-list')), small)
+
+    @override_settings(BOOKING_LIST_PAGE_SIZE=4)
+    def test_keyset_pages_one_room_group(self):
+        self.add_bookings(6)
+        response = self.client.get(reverse('booking-list'))
+        first_group = response.context['booking_groups'][0]
+        self.assertEqual(first_group['total'], 6)
+        self.assertEqual(len(first_group['bookings']), 4)
+
+        response = self.client.get(reverse('booking-list') + first_group['next_url'])
+        groups = {group['room']: group['bookings'] for group in response.context['booking_groups']}
+        self.assertEqual([b.start_time for b in groups[self.rooms[0]]],
+                         [self.start + timedelta(hours=n) for n in (4, 5)])
+        # Other rooms stay on their first page
+        self.assertEqual(len(groups[self.rooms[1]]), 4)
+
+    def test_default_window_hides_old_bookings(self):
+        old = self.start - timedelta(days=365)
+        Booking.objects.create(user=self.user, room=self.rooms[0], attendees=2,
+                               start_time=old, end_time=old + timedelta(hours=1))
+
+        response = self.client.get(reverse('booking-list'))
+        self.assertEqual(response.context['booking_groups'], [])
+
+        response = self.client.get(reverse('booking-list'), {'from': old.date().isoformat()})
+        self.assertEqual(response.context['booking_groups'][0]['total'], 1)
+
+    def test_status_filter(self):
+        self.add_bookings(2)
+        Booking.objects.filter(room=self.rooms[0]).update(cancelled=True)
+
+        response = self.client.get(reverse('booking-list'), {'status': 'Cancelled'})
+
+        groups = response.context['booking_groups']
+        self.assertEqual([group['room'] for group in groups], [self.rooms[0]])
+        self.assertEqual([b.display_status for b in groups[0]['bookings']], ['Cancelled', 'Cancelled'])
+
+    def test_invalid_window_and_cursor_fall_back(self):
+        self.add_bookings(1)
+        response = self.client.get(reverse('booking-list'), {
+            'from': '2030-02-31', f'after_{self.rooms[0].id}': 'garbage'
+        })
+        self.assertEqual(len(response.context['booking_groups']), 3)
+
+
+class SeriesSummaryViewTests(ColdAvailabilityMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username='seriesviewer', password='pass')
+        self.client.login(username='seriesviewer', password='pass')
+        self.room = Room.objects.create(name="Series Room", location="Floor 1", capacity=10)
+        self.start = timezone.localtime(timezone.now() + timedelta(days=1)).replace(
+            hour=9, minute=0, second=0, microsecond=0
+        )
+
+    def test_summary_row_per_series(self):
+        series = self.create_series(days=30)
+        Booking.objects.filter(series_id=series.id, start_time=self.start).update(cancelled=True)
+
+        response = self.client.get(reverse('series-summary'))
+
+        row, = response.context['series_rows']
+        self.assertEqual(row['series_id'], series.id)
+        self.assertEqual(row['booking_count'], 30)
+        self.assertEqual(row['cancelled_count'], 1)
+        self.assertEqual(row['next_start'], self.start + timedelta(days=1))
+        self.assertEqual(row['last_end'], self.start + timedelta(days=29, hours=1))
+        self.assertContains(response, '30 occurrences')
+
+    def test_summary_applies_exceptions_past_the_horizon(self):
+        series = self.create_series(days=30)
+        last_day = (self.start + timedelta(days=29)).date()
+        series.cancel_occurrence(day=last_day)
+        series.cancel_occurrence(day=last_day - timedelta(days=10))
+        moved = self.start + timedelta(days=28, hours=3)
+        SeriesException.objects.create(series=series, original_date=last_day - timedelta(days=1),
+                                       start_time=moved, end_time=moved + timedelta(hours=1))
+
+        row, = self.client.get(reverse('series-summary')).context['series_rows']
+
+        self.assertEqual(row['booking_count'], 30)
+        self.assertEqual(row['cancelled_count'], 2)
+        self.assertEqual(row['last_end'], moved + timedelta(hours=1))  # The last date is cancelled, the one before moved
+
+    def test_summary_ends_on_the_last_actual_occurrence(self):
+        with self.settings(BOOKING_SERIES_HORIZON_DAYS=5), self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('booking-create'), {
+                'room': self.room.id,
+                'start_time': self.start.strftime('%Y-%m-%d %H:%M:%S'),
+                'end_time': (self.start + timedelta(hours=1)).strftime('%Y-%m-%d %H:%M:%S'),
+                'attendees': 2,
+                'required_resources': '',
+                'recurrence': 'weekly',
+                'recurrence_end': (self.start + timedelta(days=60)).date().strftime('%Y-%m-%d'),  # A weekday later
+            })
+
+        row, = self.client.get(reverse('series-summary')).context['series_rows']
+
+        self.assertEqual(row['booking_count'], 9)
+        self.assertEqual(row['last_end'], self.start + timedelta(weeks=8, hours=1))
+
+    @override_settings(BOOKING_LIST_PAGE_SIZE=10)
+    def test_detail_pages_through_rows_then_lazy_occurrences(self):
+        series = self.create_series(days=30)
+        url = reverse('series-detail', args=[series.id])
+
+        starts = []
+        while url:
+            response = self.client.get(url)
+            self.assertLessEqual(len(response.context['occurrences']), 10)
+            starts += [booking.start_time for booking in response.context['occurrences']]
+            next_url = response.context['next_url']
+            url = reverse('series-detail', args=[series.id]) + next_url if next_url else None
+
+        self.assertEqual(starts, [self.start + timedelta(days=n) for n in range(30)])
+
+    @override_settings(BOOKING_LIST_PAGE_SIZE=10)
+    def test_detail_query_count_does_not_depend_on_series_length(self):
+        counts = []
+        for days in (30, 400):
+            BookingSeries.objects.all().delete()
+            Booking.objects.all().delete()
+            series = self.create_series(days=days)
+            with CaptureQueriesContext(connection) as queries:
+                self.client.get(reverse('series-detail', args=[series.id]))
+            counts.append(len(queries.captured_queries))
+        self.assertEqual(counts[0], counts[1])
+
+    def test_other_users_series_is_404(self):
+        series = self.create_series(days=10)
+        User.objects.create_user(username='stranger', password='pass')
+        self.client.login(username='stranger', password='pass')
+
+        response = self.client.get(reverse('series-detail', args=[series.id]))
+        self.assertEqual(response.status_code, 404)
+
+
+class ConditionalPageTests(ColdAvailabilityMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username='reloader', password='pass')
+        self.other = User.objects.create_user(username='neighbour', password='pass')
+        self.client.login(username='reloader', password='pass')
+        self.room = Room.objects.create(name="Reload Room", capacity=10)
+        self.start = timezone.localtime(timezone.now() + timedelta(days=1)).replace(
+            hour=9, minute=0, second=0, microsecond=0
+        )
+        self.book(self.user)
+
+    def book(self, user, hours=0):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Booking.objects.create(user=user, room=self.room, attendees=2,
+                                          start_time=self.start + timedelta(hours=hours),
+                                          end_time=self.start + timedelta(hours=hours, minutes=30))
+
+    def revalidate(self, url):
+        etag = self.client.get(url)['ETag']
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        booking_queries = [q['sql'] for q in queries.captured_queries if 'meeting_booking' in q['sql']]
+        return response, booking_queries
+
+    def test_unchanged_pages_return_304_without_booking_queries(self):
+        for url in (reverse('booking-list'), reverse('booking-group-detail', args=[self.room.id]),
+                    reverse('series-summary'), reverse('analytics_dashboard')):
+            response, booking_queries = self.revalidate(url)
+            self.assertEqual(response.status_code, 304, url)
+            self.assertEqual(booking_queries, [], url)
+
+    def test_other_users_writes_keep_the_page_valid(self):
+        url = reverse('booking-list')
+        etag = self.client.get(url)['ETag']
+
+        self.book(self.other, hours=2)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        self.book(self.user, hours=4)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_room_changes_invalidate_every_users_pages(self):
+        url = reverse('booking-list')
+        etag = self.client.get(url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.room.name = "Renamed Room"
+            self.room.save()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_validators_roll_over_with_the_clock(self):
+        url = reverse('booking-list')
+        etag = self.client.get(url)['ETag']
+        with patch('meeting.views.time.time', return_value=time.time() + 120):
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_pending_messages_are_never_304(self):
+        url = reverse('booking-list')
+        etag = self.client.get(url)['ETag']
+        # Cancelling an already cancelled booking only leaves a message behind
+        booking = Booking.objects.get(user=self.user)
+        Booking.objects.filter(id=booking.id).update(is_active=False)
+        self.client.post(reverse('booking-cancel', args=[booking.id]))
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Booking already cancelled.')
+
+
+class AutoCancelSweepTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='sleeper', password='pass')
+        self.room = Room.objects.create(name="Sweep Room", capacity=10, is_available=False)
+        self.now = timezone.now()
+
+    def book(self, minutes_ago, **kwargs):
+        start = self.now - timedelta(minutes=minutes_ago)
+        return Booking.objects.create(user=self.user, room=self.room, attendees=1,
+                                      start_time=start, end_time=start + timedelta(hours=1), **kwargs)
+
+    def sweep(self):
+        from .tasks import auto_cancel_unchecked_bookings
+        with self.captureOnCommitCallbacks(execute=True):
+            return auto_cancel_unchecked_bookings()
+
+    def test_cancels_only_the_expired_window(self):
+        expired = self.book(15)
+        in_window = self.book(5)
+        checked_in = self.book(15, checked_in=True)
+        ancient = self.book(60 * 24 * 90)
+
+        result = self.sweep()
+
+        self.assertEqual(result['cancelled'], 1)
+        self.assertEqual(result['rooms_released'], 1)
+        self.assertIn('elapsed_ms', result)
+        self.assertEqual(
+            set(Booking.objects.filter(cancelled=True).values_list('id', flat=True)), {expired.id}
+        )
+        for booking in (in_window, checked_in, ancient):
+            booking.refresh_from_db()
+            self.assertFalse(booking.cancelled)
+        self.room.refresh_from_db()
+        self.assertTrue(self.room.is_available)
+
+    def test_query_count_does_not_grow_with_expired_bookings(self):
+        counts = []
+        for number in (2, 20):
+            Booking.objects.all().delete()
+            SweepCheckpoint.objects.all().delete()
+            for n in range(number):
+                self.book(15 + n)
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(self.sweep()['cancelled'], number)
+            counts.append(len(queries.captured_queries))
+        self.assertEqual(counts[0], counts[1])
+
+    def test_sweep_bumps_the_owners_page_version(self):
+        self.book(15)
+        version = availability_cache.user_version(self.user.id)
+        self.sweep()
+        self.assertNotEqual(availability_cache.user_version(self.user.id), version)
+
+    def test_batches_resume_from_the_checkpoint(self):
+        bookings = [self.book(15 + n) for n in range(5)]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            result = run_sweep(now=self.now, batch_size=2, time_budget=0)
+        self.assertEqual((result['cancelled'], result['batches'], result['complete']), (2, 1, False))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            result = run_sweep(now=self.now, batch_size=2)
+        self.assertEqual((result['cancelled'], result['batches'], result['complete']), (3, 2, True))
+        self.assertEqual(Booking.objects.filter(cancelled=True).count(), 5)
+        self.assertEqual(SweepCheckpoint.objects.get().booking_id, bookings[0].id)  # The latest start
+
+    def test_next_run_only_scans_new_candidates(self):
+        self.book(15)
+        self.sweep()
+        checkpoint = SweepCheckpoint.objects.get().start_time
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.sweep()['cancelled'], 0)
+        self.assertTrue(any('"start_time" >' in q['sql'] for q in queries.captured_queries))
+        self.assertEqual(SweepCheckpoint.objects.get().start_time, checkpoint)
+
+    def test_next_run_catches_bookings_behind_the_checkpoint(self):
+        self.book(15)
+        self.sweep()
+        checkpoint = SweepCheckpoint.objects.get().start_time
+        # Created after the sweep passed its start time, e.g. booked or moved into the past
+        behind = self.book(30)
+        ancient = self.book(60 * 24)
+
+        result = self.sweep()
+
+        self.assertEqual((result['cancelled'], result['caught_up']), (1, 1))
+        behind.refresh_from_db()
+        self.assertTrue(behind.cancelled)
+        ancient.refresh_from_db()
+        self.assertFalse(ancient.cancelled)  # Older than the lookback, like on the first run
+        self.assertEqual(SweepCheckpoint.objects.get().start_time, checkpoint)
+
+    @override_settings(BOOKING_JOBS_EAGER=True)
+    def test_periodic_sweep_emails_the_owners(self):
+        User.objects.filter(id=self.user.id).update(email='sleeper@example.com')
+        self.book(15)
+        self.book(20)
+
+        self.sweep()
+
+        self.assertEqual([message.to for message in mail.outbox], [['sleeper@example.com']])
+        self.assertEqual(mail.outbox[0].subject, '2 Bookings Auto-Cancelled')
+
+    def test_dry_run_writes_nothing(self):
+        self.book(15)
+        result = run_sweep(now=self.now, dry_run=True)
+        self.assertEqual(result['cancelled'], 1)
+        self.assertFalse(Booking.objects.filter(cancelled=True).exists())
+        self.assertFalse(SweepCheckpoint.objects.exists())
+
+    @override_settings(BOOKING_JOBS_EAGER=True)
+    def test_commands_wrap_the_engine(self):
+        self.user.email = 'sleeper@example.com'
+        self.user.save()
+        self.book(15)
+        out = StringIO()
+        call_command('auto_cancel_bookings', dry_run=True, stdout=out)
+        self.assertIn('1 bookings would be cancelled', out.getvalue())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('auto_cancel_unchecked', stdout=out)
+        self.assertEqual([message.to for message in mail.outbox], [['sleeper@example.com']])
+        self.assertIn('1 bookings cancelled', out.getvalue())
+
+        call_command('auto_cancel_bookings', stdout=out)
+        self.assertIn('0 bookings cancelled', out.getvalue())
+
+
+class CancellationNoticeTests(TestCase):
+
+    def setUp(self):
+        self.room = Room.objects.create(name="Notice Room", capacity=10)
+        self.start = timezone.now() - timedelta(minutes=30)
+
+    def bookings_for(self, username, count, email=None):
+        user = User.objects.create_user(username=username, email=f'{username}@example.com' if email is None else email)
+        return [
+            Booking.objects.create(user=user, room=self.room, attendees=1, start_time=self.start + timedelta(hours=n),
+                                   end_time=self.start + timedelta(hours=n, minutes=30), cancelled=True)
+            for n in range(count)
+        ]
+
+    def test_one_message_per_user_from_one_query(self):
+        from .tasks import send_cancellation_notices
+        ids = [b.id for b in self.bookings_for('early', 3) + self.bookings_for('late', 1) + self.bookings_for('anon', 1, email='')]
+
+        with self.assertNumQueries(1):
+            sent = send_cancellation_notices(ids)
+
+        self.assertEqual(sent, 2)
+        by_recipient = {message.to[0]: message for message in mail.outbox}
+        self.assertEqual(by_recipient['early@example.com'].subject, '3 Bookings Auto-Cancelled')
+        self.assertEqual(by_recipient['early@example.com'].body.count('- Notice Room at'), 3)
+        self.assertEqual(by_recipient['late@example.com'].subject, 'Booking Auto-Cancelled')
+
+    def test_messages_share_one_connection(self):
+        from .tasks import send_cancellation_notices
+        ids = [b.id for b in self.bookings_for('first', 1) + self.bookings_for('second', 1)]
+        with patch('django.core.mail.get_connection', wraps=__import__('django.core.mail', fromlist=['x']).get_connection) as get_connection:
+            send_cancellation_notices(ids)
+        self.assertEqual(get_connection.call_count, 1)
+        self.assertEqual(len(mail.outbox), 2)
+
+    @patch('meeting.tasks.send_cancellation_notices.delay')
+    def test_sweep_hands_notices_to_the_notifications_worker(self, delay):
+        booking, = self.bookings_for('sleepy', 1)
+        Booking.objects.filter(id=booking.id).update(cancelled=False)
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('auto_cancel_unchecked', from_scratch=True, stdout=StringIO())
+        delay.assert_called_once_with([booking.id])
+        self.assertEqual(mail.outbox, [])
+
+
+class CheckinExpiryTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='latecomer', password='pass')
+        self.room = Room.objects.create(name="Expiry Room", capacity=10)
+        self.now = timezone.now()
+
+    def book(self, minutes_from_now, **kwargs):
+        start = self.now + timedelta(minutes=minutes_from_now)
+        return Booking.objects.create(user=self.user, room=self.room, attendees=1,
+                                      start_time=start, end_time=start + timedelta(hours=1), **kwargs)
+
+    @patch('meeting.tasks.expire_booking_checkin.apply_async')
+    def test_expiry_is_queued_at_the_checkin_deadline(self, apply_async):
+        with self.captureOnCommitCallbacks(execute=True):
+            booking = self.book(20)
+            self.book(60 * 24 * 7)  # Too far ahead; the scheduler queues it later
+            self.book(20, checked_in=True)
+
+        apply_async.assert_called_once_with(
+            (booking.id,), eta=booking.start_time + timedelta(minutes=10, seconds=5)
+        )
+
+    @patch('meeting.tasks.expire_booking_checkin.apply_async')
+    def test_scheduler_queues_the_next_window_only(self, apply_async):
+        from .tasks import schedule_checkin_expiries
+        soon = self.book(40)
+        self.book(-30)  # Deadline already passed; left to the sweep
+        self.book(60 * 5)
+
+        self.assertEqual(schedule_checkin_expiries(), 1)
+        self.assertEqual(apply_async.call_args.args[0], (soon.id,))
+
+    @patch('meeting.tasks.expire_booking_checkin.apply_async', side_effect=OSError('broker down'))
+    def test_broker_failure_does_not_fail_the_booking(self, apply_async):
+        with self.captureOnCommitCallbacks(execute=True):
+            booking = self.book(20)
+        self.assertTrue(Booking.objects.filter(id=booking.id).exists())
+
+    def test_expiry_task_cancels_and_releases_the_room(self):
+        from .tasks import expire_booking_checkin
+        Room.objects.filter(id=self.room.id).update(is_available=False)
+        expired = self.book(-11)
+        early = self.book(-5)
+        checked_in = self.book(-11, checked_in=True)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertTrue(expire_booking_checkin(expired.id))
+        self.assertFalse(expire_booking_checkin(early.id))
+        self.assertFalse(expire_booking_checkin(checked_in.id))
+        self.assertFalse(expire_booking_checkin(expired.id))  # Already cancelled
+
+        self.assertEqual(list(Booking.objects.filter(cancelled=True)), [expired])
+        self.room.refresh_from_db()
+        self.assertTrue(self.room.is_available)
+
+    @override_settings(BOOKING_JOBS_EAGER=True)
+    def test_expiry_task_emails_the_owner(self):
+        from .tasks import expire_booking_checkin
+        User.objects.filter(id=self.user.id).update(email='latecomer@example.com')
+        expired = self.book(-11)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            expire_booking_checkin(expired.id)
+
+        self.assertEqual([message.to for message in mail.outbox], [['latecomer@example.com']])
+        self.assertEqual(mail.outbox[0].subject, 'Booking Auto-Cancelled')
+
+    @patch('meeting.tasks.expire_booking_checkin.apply_async')
+    def test_shifted_bookings_are_queued_at_their_new_deadline(self, apply_async):
+        from .signals import bookings_changed_in_bulk
+        moved = self.book(60 * 5, recurrence_group=7)
+        self.book(60 * 29, recurrence_group=7)  # Still beyond the scheduling window after the move
+        self.book(60 * 5, recurrence_group=7, checked_in=True)
+        apply_async.reset_mock()
+        group = Booking.objects.filter(recurrence_group=7)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            group.shift(timedelta(hours=-4, minutes=-40), timedelta(hours=-4, minutes=-40))
+            bookings_changed_in_bulk([self.user.id], moved_ids=group.values('id'))
+
+        apply_async.assert_called_once_with(
+            (moved.id,), eta=moved.start_time - timedelta(hours=4, minutes=30, seconds=-5)
+        )
+
+    def test_beat_schedule_comes_from_settings(self):
+        from django.conf import settings
+        from meeting_room_project.celery import app
+        self.assertEqual(app.conf.beat_schedule, settings.CELERY_BEAT_SCHEDULE)
+        self.assertTrue(all(entry['task'].startswith('meeting.tasks.') for entry in app.conf.beat_schedule.values()))
+
+
+class FlakyBackend(LocmemBackend):
+    # locmem backend that fails for addresses in `failing`
+    failing = set()
+
+    def send_messages(self, messages):
+        for message in messages:
+            if set(message.to) & self.failing:
+                raise ConnectionError("Recipient server unavailable")
+        return super().send_messages(messages)
+
+
+@override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend', OUTBOX_RETRY_BASE_SECONDS=30,
+                   OUTBOX_RETRY_MAX_SECONDS=100, OUTBOX_MAX_ATTEMPTS=3)
+class OutboxTests(ColdAvailabilityMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        FlakyBackend.failing = set()
+        self.user = User.objects.create_user(username='mailer', password='pass', email='mailer@example.com')
+        self.client.login(username='mailer', password='pass')
+        self.room = Room.objects.create(name="Outbox Room", capacity=10)
+        self.start = timezone.localtime(timezone.now() + timedelta(days=1)).replace(microsecond=0)
+
+    def queue(self, count, recipient='someone@example.com'):
+        from .outbox import queue_email
+        return [queue_email(f"Subject {n}", "Body", [recipient]) for n in range(count)]
+
+    def test_booking_commits_its_email_and_the_drain_sends_it(self):
+        with self.settings(BOOKING_JOBS_EAGER=True), self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('booking-create'), {
+                'room': self.room.id,
+                'start_time': self.start.strftime('%Y-%m-%d %H:%M:%S'),
+                'end_time': (self.start + timedelta(hours=1)).strftime('%Y-%m-%d %H:%M:%S'),
+                'attendees': 2, 'required_resources': '', 'recurrence': 'none', 'recurrence_end': '',
+            })
+        self.assertEqual([message.to for message in mail.outbox], [['mailer@example.com']])
+        message = OutboxMessage.objects.get()
+        self.assertEqual((message.status, message.attempts), ('sent', 1))
+        self.assertIsNotNone(message.sent_at)
+
+    def test_rejected_booking_queues_nothing(self):
+        Booking.objects.create(user=self.user, room=self.room, attendees=1,
+                               start_time=self.start, end_time=self.start + timedelta(hours=1))
+        response = self.client.post(reverse('booking-create'), {
+            'room': self.room.id,
+            'start_time': self.start.strftime('%Y-%m-%d %H:%M:%S'),
+            'end_time': (self.start + timedelta(hours=1)).strftime('%Y-%m-%d %H:%M:%S'),
+            'attendees': 2, 'required_resources': '', 'recurrence': 'none', 'recurrence_end': '',
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(OutboxMessage.objects.exists())
+
+    def test_users_without_an_address_queue_nothing(self):
+        from .outbox import queue_email
+        self.assertIsNone(queue_email("Subject", "Body", ['']))
+        self.assertFalse(OutboxMessage.objects.exists())
+
+    def test_batches_share_one_connection(self):
+        from .outbox import drain
+        self.queue(5)
+        with patch('meeting.outbox.get_connection', wraps=__import__('django.core.mail', fromlist=['x']).get_connection) as get_connection:
+            result = drain(batch_size=2)
+        self.assertEqual((result['sent'], result['batches']), (5, 3))
+        self.assertEqual(get_connection.call_count, 3)
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertFalse(OutboxMessage.objects.filter(status='pending').exists())
+
+    def test_failures_back_off_then_give_up(self):
+        from .outbox import drain
+        FlakyBackend.failing = {'down@example.com'}
+        backend = 'meeting.tests.FlakyBackend'
+        bad, = self.queue(1, 'down@example.com')
+        self.queue(1)
+        now = timezone.now()
+
+        result = drain(backend=backend, now=now)
+        self.assertEqual((result['sent'], result['retried'], result['failed']), (1, 1, 0))
+        bad.refresh_from_db()
+        self.assertEqual((bad.status, bad.attempts), ('pending', 1))
+        self.assertEqual(bad.next_attempt_at, now + timedelta(seconds=30))
+        self.assertIn('Recipient server unavailable', bad.last_error)
+
+        # Not due yet
+        self.assertEqual(drain(backend=backend, now=now + timedelta(seconds=29))['batches'], 0)
+
+        drain(backend=backend, now=now + timedelta(seconds=30))
+        bad.refresh_from_db()
+        self.assertEqual(bad.next_attempt_at, now + timedelta(seconds=90))  # 30s later doubled to 60s
+
+        result = drain(backend=backend, now=now + timedelta(seconds=90))
+        bad.refresh_from_db()
+        self.assertEqual(result['failed'], 1)
+        self.assertEqual((bad.status, bad.attempts), ('failed', 3))
+        self.assertEqual(drain(backend=backend, now=now + timedelta(days=1))['batches'], 0)
+
+    def test_connection_failure_retries_the_whole_batch(self):
+        from .outbox import drain
+        self.queue(2)
+        with patch.object(LocmemBackend, 'open', side_effect=OSError("Connection refused")):
+            result = drain()
+        self.assertEqual((result['sent'], result['retried']), (0, 2))
+        self.assertEqual(mail.outbox, [])
+        self.assertEqual(OutboxMessage.objects.filter(status='pending', attempts=1).count(), 2)
+
+    def test_claimed_messages_are_leased(self):
+        from .outbox import claim
+        self.queue(2)
+        now = timezone.now()
+        self.assertEqual(len(claim(10, now)), 2)
+        self.assertEqual(claim(10, now), [])  # Another drainer finds nothing
+        with self.settings(OUTBOX_LEASE_SECONDS=300):
+            self.assertEqual(len(claim(10, now + timedelta(seconds=300))), 2)  # The first one died
+
+    def test_queue_depth_metrics_and_command(self):
+        from .outbox import queue_depth
+        self.queue(3)
+        OutboxMessage.objects.filter(id=OutboxMessage.objects.first().id).update(status='failed')
+        counts, age = queue_depth()
+        self.assertEqual(counts, {'pending': 2, 'failed': 1})
+        self.assertGreaterEqual(age, 0)
+
+        with self.settings(METRICS_TOKEN='scraper'):
+            body = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer scraper').content.decode()
+        self.assertIn('meeting_outbox_messages{status="pending"} 2', body)
+        self.assertIn('meeting_outbox_messages{status="failed"} 1', body)
+        self.assertIn('meeting_outbox_oldest_pending_age_seconds ', body)
+
+        out = StringIO()
+        call_command('drain_outbox', backend='locmem', stdout=out)
+        self.assertIn('2 sent', out.getvalue())
+        self.assertIn('queue: 0 pending, 1 failed', out.getvalue())
+        self.assertEqual(len(mail.outbox), 2)
+
+
 if __name__ == '__main__':
     unittest.main()
 
@@ -1,6 +1,7 @@
 # meeting/urls.py
 from django.urls import path
-from .views import (BookingCreateView, BookingListView, booking_checkin, AvailableRoomsAPIView)
+from .views import (BookingCreateView, BookingListView, booking_checkin, AvailableRoomsAPIView, AvailabilityMatrixAPIView,
+                    NextFreeSlotAPIView)
 from . import views
 from django.contrib.auth import views as auth_views
 
@@ -31,13 +32,29 @@ urlpatterns = [
     path('bookings/<int:booking_id>/cancel/', views.cancel_booking, name='booking-cancel'),
     path('edit-recurring-date/<int:booking_id>/<str:date>/', views.edit_recurring_date, name='edit_recurring_date'),
     path('bookings/group/<int:room_id>/', views.booking_group_detail, name='booking-group-detail'),
+    path('bookings/series/', views.series_summary, name='series-summary'),
+    path('bookings/series/<uuid:series_id>/', views.series_detail, name='series-detail'),
+    path('bookings/series/<uuid:series_id>/cancel/', views.cancel_series, name='series-cancel'),
+    path('bookings/series/<uuid:series_id>/<str:date>/cancel/', views.cancel_series_occurrence,
+         name='series-occurrence-cancel'),
+    path('bookings/jobs/<uuid:job_id>/', views.booking_job_status, name='booking-job-status'),
+
+    # Calendar feeds
+    path('calendar/feeds/', views.calendar_feed_links, name='calendar-feed-links'),
+    path('calendar/user/<str:token>.ics', views.user_calendar_feed, name='user-calendar-feed'),
+    path('calendar/room/<int:room_id>.ics', views.room_calendar_feed, name='room-calendar-feed'),
 
     # Room availability
     path('api/rooms/available/', AvailableRoomsAPIView.as_view(), name='api-room-availability'),
+    path('api/rooms/availability-matrix/', AvailabilityMatrixAPIView.as_view(), name='api-room-availability-matrix'),
+    path('api/rooms/next-free/', NextFreeSlotAPIView.as_view(), name='api-room-next-free'),
 
     # Room analytics
     path('analytics/', views.analytics_dashboard, name='analytics_dashboard'),
     path('analytics/export/csv/', views.export_analytics_csv, name='export_analytics_csv'),
     path('analytics/export/json/', views.export_analytics_json, name='export_analytics_json'),
+
+    # Prometheus metrics
+    path('metrics', views.metrics_view, name='metrics'),
 ]
 
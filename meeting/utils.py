@@ -1,38 +1,190 @@
 # utils.py
+from bisect import bisect_left
+from collections.abc import Sequence
 from datetime import timedelta
+from functools import lru_cache
+from itertools import islice
+import numpy as np
 from dateutil.relativedelta import relativedelta  # used to shift dates
+from .recurrence import iter_rule_dates
+
+
+def parse_resources(value):
+    # Normalizes "Projector, whiteboard ,TV" (or a list of names) into ['projector', 'whiteboard', 'tv']
+    if not value:
+        return []
+    names = value.split(',') if isinstance(value, str) else value
+    normalized = []
+    for name in names:
+        name = ' '.join(name.split()).lower()
+        if name and name not in normalized:
+            normalized.append(name)
+    return normalized
+
+
+RECURRENCE_CACHE_SIZE = 1024  # Distinct (start date, rule, end date) expansions kept
+
 
 def get_recurrence_dates(booking):
-    recurrence = booking.recurrence
-    start_date = booking.start_time.date()
-    end_date = booking.recurrence_end
+    return list(expand_recurrence(
+        booking.start_time.date(), booking.recurrence, booking.recurrence_end, getattr(booking, 'recurrence_rule', None)
+    ))
+
 
+@lru_cache(maxsize=RECURRENCE_CACHE_SIZE)
+def expand_recurrence(start_date, recurrence, end_date, rule=None):
+    # Every date of the rule as a tuple. The result is cached and shared between
+    # callers, so it is immutable; wrap it (RecurrenceDates) rather than copying it.
     if not end_date:  # No recurrence set
-        return []
+        return ()
+
+    if recurrence == 'custom':
+        return tuple(iter_recurrence_dates(start_date, recurrence, end_date, rule=rule))
+
+    if recurrence in ('daily', 'weekly'):
+        step = 1 if recurrence == 'daily' else 7
+        days = np.arange(np.datetime64(start_date, 'D'), np.datetime64(end_date, 'D') + 1, step)
+        return tuple(days.tolist())  # datetime64[D] converts back to datetime.date
+
+    if recurrence == 'monthly':
+        # Same day of month as the start, clamped to the month's last day (Jan 31 -> Feb 28)
+        return tuple(iter_recurrence_dates(start_date, recurrence, end_date))
+
+    return ()
+
+
+class RecurrenceDates(Sequence):
+    # Read-only view of a cached expansion starting at `offset`, so every row of a
+    # series can list "its" remaining dates without copying the shared tuple
+    __slots__ = ('dates', 'offset')
+
+    def __init__(self, dates, offset=0):
+        self.dates = dates
+        self.offset = offset
+
+    def __len__(self):
+        return len(self.dates) - self.offset
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self.dates[self.offset:][index]
+        if not isinstance(index, int):
+            raise TypeError(f"indices must be integers or slices, not {type(index).__name__}")
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('recurrence date index out of range')
+        return self.dates[self.offset + index]
+
+    def __iter__(self):
+        return islice(self.dates, self.offset, None)
+
+
+class SeriesDateExpander:
+    # Hands out recurrence dates for booking rows (ordered by start time) so that all
+    # rows of a series_id share one expansion, anchored at the series' first row
+    def __init__(self):
+        self.anchors = {}
+
+    def dates_for(self, booking):
+        start_date = booking.start_time.date()
+        anchor = start_date
+        rule = (booking.recurrence, booking.recurrence_end, getattr(booking, 'recurrence_rule', None))
+        if booking.series_id:
+            anchor = self.anchors.setdefault((booking.series_id,) + rule, start_date)
+
+        dates = expand_recurrence(anchor, *rule)
+        offset = bisect_left(dates, start_date)
+        if offset == len(dates) or dates[offset] != start_date:
+            # Row was moved off the series' rule; expand from its own date instead
+            dates, offset = expand_recurrence(start_date, *rule), 0
+        return RecurrenceDates(dates, offset)
+
+
+def _month_index(start_date, day):
+    return (day.year - start_date.year) * 12 + day.month - start_date.month
+
+
+def count_recurrence_dates(start_date, recurrence, end_date, after=None, rule=None):
+    # How many dates iter_recurrence_dates() yields from `after` on, without walking them:
+    # arithmetic for the fixed rules, a bisect of the cached expansion for custom RRULEs
+    if not end_date or recurrence not in ('daily', 'weekly', 'monthly', 'custom'):
+        return 0
+    after = max(after or start_date, start_date)
+    if after > end_date:
+        return 0
+
+    if recurrence in ('daily', 'weekly'):
+        step = 1 if recurrence == 'daily' else 7
+        first = -(-(after - start_date).days // step)  # ceil division
+        last = (end_date - start_date).days // step
+        return max(0, last - first + 1)
+
+    if recurrence == 'monthly':
+        first = _month_index(start_date, after)
+        if start_date + relativedelta(months=first) < after:
+            first += 1
+        last = _month_index(start_date, end_date)
+        if start_date + relativedelta(months=last) > end_date:
+            last -= 1
+        return max(0, last - first + 1)
+
+    dates = expand_recurrence(start_date, recurrence, end_date, rule)
+    return len(dates) - bisect_left(dates, after)
+
+
+def reversed_recurrence_dates(start_date, recurrence, end_date, rule=None):
+    # The series' dates from the last one backwards. The last date isn't always end_date:
+    # a weekly or monthly rule, or an RRULE UNTIL, can stop short of it.
+    if not end_date or recurrence not in ('daily', 'weekly', 'monthly', 'custom'):
+        return
+
+    if recurrence in ('daily', 'weekly'):
+        step = 1 if recurrence == 'daily' else 7
+        current = start_date + timedelta(days=(end_date - start_date).days // step * step)
+        while current >= start_date:
+            yield current
+            current -= timedelta(days=step)
+        return
+
+    if recurrence == 'monthly':
+        for index in range(_month_index(start_date, end_date), -1, -1):
+            current = start_date + relativedelta(months=index)
+            if current <= end_date:
+                yield current
+        return
+
+    yield from reversed(expand_recurrence(start_date, recurrence, end_date, rule))
+
+
+def iter_recurrence_dates(start_date, recurrence, end_date, after=None, until=None, rule=None):
+    # Yields the series' dates within [after, until] (both optional) without walking
+    # the dates before `after`: daily/weekly jump straight to the first index in range,
+    # custom RRULEs start from the rule period containing `after`.
+    if not end_date or recurrence not in ('daily', 'weekly', 'monthly', 'custom'):
+        return
+    after = max(after or start_date, start_date)
+    until = min(until or end_date, end_date)
+
+    if recurrence == 'custom':
+        yield from iter_rule_dates(start_date, rule, after, until)
+        return
+
+    if recurrence in ('daily', 'weekly'):
+        step = 1 if recurrence == 'daily' else 7
+        index = -(-(after - start_date).days // step)  # ceil division
+        current = start_date + timedelta(days=index * step)
+        while current <= until:
+            yield current
+            current += timedelta(days=step)
+        return
 
-    recurrence_dates = []
-    current_date = start_date
-
-    if recurrence == 'daily':
-        while current_date <= end_date:
-            recurrence_dates.append(current_date)
-            current_date += timedelta(days=1)
-
-    elif recurrence == 'weekly':
-        while current_date <= end_date:
-            recurrence_dates.append(current_date)
-            current_date += timedelta(weeks=1)
-
-    elif recurrence == 'monthly':
-        day = start_date.day
-        while current_date <= end_date:
-            recurrence_dates.append(current_date)
-            next_date = current_date + relativedelta(months=1)
-            try:
-                # Try to set the same day (like 31st)
-                current_date = next_date.replace(day=day)
-            except ValueError:
-                # If the day doesn't exist (like Feb 31), fallback to last day of that month
-                current_date = next_date + relativedelta(day=31)
-
-    return recurrence_dates
+    index = (after.year - start_date.year) * 12 + after.month - start_date.month
+    while True:
+        # Same day of month as the start, clamped to the month's last day (Jan 31 -> Feb 28)
+        current = start_date + relativedelta(months=index)
+        if current > until:
+            return
+        if current >= after:
+            yield current
+        index += 1
@@ -45,6 +45,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'meeting.middleware.RequestMetricsMiddleware',  # First, so it times the whole stack
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -138,19 +139,107 @@ STATICFILES_DIRS = [
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# MySQL skips the partial (conditional) Booking indexes; the composite ones cover it there
+SILENCED_SYSTEM_CHECKS = ['models.W037']
+
 LOGIN_REDIRECT_URL = '/dashboard/'
 LOGIN_URL = '/login/'
 
+# Room availability: answer overlap lookups from the in-process interval index
+AVAILABILITY_INDEX_ENABLED = True
+AVAILABILITY_INDEX_VERIFY = False  # Cross-check every index lookup against the DB
+# A stale index is rebuilt off the request path, at most once per this many seconds per process;
+# lookups meanwhile go to the DB. False rebuilds in the requesting thread (tests).
+AVAILABILITY_INDEX_REBUILD_SECONDS = 5
+AVAILABILITY_INDEX_REBUILD_IN_BACKGROUND = True
+
+# Availability responses are cached per query and invalidated by version counters that
+# every process (web workers, Celery) has to see. Deployments with more than one process
+# set REDIS_URL (or CACHE_BACKEND=redis) to keep them in the Redis Celery uses; without it
+# the cache is local memory, which is per process and fine for runserver and tests.
+REDIS_URL = os.environ.get('REDIS_URL', 'redis://localhost:6379')
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND') or ('redis' if 'REDIS_URL' in os.environ else 'locmem')
+if CACHE_BACKEND == 'locmem':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        },
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': f'{REDIS_URL}/1',  # Celery has db 0
+        },
+    }
+AVAILABILITY_CACHE_ALIAS = 'default'
+AVAILABILITY_CACHE_TIMEOUT = 300  # Seconds
+
+# Recurring series get Booking rows this many days ahead; later occurrences are expanded on demand
+BOOKING_SERIES_HORIZON_DAYS = 90
+# Series with more occurrences than this are conflict-checked and created by a background job,
+# which inserts their rows in chunks; smaller ones are checked and saved in the request
+BOOKING_SERIES_ASYNC_THRESHOLD = 500
+BOOKING_SERIES_CHUNK_SIZE = 1000
+BOOKING_JOBS_EAGER = False  # Run background jobs in-process instead of through the broker
+
+# The booking list shows this date window unless ?from=/&to= are given, a page per room
+BOOKING_LIST_PAST_DAYS = 30
+BOOKING_LIST_FUTURE_DAYS = 180
+BOOKING_LIST_PAGE_SIZE = 25
+# Booking pages answer 304 until the viewer's bookings change, or for at most this many seconds
+BOOKING_PAGE_FRESHNESS = 60
+# The auto-cancel sweep resumes from its checkpoint; a first run looks back this far
+AUTO_CANCEL_LOOKBACK_MINUTES = 60
+AUTO_CANCEL_BATCH_SIZE = 5000
+AUTO_CANCEL_TIME_BUDGET_SECONDS = 60  # Stops after the batch that exceeds it
+# Expiry ETA tasks are queued up to two scheduler intervals ahead of their deadline
+BOOKING_EXPIRY_SCHEDULE_MINUTES = 30
+BOOKING_EXPIRY_GRACE_SECONDS = 5
+# Outgoing email is written to the outbox table and sent by meeting.tasks.drain_outbox
+OUTBOX_BATCH_SIZE = 100  # Messages sent per mail connection
+OUTBOX_TIME_BUDGET_SECONDS = 50  # Less than the periodic drain interval
+OUTBOX_LEASE_SECONDS = 300  # A claimed message is retried after this if its drainer dies
+OUTBOX_MAX_ATTEMPTS = 8
+OUTBOX_RETRY_BASE_SECONDS = 30  # Doubles per failed attempt
+OUTBOX_RETRY_MAX_SECONDS = 60 * 60
+
+# /metrics is served to staff users, these addresses and "Authorization: Bearer <METRICS_TOKEN>"
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+METRICS_ALLOWED_IPS = []
+
 CELERY_BEAT_SCHEDULE = {
+    # Check-in expiry runs as an ETA task per booking (meeting.tasks.schedule_checkin_expiry);
+    # this queues them for bookings written before their deadline came into range
+    'schedule-checkin-expiries': {
+        'task': 'meeting.tasks.schedule_checkin_expiries',
+        'schedule': crontab(minute=f'*/{BOOKING_EXPIRY_SCHEDULE_MINUTES}'),
+    },
+    # Safety net for expiry tasks that were lost (broker outage, worker crash)
     'auto-cancel-bookings': {
         'task': 'meeting.tasks.auto_cancel_unchecked_bookings',
-        'schedule': crontab(minute='*/5'),  # Every 5 minutes
+        'schedule': crontab(minute=7),  # Hourly
+    },
+    # Sends retries and anything whose post-commit drain couldn't be queued
+    'drain-email-outbox': {
+        'task': 'meeting.tasks.drain_outbox',
+        'schedule': crontab(),  # Every minute
+    },
+    'extend-series-materialization': {
+        'task': 'meeting.tasks.extend_series_materialization',
+        'schedule': crontab(hour=1, minute=0),  # Daily, rolls the series horizon forward
     },
 }
 
-# Celery Configuration
-CELERY_BROKER_URL = 'redis://localhost:6379/0'  # Change this to your Redis URL if different
+CELERY_BROKER_URL = f'{REDIS_URL}/0'  # Set REDIS_URL if different
+# Longer than the furthest expiry ETA, or Redis redelivers the task before it is due
+CELERY_BROKER_TRANSPORT_OPTIONS = {'visibility_timeout': 2 * 60 * 60}
+# Mail delivery runs on its own workers (celery -A meeting_room_project worker -Q notifications)
+CELERY_TASK_ROUTES = {
+    'meeting.tasks.send_cancellation_notices': {'queue': 'notifications'},
+    'meeting.tasks.drain_outbox': {'queue': 'notifications'},
+}
 CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
-CELERY_RESULT_BACKEND = 'redis://localhost:6379/0'
+CELERY_RESULT_BACKEND = f'{REDIS_URL}/0'
 CELERY_TIMEZONE = 'Asia/Kolkata'  # Adjust based on your timezone
\ No newline at end of file